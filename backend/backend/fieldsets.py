@@ -0,0 +1,201 @@
+"""
+Sparse fieldsets for read endpoints.
+
+``?fields=id,name,rooms.rent`` limits a response to the named fields
+(dotted names reach into nested serializers) and ``?expand=rooms`` adds
+whole nested relations to that selection. Without ``?fields=`` responses
+are unchanged.
+
+SparseFieldsetMixin trims the serializer; sparse_queryset() narrows the
+SQL to match: ``.only()`` on the selected columns, ``select_related`` for
+the relations they traverse and ``prefetch_related`` only for selected
+nested lists, built on the caller's own Prefetch querysets where given.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from django.db.models.constants import LOOKUP_SEP
+from rest_framework import serializers
+
+FIELDS_PARAM = 'fields'
+EXPAND_PARAM = 'expand'
+
+
+def _split(value):
+    return [name.strip() for name in (value or '').split(',') if name.strip()]
+
+
+def requested_fields(request):
+    """Dotted names asked for via ?fields= plus ?expand=, or None for everything"""
+    if request is None:
+        return None
+    fields = _split(request.query_params.get(FIELDS_PARAM))
+    if not fields:
+        return None
+    return fields + _split(request.query_params.get(EXPAND_PARAM))
+
+
+class SparseFieldsetMixin:
+    """
+    Serializer mixin honouring ?fields= / ?expand= from context['request'].
+
+    ``sparse_sources`` maps SerializerMethodFields to the model paths they
+    read (e.g. ``{'owner': ['hostel__owner']}``) so sparse_queryset() can
+    keep them loaded; an unmapped method field disables column narrowing.
+    """
+    sparse_sources = {}
+
+    def get_fields(self):
+        fields = super().get_fields()
+        requested = requested_fields(self.context.get('request'))
+        if requested is None:
+            return fields
+
+        path = self.sparse_path()
+        if path:
+            prefix = f'{path}.'
+            requested = [name[len(prefix):] for name in requested if name.startswith(prefix)]
+            if not requested:  # nested relation selected as a whole
+                return fields
+
+        keep = {name.split('.')[0] for name in requested}
+        return {name: field for name, field in fields.items() if name in keep}
+
+    def sparse_path(self):
+        """Dotted location of this serializer within the root serializer"""
+        names, node = [], self
+        while node.parent is not None:
+            if node.field_name:
+                names.append(node.field_name)
+            node = node.parent
+        return '.'.join(reversed(names))
+
+
+def _model_path(model, source, whole=False):
+    """
+    Split a dotted source into (field path, related paths to select) or
+    None when it is not a chain of model fields. whole=True also selects a
+    trailing relation, for code that reads the related object itself.
+    """
+    parts, relations, current = source.split('.'), [], model
+    for index, part in enumerate(parts):
+        try:
+            field = current._meta.get_field(part)
+        except FieldDoesNotExist:
+            return None  # property or annotation
+        if field.is_relation and (field.many_to_many or field.one_to_many):
+            return None
+        if field.is_relation and (index < len(parts) - 1 or whole):
+            relations.append('__'.join(parts[:index + 1]))
+            current = field.related_model
+        elif index < len(parts) - 1:
+            return None
+    return '__'.join(parts), relations
+
+
+def _caller_prefetches(queryset):
+    """The queryset's own top-level Prefetch objects, split into {lookup: Prefetch} and to_attr ones"""
+    by_lookup, to_attr = {}, []
+    for lookup in queryset._prefetch_related_lookups:
+        if not isinstance(lookup, Prefetch) or LOOKUP_SEP in lookup.prefetch_through:
+            continue
+        if lookup.to_attr:
+            to_attr.append(lookup)
+        else:
+            by_lookup[lookup.prefetch_through] = lookup
+    return by_lookup, to_attr
+
+
+def _reprefetch(queryset, prefetches):
+    """
+    Replace a queryset's prefetches with the narrowed ones, keeping its
+    to_attr Prefetches (method fields read those; see sparse_sources)
+    """
+    kept = _caller_prefetches(queryset)[1]
+    queryset = queryset.prefetch_related(None)
+    if kept or prefetches:
+        queryset = queryset.prefetch_related(*kept, *prefetches)
+    return queryset
+
+
+def _narrowing(model, serializer, existing=None):
+    """
+    (only() paths or None, select_related paths, Prefetch objects) for a
+    serializer's fields. existing maps lookups to the caller's Prefetch
+    objects; a nested list starts from that queryset (ordering, filters,
+    annotations) and only narrows it.
+    """
+    only, select, prefetches = {model._meta.pk.name}, set(), []
+    for name, field in serializer.fields.items():
+        child = field.child if isinstance(field, serializers.ListSerializer) else None
+        if isinstance(child, serializers.ModelSerializer):
+            relation = model._meta.get_field(field.source)
+            child_model = child.Meta.model
+            caller = (existing or {}).get(field.source)
+            if caller is not None and caller.queryset is not None:
+                queryset = caller.queryset.all()
+            else:
+                queryset = child_model._default_manager.all()
+            child_only, child_select, child_prefetches = _narrowing(
+                child_model, child, _caller_prefetches(queryset)[0]
+            )
+            if child_select:
+                queryset = queryset.select_related(*child_select)
+            queryset = _reprefetch(queryset, child_prefetches)
+            if child_only is not None:
+                if relation.one_to_many:  # the FK back to us is needed to attach rows
+                    child_only.add(relation.field.name)
+                queryset = queryset.only(*child_only)
+            prefetches.append(Prefetch(field.source, queryset=queryset))
+            continue
+
+        whole = isinstance(field, serializers.SerializerMethodField)
+        if whole:
+            sources = getattr(serializer, 'sparse_sources', {}).get(name)
+            if sources is None:
+                only = None
+                continue
+            sources = [source.replace('__', '.') for source in sources]
+        elif field.source == '*':
+            only = None
+            continue
+        else:
+            sources = [field.source]
+
+        for source in sources:
+            resolved = _model_path(model, source, whole)
+            if resolved is None:
+                continue
+            path, relations = resolved
+            select.update(relations)
+            if only is not None:
+                only.add(path)
+                only.update(relations)  # select_related needs the FK loaded
+    return only, select, prefetches
+
+
+def sparse_queryset(queryset, serializer, extra=()):
+    """
+    Narrow a queryset to what a SparseFieldsetMixin serializer will output.
+    extra lists model paths the view itself still reads (e.g. 'hostel__latitude').
+    Returns the queryset unchanged when no ?fields= was given.
+    """
+    if requested_fields(serializer.context.get('request')) is None:
+        return queryset
+
+    only, select, prefetches = _narrowing(queryset.model, serializer, _caller_prefetches(queryset)[0])
+    for path in extra:
+        resolved = _model_path(queryset.model, path.replace('__', '.'))
+        if resolved is None:
+            continue
+        select.update(resolved[1])
+        if only is not None:
+            only.add(resolved[0])
+            only.update(resolved[1])
+
+    queryset = queryset.select_related(None)
+    if select:
+        queryset = queryset.select_related(*select)
+    queryset = _reprefetch(queryset, prefetches)
+    if only is not None:
+        queryset = queryset.only(*only)
+    return queryset
@@ -0,0 +1,106 @@
+"""
+Shared pagination classes for the API.
+"""
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from functools import reduce
+from operator import or_
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination that seeks on a unique ordering instead of OFFSET.
+
+    The cursor carries the ordering values of the last row served, so every
+    page is a single index range scan no matter how deep the client goes.
+    Views may set ``keyset_ordering``; the last field must be unique.
+    """
+    page_size = 20
+    max_page_size = 100
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    ordering = ('-created_at', '-id')
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.ordering = getattr(view, 'keyset_ordering', self.ordering)
+        self.page_size = self.get_page_size(request)
+
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(request, queryset.model)
+        if position is not None:
+            queryset = queryset.filter(self.seek_filter(position))
+
+        # Fetch one extra row to learn whether a next page exists
+        results = list(queryset[:self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        return self.page
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def seek_filter(self, position):
+        """Build ``(a, b, ...) < (x, y, ...)`` honouring each field's direction"""
+        fields = [name.lstrip('-') for name in self.ordering]
+        lookups = ['lt' if name.startswith('-') else 'gt' for name in self.ordering]
+
+        clauses = []
+        for i, (field, lookup) in enumerate(zip(fields, lookups)):
+            equal = {fields[j]: position[j] for j in range(i)}
+            clauses.append(Q(**equal, **{f'{field}__{lookup}': position[i]}))
+
+        # Bound the leading column so the planner gets a plain range scan
+        leading = Q(**{f'{fields[0]}__{lookups[0]}e': position[0]})
+        return leading & reduce(or_, clauses)
+
+    def encode_cursor(self, obj):
+        # value_to_string keeps full precision (e.g. microseconds on datetimes)
+        values = [obj._meta.get_field(name.lstrip('-')).value_to_string(obj) for name in self.ordering]
+        return urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            values = json.loads(urlsafe_b64decode(encoded.encode()))
+            fields = [model._meta.get_field(name.lstrip('-')) for name in self.ordering]
+            if len(values) != len(fields):
+                raise ValueError
+            return [field.to_python(value) for field, value in zip(fields, values)]
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
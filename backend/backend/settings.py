@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 from decouple import config
+from django.core.exceptions import ImproperlyConfigured
 import cloudinary
 import cloudinary.uploader
 import cloudinary.api
@@ -106,6 +107,27 @@ DATABASES = {
     }
 }
 
+# Cache shared by every worker: favorites, search profiles and trending lists
+# are cached per user/city and invalidated on write, which only works when all
+# processes read the same cache. The local-memory fallback is per process, so
+# it is for single-process development only.
+REDIS_URL = config('REDIS_URL', default='')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+elif DEBUG:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+else:
+    raise ImproperlyConfigured('Set REDIS_URL: per-process caches serve stale data across workers')
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -142,6 +164,28 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Compressed archives of InteractionLog partitions past retention
+# (see engagement/INTERACTION_ARCHIVE.md)
+INTERACTION_ARCHIVE_DIR = BASE_DIR / 'archives' / 'interactions'
+INTERACTION_RETENTION_MONTHS = 12
+
+# How long a student's bed hold keeps the bed before expire_bed_holds returns it
+BED_HOLD_MINUTES = 15
+
+# Room availability feed rows (hostels.RoomChange) kept by prune_room_changes
+ROOM_CHANGE_RETENTION_DAYS = 7
+# Long-poll/stream requests allowed to wait at once per process, each holding
+# a worker thread (see hostels/feed.py); serve rooms/changes/ from its own pool
+ROOM_CHANGE_MAX_WAITERS = 50
+
+# Owner analytics exports built in the background (engagement/exports.py)
+ANALYTICS_EXPORT_DIR = BASE_DIR / 'exports' / 'analytics'
+ANALYTICS_EXPORT_RETENTION_DAYS = 7
+# A job still 'running' this long after it started lost its worker and is
+# claimed again, up to ANALYTICS_EXPORT_MAX_ATTEMPTS times before it fails
+ANALYTICS_EXPORT_STALE_MINUTES = 60
+ANALYTICS_EXPORT_MAX_ATTEMPTS = 3
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -203,4 +247,14 @@ DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
 
 
 # Use Cloudinary for default storage
-DEFAULT_FILE_STORAGE = 'cloudinary_storage.storage.MediaCloudinaryStorage'
\ No newline at end of file
+DEFAULT_FILE_STORAGE = 'cloudinary_storage.storage.MediaCloudinaryStorage'
+
+# Image uploads from the API (hostels/storage.py). LocalImageStorage writes
+# under LOCAL_IMAGE_STORAGE_ROOT instead of Cloudinary, for tests and benchmarks.
+IMAGE_STORAGE_BACKEND = 'hostels.storage.CloudinaryImageStorage'
+IMAGE_UPLOAD_WORKERS = 4
+LOCAL_IMAGE_STORAGE_ROOT = BASE_DIR / 'media' / 'local_uploads'
+# Where LocalImageStorage tells clients to send direct uploads (manage.py run_fake_storage)
+LOCAL_UPLOAD_SERVER_URL = 'http://127.0.0.1:8765/upload'
+# How long an upload intent token can still be confirmed
+UPLOAD_INTENT_MAX_AGE = 2 * 3600
\ No newline at end of file
@@ -0,0 +1,171 @@
+"""
+Streaming CSV exports of an owner's analytics.
+
+Rows are read with QuerySet.iterator() (a server-side cursor on
+PostgreSQL) as plain tuples and compressed as they are written, so memory
+stays flat however many rows an export covers. Each query filters on
+hostel ids plus a date range in the order of an existing index:
+DailyAnalytics (hostel, date) and InteractionLog (hostel, -created_at).
+"""
+import csv
+import io
+import os
+import zlib
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import AnalyticsExport, DailyAnalytics, InteractionLog
+
+EXPORT_KINDS = ('daily', 'interactions')
+CHUNK_ROWS = 2000
+
+COLUMNS = {
+    'daily': [
+        'date', 'hostel_id', 'hostel_name', 'views', 'unique_visitors',
+        'contacts', 'favorites', 'searches_appeared',
+    ],
+    'interactions': [
+        'created_at', 'hostel_id', 'hostel_name', 'interaction_type', 'safety_confirmed',
+    ],
+}
+
+
+def export_rows(kind, hostel_ids, start_date, end_date):
+    """Tuples for an export, one per row, in COLUMNS[kind] order"""
+    if kind == 'daily':
+        queryset = DailyAnalytics.objects.filter(
+            hostel_id__in=hostel_ids, date__range=(start_date, end_date)
+        ).order_by('hostel_id', 'date').values_list(
+            'date', 'hostel_id', 'hostel__name', 'views', 'unique_visitors',
+            'contacts', 'favorites', 'searches_appeared'
+        )
+    elif kind == 'interactions':
+        # Half-open range on created_at so partition pruning applies
+        start = timezone.make_aware(datetime.combine(start_date, time.min))
+        end = timezone.make_aware(datetime.combine(end_date + timedelta(days=1), time.min))
+        queryset = InteractionLog.objects.filter(
+            hostel_id__in=hostel_ids, created_at__gte=start, created_at__lt=end
+        ).order_by('hostel_id', 'created_at').values_list(
+            'created_at', 'hostel_id', 'hostel__name', 'interaction_type', 'safety_confirmed'
+        )
+    else:
+        raise ValueError(f"Unknown export kind: {kind}")
+    return queryset.iterator(chunk_size=CHUNK_ROWS)
+
+
+def gzip_csv(header, rows, flush_rows=CHUNK_ROWS):
+    """Yield gzip-compressed CSV bytes for header + rows, a chunk at a time"""
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)  # gzip container
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    for count, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if count % flush_rows == 0:
+            chunk = compressor.compress(buffer.getvalue().encode())
+            buffer.seek(0)
+            buffer.truncate()
+            if chunk:
+                yield chunk
+    yield compressor.compress(buffer.getvalue().encode()) + compressor.flush()
+
+
+def stream_export(kind, hostel_ids, start_date, end_date):
+    """Compressed CSV chunks for a StreamingHttpResponse"""
+    return gzip_csv(COLUMNS[kind], export_rows(kind, hostel_ids, start_date, end_date))
+
+
+def write_export(path, kind, hostel_ids, start_date, end_date):
+    """Write an export to path (via a .partial file); returns the row count"""
+    rows = 0
+
+    def counted():
+        nonlocal rows
+        for row in export_rows(kind, hostel_ids, start_date, end_date):
+            rows += 1
+            yield row
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.partial'
+    with open(tmp_path, 'wb') as fh:
+        for chunk in gzip_csv(COLUMNS[kind], counted()):
+            fh.write(chunk)
+    os.replace(tmp_path, path)
+    return rows
+
+
+def export_filename(kind, start_date, end_date):
+    return f'{kind}-{start_date.isoformat()}-{end_date.isoformat()}.csv.gz'
+
+
+def claim_next_job(now=None):
+    """
+    Mark the oldest pending export as running and return it (None if idle).
+
+    A job still running ANALYTICS_EXPORT_STALE_MINUTES after it started
+    lost its worker (crash, deploy, OOM kill) and is claimed again; one
+    that has already been claimed ANALYTICS_EXPORT_MAX_ATTEMPTS times is
+    marked failed instead, so a job that kills its worker cannot loop forever.
+    """
+    now = now or timezone.now()
+    stale = Q(status='running', started_at__lt=now - timedelta(minutes=settings.ANALYTICS_EXPORT_STALE_MINUTES))
+    with transaction.atomic():
+        AnalyticsExport.objects.filter(stale, attempts__gte=settings.ANALYTICS_EXPORT_MAX_ATTEMPTS).update(
+            status='failed', error='Export worker stopped responding', completed_at=now
+        )
+        job = AnalyticsExport.objects.select_for_update(skip_locked=True).filter(
+            Q(status='pending') | stale
+        ).order_by('created_at').first()
+        if job is not None:
+            job.status = 'running'
+            job.started_at = now
+            job.attempts += 1
+            job.save(update_fields=['status', 'started_at', 'attempts'])
+    return job
+
+
+def run_job(job):
+    """
+    Build a claimed export's file and record the outcome on the job. If the
+    job was reclaimed meanwhile (this worker looked stale), the outcome is
+    dropped and the newer claim's result stands.
+    """
+    path = os.path.join(
+        settings.ANALYTICS_EXPORT_DIR,
+        f'{job.id}-{job.attempts}-{export_filename(job.kind, job.start_date, job.end_date)}'
+    )
+    try:
+        job.row_count = write_export(path, job.kind, job.hostel_ids(), job.start_date, job.end_date)
+    except Exception as e:
+        job.status = 'failed'
+        job.error = str(e)
+    else:
+        job.status = 'completed'
+        job.file_path = path
+    job.completed_at = timezone.now()
+    recorded = AnalyticsExport.objects.filter(
+        pk=job.pk, status='running', attempts=job.attempts
+    ).update(
+        status=job.status, file_path=job.file_path, row_count=job.row_count,
+        error=job.error, completed_at=job.completed_at
+    )
+    if not recorded and job.file_path and os.path.exists(job.file_path):
+        os.remove(job.file_path)
+    return job
+
+
+def purge_expired_jobs(days=None):
+    """Delete finished exports (and their files) older than the retention window"""
+    days = settings.ANALYTICS_EXPORT_RETENTION_DAYS if days is None else days
+    expired = AnalyticsExport.objects.filter(
+        status__in=['completed', 'failed'],
+        completed_at__lt=timezone.now() - timedelta(days=days)
+    )
+    for path in expired.exclude(file_path='').values_list('file_path', flat=True):
+        if os.path.exists(path):
+            os.remove(path)
+    return expired.delete()[0]
@@ -0,0 +1,81 @@
+"""
+HyperLogLog sketches for approximate unique-visitor counts.
+
+Each sketch has 2**10 = 1024 one-byte registers, so it is 1 KB stored
+(DailyAnalytics.visitor_sketch). The relative standard error is
+1.04 / sqrt(1024), about 3.25%. About 95% of estimates fall within
+±6.5% of the true count. Linear counting takes over for small
+cardinalities, where the estimate is close to exact. Sketches merge by
+taking the register-wise maximum. A weekly or monthly unique count is
+the count of the merged daily sketches, with the same error bound and no
+rescan of InteractionLog.
+"""
+import hashlib
+import math
+
+import numpy as np
+
+PRECISION = 10
+REGISTER_COUNT = 1 << PRECISION
+SKETCH_BYTES = REGISTER_COUNT
+_HASH_BITS = 64
+_REMAINDER_BITS = _HASH_BITS - PRECISION
+_ALPHA = 0.7213 / (1 + 1.079 / REGISTER_COUNT)
+
+
+class HyperLogLog:
+    """A mergeable distinct-count sketch backed by a uint8 register array"""
+
+    def __init__(self, registers=None):
+        if registers is None:
+            registers = np.zeros(REGISTER_COUNT, dtype=np.uint8)
+        self.registers = registers
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Load a stored sketch; None or empty data gives an empty sketch"""
+        if not data:
+            return cls()
+        registers = np.frombuffer(bytes(data), dtype=np.uint8)
+        if registers.size != REGISTER_COUNT:
+            raise ValueError(f"Sketch must be {SKETCH_BYTES} bytes, got {registers.size}")
+        return cls(registers.copy())
+
+    def to_bytes(self):
+        return self.registers.tobytes()
+
+    def add(self, value):
+        """Add one item (anything with a stable str(), e.g. a user id)"""
+        digest = hashlib.blake2b(str(value).encode(), digest_size=8).digest()
+        hashed = int.from_bytes(digest, 'big')
+        index = hashed >> _REMAINDER_BITS
+        remainder = hashed & ((1 << _REMAINDER_BITS) - 1)
+        rank = _REMAINDER_BITS - remainder.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def update(self, values):
+        for value in values:
+            self.add(value)
+        return self
+
+    def merge(self, other):
+        """Fold another sketch into this one in place"""
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    @classmethod
+    def merged(cls, sketches):
+        result = cls()
+        for sketch in sketches:
+            result.merge(sketch)
+        return result
+
+    def count(self):
+        """Estimated number of distinct items added"""
+        estimate = _ALPHA * REGISTER_COUNT ** 2 / float(np.sum(np.ldexp(1.0, -self.registers.astype(np.int32))))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * REGISTER_COUNT and zeros:
+            # Small-range correction: linear counting
+            estimate = REGISTER_COUNT * math.log(REGISTER_COUNT / zeros)
+        return int(round(estimate))
@@ -0,0 +1,44 @@
+from collections import defaultdict
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef
+from engagement.models import Review, RatingDistribution
+
+
+class Command(BaseCommand):
+    help = 'Build per-hostel rating histograms from existing reviews'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of histograms written per bulk upsert'
+        )
+
+    def handle(self, *args, **options):
+        # One grouped query over (hostel, rating)
+        histograms = defaultdict(lambda: dict.fromkeys(RatingDistribution.STAR_FIELDS.values(), 0))
+        rows = Review.objects.values('hostel_id', 'rating').annotate(total=Count('id')).order_by()
+        for row in rows:
+            histograms[row['hostel_id']][RatingDistribution.STAR_FIELDS[row['rating']]] = row['total']
+
+        distributions = [
+            RatingDistribution(hostel_id=hostel_id, **buckets)
+            for hostel_id, buckets in histograms.items()
+        ]
+
+        with transaction.atomic():
+            RatingDistribution.objects.bulk_create(
+                distributions,
+                batch_size=options['batch_size'],
+                update_conflicts=True,
+                unique_fields=['hostel'],
+                update_fields=list(RatingDistribution.STAR_FIELDS.values()),
+            )
+            # Hostels whose reviews are all gone keep no histogram
+            stale, _ = RatingDistribution.objects.filter(
+                ~Exists(Review.objects.filter(hostel_id=OuterRef('hostel_id')))
+            ).delete()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Backfilled {len(distributions)} rating distribution(s), removed {stale} stale"
+        ))
@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+from engagement.models import RollupCheckpoint, SearchHistory, UserSearchProfile, SEARCH_PROFILE_CHECKPOINT
+
+
+class Command(BaseCommand):
+    help = (
+        'Build UserSearchProfile rows by replaying existing SearchHistory in order. '
+        'Only needed once; rollup_search_profiles carries on from the last search replayed.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Profiles written per bulk upsert'
+        )
+
+    def handle(self, *args, **options):
+        fields = ['searches', 'radius_km', 'log_price', 'log_price_spread', 'facilities', 'genders', 'updated_at']
+        profiles, written, current = [], 0, None
+
+        def flush():
+            # Profiles are complete here: rows arrive grouped by user
+            UserSearchProfile.objects.bulk_create(
+                profiles, update_conflicts=True, unique_fields=['user'], update_fields=fields
+            )
+            for profile in profiles:
+                UserSearchProfile.invalidate_cache(profile.user_id)
+
+        with transaction.atomic():
+            # Hold the rollup's checkpoint so it cannot fold these searches twice
+            checkpoint = RollupCheckpoint.acquire(SEARCH_PROFILE_CHECKPOINT)
+            last_id = SearchHistory.objects.aggregate(last_id=Max('id'))['last_id'] or 0
+            searches = SearchHistory.objects.filter(id__lte=last_id).order_by('user_id', 'id').iterator(chunk_size=5000)
+            for search in searches:
+                if current is None or current.user_id != search.user_id:
+                    if len(profiles) >= options['batch_size']:
+                        flush()
+                        written += len(profiles)
+                        profiles = []
+                    current = UserSearchProfile(user_id=search.user_id)
+                    profiles.append(current)
+                current.fold(search)
+
+            if profiles:
+                flush()
+                written += len(profiles)
+            checkpoint.position = last_id
+            checkpoint.save(update_fields=['position', 'updated_at'])
+        self.stdout.write(self.style.SUCCESS(f"Built {written} search profile(s)"))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from engagement.models import SimilarHostels, SIMILAR_HOSTELS_K
+from hostels.models import CITY_CHOICES
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuild the precomputed "similar hostels" lists: k nearest neighbours '
+        'within each city over location, price, gender, facilities and rating. '
+        'Run nightly.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--city', choices=[city for city, _ in CITY_CHOICES],
+            help='Only rebuild this city'
+        )
+        parser.add_argument(
+            '-k', type=int, default=SIMILAR_HOSTELS_K,
+            help='Neighbours stored per hostel'
+        )
+
+    def handle(self, *args, **options):
+        cities = [options['city']] if options['city'] else [city for city, _ in CITY_CHOICES]
+        total = 0
+        for city in cities:
+            written = SimilarHostels.rebuild_city(city, options['k'])
+            total += written
+            if written:
+                self.stdout.write(f"{city}: {written} hostel(s)")
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt similar hostels for {total} hostel(s)"))
@@ -0,0 +1,48 @@
+import sys
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from engagement.exports import EXPORT_KINDS, stream_export
+from hostels.models import Hostel
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream an owner's DailyAnalytics or InteractionLog rows to a gzip CSV "
+        "file (or stdout) with constant memory."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=EXPORT_KINDS)
+        parser.add_argument('--start', required=True, help='First day (YYYY-MM-DD)')
+        parser.add_argument('--end', required=True, help='Last day, inclusive (YYYY-MM-DD)')
+        target = parser.add_mutually_exclusive_group(required=True)
+        target.add_argument('--owner', type=int, help='Export every hostel of this owner id')
+        target.add_argument('--hostel', type=int, help='Export a single hostel id')
+        parser.add_argument('--output', '-o', default='-', help="Output path, '-' for stdout")
+
+    def handle(self, *args, **options):
+        try:
+            start_date = date.fromisoformat(options['start'])
+            end_date = date.fromisoformat(options['end'])
+        except ValueError:
+            raise CommandError('--start and --end must be in YYYY-MM-DD format')
+        if start_date > end_date:
+            raise CommandError('--start must not be after --end')
+
+        if options['hostel']:
+            hostel_ids = [options['hostel']]
+        else:
+            hostel_ids = list(Hostel.objects.filter(owner_id=options['owner']).values_list('id', flat=True))
+
+        chunks = stream_export(options['kind'], hostel_ids, start_date, end_date)
+        if options['output'] == '-':
+            for chunk in chunks:
+                sys.stdout.buffer.write(chunk)
+            sys.stdout.buffer.flush()
+            return
+
+        with open(options['output'], 'wb') as fh:
+            for chunk in chunks:
+                fh.write(chunk)
+        self.stderr.write(self.style.SUCCESS(f"Wrote {options['output']}"))
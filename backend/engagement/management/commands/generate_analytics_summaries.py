@@ -0,0 +1,38 @@
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from engagement.models import AnalyticsSummary
+
+
+class Command(BaseCommand):
+    help = 'Generate weekly/monthly AnalyticsSummary rows for every hostel in bulk'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--period', choices=['W', 'M', 'all'], default='all',
+            help='Weekly (W), monthly (M) or both (all)'
+        )
+        parser.add_argument(
+            '--date',
+            help='Any day inside the period to build, YYYY-MM-DD (default: today)'
+        )
+        parser.add_argument(
+            '--incremental', action='store_true',
+            help='Only rebuild periods whose daily analytics changed since the last incremental run'
+        )
+
+    def handle(self, *args, **options):
+        period_types = ['W', 'M'] if options['period'] == 'all' else [options['period']]
+
+        day = None
+        if options['date']:
+            try:
+                day = date.fromisoformat(options['date'])
+            except ValueError:
+                raise CommandError('--date must be in YYYY-MM-DD format')
+
+        results = AnalyticsSummary.generate_periods(
+            period_types, day=day, incremental=options['incremental']
+        )
+        for period_type, start_date, written in results:
+            self.stdout.write(f"{period_type} {start_date}: {written} summaries")
+        self.stdout.write(self.style.SUCCESS(f"Generated {len(results)} period(s)"))
@@ -0,0 +1,96 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from engagement import partitions
+
+
+class Command(BaseCommand):
+    help = (
+        'Maintain monthly InteractionLog partitions: create upcoming months, '
+        'then detach, archive (gzip CSV + JSON manifest) and drop months past retention. '
+        'Run daily from cron. PostgreSQL only.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--months-ahead', type=int, default=3,
+            help='Create partitions through this many months after the current one'
+        )
+        parser.add_argument(
+            '--retain-months', type=int, default=settings.INTERACTION_RETENTION_MONTHS,
+            help='Keep this many months (including the current one) attached'
+        )
+        parser.add_argument(
+            '--archive-dir', default=str(settings.INTERACTION_ARCHIVE_DIR),
+            help='Directory receiving <partition>.csv.gz and <partition>.json'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Only report what would be created or archived'
+        )
+        parser.add_argument(
+            '--check-pruning', action='store_true',
+            help='EXPLAIN a one-month range query and fail unless only that month is scanned'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('InteractionLog partitioning requires PostgreSQL.')
+        if options['retain_months'] < 1:
+            raise CommandError('--retain-months must be at least 1.')
+
+        with connection.cursor() as cursor:
+            if not partitions.is_partitioned(cursor):
+                raise CommandError('engagement_interactionlog is not partitioned; run migrations first.')
+
+            if options['check_pruning']:
+                self.check_pruning(cursor)
+                return
+
+            if options['dry_run']:
+                self.stdout.write('Dry run: no changes will be made')
+            else:
+                with transaction.atomic():
+                    for name in partitions.ensure_partitions(cursor, options['months_ahead']):
+                        self.stdout.write(f"Created partition {name}")
+
+            # Rows for months that now have a partition were moved into it
+            # above; anything left predates the partitions and is never archived
+            stray = partitions.default_partition_rows(cursor)
+            if stray:
+                self.stdout.write(self.style.WARNING(
+                    f"{stray} row(s) sit in {partitions.DEFAULT_PARTITION}; they are never archived"
+                ))
+
+            cutoff = partitions.add_months(
+                partitions.month_start(timezone.now().date()), -(options['retain_months'] - 1)
+            )
+            expired = [(month, name) for month, name in partitions.list_partitions(cursor) if month < cutoff]
+            for month, name in expired:
+                if options['dry_run']:
+                    self.stdout.write(f"Would archive and drop {name}")
+                    continue
+                self.retire(cursor, month, name, options['archive_dir'])
+
+        self.stdout.write(self.style.SUCCESS(f"Done; {len(expired)} partition(s) past retention"))
+
+    def retire(self, cursor, month, name, archive_dir):
+        # Detach first so the archive is a stable snapshot no query can add to
+        with transaction.atomic():
+            partitions.detach_partition(cursor, name)
+        manifest = partitions.archive_partition(cursor, name, month, archive_dir)
+        # Only drop once the archive and manifest are safely on disk
+        with transaction.atomic():
+            partitions.drop_partition(cursor, name)
+        self.stdout.write(f"Archived {manifest['rows']} row(s) from {name} to {manifest['data_file']}")
+
+    def check_pruning(self, cursor):
+        start = partitions.month_start(timezone.now().date())
+        end = partitions.add_months(start, 1)
+        scanned = partitions.explain_partitions_scanned(cursor, start, end)
+        expected = [partitions.partition_name(start)]
+        self.stdout.write(f"Range {start}..{end} scans: {', '.join(scanned) or 'nothing'}")
+        if scanned != expected:
+            raise CommandError(f"Partition pruning failed; expected only {expected[0]}")
+        self.stdout.write(self.style.SUCCESS('Partition pruning OK'))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from engagement.exports import claim_next_job, run_job, purge_expired_jobs
+
+
+class Command(BaseCommand):
+    help = (
+        'Build pending owner analytics exports, then delete finished ones past '
+        'ANALYTICS_EXPORT_RETENTION_DAYS. Safe to run from several workers.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit', type=int, default=10,
+            help='Maximum number of exports to build in this run'
+        )
+        parser.add_argument(
+            '--no-purge', action='store_true',
+            help='Skip deleting expired exports'
+        )
+
+    def handle(self, *args, **options):
+        built = 0
+        while built < options['limit']:
+            job = claim_next_job()
+            if job is None:
+                break
+            run_job(job)
+            built += 1
+            if job.status == 'completed':
+                self.stdout.write(f"Export {job.id}: {job.row_count} row(s) -> {job.file_path}")
+            else:
+                self.stderr.write(self.style.ERROR(f"Export {job.id} failed: {job.error}"))
+
+        purged = 0 if options['no_purge'] else purge_expired_jobs()
+        self.stdout.write(self.style.SUCCESS(f"Built {built} export(s), purged {purged}"))
@@ -0,0 +1,95 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from engagement.models import DailyAnalytics, Favorite, HostelAnalytics
+
+
+class Command(BaseCommand):
+    help = (
+        'Correct drift in HostelAnalytics.total_favorites and in the last --days '
+        'DailyAnalytics.favorites buckets (a bucket holds the favorites created '
+        'that day that still exist). Intended to run periodically (e.g. nightly from cron).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of analytics rows written per bulk upsert'
+        )
+        parser.add_argument(
+            '--days', type=int, default=2,
+            help='Daily favorite buckets to check, counting back from today'
+        )
+
+    def handle(self, *args, **options):
+        counts = dict(
+            Favorite.objects.values_list('hostel_id').annotate(total=Count('id')).order_by()
+        )
+
+        drifted = []
+        stored = HostelAnalytics.objects.values_list('hostel_id', 'total_favorites')
+        for hostel_id, total_favorites in stored.iterator(chunk_size=options['batch_size']):
+            actual = counts.pop(hostel_id, 0)
+            if actual != total_favorites:
+                drifted.append(HostelAnalytics(hostel_id=hostel_id, total_favorites=actual))
+
+        # Whatever is left has favorites but no analytics row yet
+        missing = [
+            HostelAnalytics(hostel_id=hostel_id, total_favorites=total)
+            for hostel_id, total in counts.items()
+        ]
+
+        with transaction.atomic():
+            HostelAnalytics.objects.bulk_create(
+                drifted + missing,
+                batch_size=options['batch_size'],
+                update_conflicts=True,
+                unique_fields=['hostel'],
+                update_fields=['total_favorites'],
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Corrected {len(drifted)} drifted and created {len(missing)} missing favorite count(s)"
+        ))
+
+        daily_drifted, daily_missing = self.reconcile_daily(options['days'], options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Corrected {daily_drifted} drifted and created {daily_missing} missing daily favorite bucket(s)"
+        ))
+
+    def reconcile_daily(self, days, batch_size):
+        """Deletes undo the favorite's creation-day bucket, so each bucket is a grouped count"""
+        if days <= 0:
+            return 0, 0
+        start = timezone.now().date() - timedelta(days=days - 1)
+        counts = {
+            (row['hostel_id'], row['day']): row['total']
+            for row in Favorite.objects.filter(created_at__date__gte=start)
+            .annotate(day=TruncDate('created_at'))
+            .values('hostel_id', 'day').annotate(total=Count('id')).order_by()
+        }
+
+        drifted = []
+        stored = DailyAnalytics.objects.filter(date__gte=start).values_list('hostel_id', 'date', 'favorites')
+        for hostel_id, date, favorites in stored.iterator(chunk_size=batch_size):
+            actual = counts.pop((hostel_id, date), 0)
+            if actual != favorites:
+                drifted.append(DailyAnalytics(hostel_id=hostel_id, date=date, favorites=actual))
+        missing = [
+            DailyAnalytics(hostel_id=hostel_id, date=date, favorites=total)
+            for (hostel_id, date), total in counts.items()
+        ]
+
+        with transaction.atomic():
+            DailyAnalytics.objects.bulk_create(
+                drifted + missing,
+                batch_size=batch_size,
+                update_conflicts=True,
+                unique_fields=['hostel', 'date'],
+                update_fields=['favorites'],
+            )
+        return len(drifted), len(missing)
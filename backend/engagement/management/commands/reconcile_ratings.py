@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Sum
+from hostels.models import Hostel
+from engagement.models import Review
+
+
+class Command(BaseCommand):
+    help = 'Recompute denormalized hostel rating aggregates and fix any drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of hostels written per bulk update'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Report drifted hostels without writing'
+        )
+
+    def handle(self, *args, **options):
+        # One grouped query for the true totals
+        totals = {
+            row['hostel_id']: (row['rating_sum'], row['rating_count'])
+            for row in Review.objects.values('hostel_id').annotate(
+                rating_sum=Sum('rating'), rating_count=Count('id')
+            ).order_by()
+        }
+
+        drifted = []
+        hostels = Hostel.objects.only('id', 'rating_sum', 'rating_count', 'average_rating')
+        for hostel in hostels.iterator(chunk_size=options['batch_size']):
+            rating_sum, rating_count = totals.get(hostel.id, (0, 0))
+            average = rating_sum / rating_count if rating_count else None
+            if (hostel.rating_sum, hostel.rating_count, hostel.average_rating) != (rating_sum, rating_count, average):
+                hostel.rating_sum = rating_sum
+                hostel.rating_count = rating_count
+                hostel.average_rating = average
+                drifted.append(hostel)
+
+        if drifted and not options['dry_run']:
+            Hostel.objects.bulk_update(
+                drifted,
+                ['rating_sum', 'rating_count', 'average_rating'],
+                batch_size=options['batch_size']
+            )
+
+        verb = 'Found' if options['dry_run'] else 'Reconciled'
+        self.stdout.write(self.style.SUCCESS(f"{verb} {len(drifted)} hostel(s) with drifted ratings"))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from engagement.models import TrendingScore
+from hostels.models import CITY_CHOICES
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuild the cached trending top-N list for every city. Scores themselves '
+        'are updated as events arrive; run this every few minutes.'
+    )
+
+    def handle(self, *args, **options):
+        cities = [city for city, _ in CITY_CHOICES]
+        TrendingScore.refresh_cache(cities)
+        self.stdout.write(self.style.SUCCESS(f"Refreshed trending lists for {len(cities)} cities"))
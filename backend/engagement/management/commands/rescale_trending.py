@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from engagement.models import TrendingScore
+
+
+class Command(BaseCommand):
+    help = (
+        'Move the trending epoch forward to now, dividing every stored score by '
+        'the same factor in one UPDATE. Current scores and ranking do not change; '
+        'this keeps the growth multiplier far from float overflow. Run daily.'
+    )
+
+    def handle(self, *args, **options):
+        factor = TrendingScore.rescale()
+        self.stdout.write(self.style.SUCCESS(f"Rescaled trending scores by 1/{factor:.6g}"))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from engagement.models import DailyFunnel
+
+
+class Command(BaseCommand):
+    help = (
+        'Fold new interactions, favorites (net of removals) and search appearances into DailyFunnel '
+        'rows. Resumes from its checkpoints, so it is cheap to run every few minutes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=50000,
+            help='Source id range aggregated per grouped query'
+        )
+
+    def handle(self, *args, **options):
+        processed = DailyFunnel.rollup(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rolled up {processed} source row(s) into funnels"))
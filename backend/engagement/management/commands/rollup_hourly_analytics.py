@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from engagement.models import HourlyAnalytics
+
+
+class Command(BaseCommand):
+    help = (
+        'Fold new InteractionLog rows into HourlyAnalytics. Resumes from the last '
+        'processed id, so it is cheap to run every few minutes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=50000,
+            help='InteractionLog id range aggregated per grouped query'
+        )
+
+    def handle(self, *args, **options):
+        processed = HourlyAnalytics.rollup_interactions(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rolled up {processed} interaction(s)"))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from engagement.models import SearchAreaAnalytics
+
+
+class Command(BaseCommand):
+    help = (
+        'Bucket new SearchHistory rows into per-geohash-cell daily counts. Resumes '
+        'from the last processed id, so it is cheap to run every few minutes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=50000,
+            help='SearchHistory id range read per batch'
+        )
+
+    def handle(self, *args, **options):
+        processed = SearchAreaAnalytics.rollup_searches(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rolled up {processed} search(es)"))
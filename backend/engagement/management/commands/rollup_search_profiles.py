@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from engagement.models import UserSearchProfile
+
+
+class Command(BaseCommand):
+    help = (
+        'Fold new SearchHistory rows into UserSearchProfile rows. Resumes from the '
+        'last processed id, so it is cheap to run every few minutes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='SearchHistory id range read per batch'
+        )
+
+    def handle(self, *args, **options):
+        processed = UserSearchProfile.rollup(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rolled up {processed} search(es) into profiles"))
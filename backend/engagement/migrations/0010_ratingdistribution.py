@@ -0,0 +1,27 @@
+# Generated by Django 5.2.6 on 2026-10-19 10:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('engagement', '0009_alter_report_hostel'),
+        ('hostels', '0009_hostel_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RatingDistribution',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stars_1', models.IntegerField(default=0)),
+                ('stars_2', models.IntegerField(default=0)),
+                ('stars_3', models.IntegerField(default=0)),
+                ('stars_4', models.IntegerField(default=0)),
+                ('stars_5', models.IntegerField(default=0)),
+                ('hostel', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='rating_distribution', to='hostels.hostel')),
+            ],
+        ),
+    ]
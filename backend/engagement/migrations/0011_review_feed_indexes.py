@@ -0,0 +1,21 @@
+# Generated by Django 5.2.6 on 2026-10-19 10:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('engagement', '0010_ratingdistribution'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['hostel', '-created_at', '-id'], name='review_hostel_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['-created_at', '-id'], name='review_feed_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-19 12:08
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('engagement', '0012_dailyanalytics_updated_at_rollupcheckpoint'),
+        ('hostels', '0009_hostel_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HourlyAnalytics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('hour', models.PositiveSmallIntegerField(validators=[django.core.validators.MaxValueValidator(23)])),
+                ('views', models.IntegerField(default=0)),
+                ('contacts', models.IntegerField(default=0)),
+                ('hostel', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='hourly_analytics', to='hostels.hostel')),
+            ],
+            options={
+                'ordering': ['-date', 'hour'],
+                'unique_together': {('hostel', 'date', 'hour')},
+            },
+        ),
+    ]
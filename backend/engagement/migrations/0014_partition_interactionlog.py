@@ -0,0 +1,107 @@
+# Generated by Django 5.2.6 on 2026-10-19 13:02
+
+from datetime import date
+
+from django.db import migrations, models
+
+PARENT = 'engagement_interactionlog'
+LEGACY = 'engagement_interactionlog_legacy'
+
+
+def add_months(day, months):
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_interactionlog(apps, schema_editor):
+    """
+    Rebuild engagement_interactionlog as a table range-partitioned by month
+    on created_at. PostgreSQL only; other backends keep the plain table.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        # Capture secondary indexes and foreign keys so they can be rebuilt
+        # with the same names on the partitioned parent
+        cursor.execute(
+            "SELECT indexname, indexdef FROM pg_indexes "
+            "WHERE schemaname = current_schema() AND tablename = %s "
+            "AND indexname <> %s",
+            [PARENT, f'{PARENT}_pkey']
+        )
+        indexes = cursor.fetchall()
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = %s::regclass AND contype = 'f'",
+            [PARENT]
+        )
+        foreign_keys = cursor.fetchall()
+
+        cursor.execute(f'ALTER TABLE "{PARENT}" RENAME TO "{LEGACY}"')
+        for name, _ in foreign_keys:
+            cursor.execute(f'ALTER TABLE "{LEGACY}" DROP CONSTRAINT "{name}"')
+        for name, _ in indexes:
+            cursor.execute(f'DROP INDEX "{name}"')
+        cursor.execute(f'ALTER TABLE "{LEGACY}" DROP CONSTRAINT "{PARENT}_pkey"')
+
+        # The partition key must be part of the primary key. Identity columns
+        # are not allowed on partitioned tables before PostgreSQL 17, so ids
+        # come from an owned sequence instead.
+        cursor.execute(
+            f'CREATE TABLE "{PARENT}" (LIKE "{LEGACY}" INCLUDING DEFAULTS '
+            f'INCLUDING CONSTRAINTS) PARTITION BY RANGE (created_at)'
+        )
+        cursor.execute(f'ALTER TABLE "{PARENT}" ADD CONSTRAINT "{PARENT}_pkey" PRIMARY KEY (id, created_at)')
+        cursor.execute(f'CREATE SEQUENCE "{PARENT}_id_part_seq" OWNED BY "{PARENT}".id')
+        cursor.execute(
+            f'ALTER TABLE "{PARENT}" ALTER COLUMN id SET DEFAULT nextval(\'"{PARENT}_id_part_seq"\'::regclass)'
+        )
+
+        # Monthly partitions from the oldest row through three months ahead
+        cursor.execute(f'SELECT min(created_at)::date, now()::date FROM "{LEGACY}"')
+        oldest, today = cursor.fetchone()
+        month = (oldest or today).replace(day=1)
+        last = add_months(today, 3)
+        while month <= last:
+            cursor.execute(
+                f'CREATE TABLE "{PARENT}_p{month.year:04d}_{month.month:02d}" '
+                f"PARTITION OF \"{PARENT}\" FOR VALUES FROM ('{month.isoformat()}') "
+                f"TO ('{add_months(month, 1).isoformat()}')"
+            )
+            month = add_months(month, 1)
+        cursor.execute(f'CREATE TABLE "{PARENT}_default" PARTITION OF "{PARENT}" DEFAULT')
+
+        for _, definition in indexes:
+            cursor.execute(definition)
+        for name, definition in foreign_keys:
+            cursor.execute(f'ALTER TABLE "{PARENT}" ADD CONSTRAINT "{name}" {definition}')
+
+        cursor.execute(f'INSERT INTO "{PARENT}" SELECT * FROM "{LEGACY}"')
+        cursor.execute(
+            f"SELECT setval(pg_get_serial_sequence(%s, 'id'), "
+            f'COALESCE((SELECT max(id) FROM "{PARENT}"), 0) + 1, false)',
+            [PARENT]
+        )
+        cursor.execute(f'DROP TABLE "{LEGACY}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('engagement', '0013_hourlyanalytics'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='interactionlog',
+            index=models.Index(fields=['hostel', '-created_at'], name='interaction_hostel_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='interactionlog',
+            index=models.Index(fields=['created_at'], name='interaction_created_idx'),
+        ),
+        # Not reversible in place; unapplying leaves the partitioned table,
+        # which the ORM treats exactly like the plain one
+        migrations.RunPython(partition_interactionlog, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-19 14:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('engagement', '0014_partition_interactionlog'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analyticssummary',
+            name='unique_visitors',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='dailyanalytics',
+            name='unique_visitors',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='dailyanalytics',
+            name='visitor_sketch',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.6 on 2026-10-19 14:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('engagement', '0015_unique_visitor_sketches'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchAreaAnalytics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cell', models.CharField(max_length=12)),
+                ('date', models.DateField()),
+                ('latitude', models.FloatField()),
+                ('longitude', models.FloatField()),
+                ('searches', models.IntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['-date', 'cell'],
+                'indexes': [
+                    models.Index(fields=['date'], name='search_area_date_idx'),
+                    models.Index(fields=['latitude', 'longitude'], name='search_area_point_idx'),
+                ],
+                'unique_together': {('cell', 'date')},
+            },
+        ),
+    ]
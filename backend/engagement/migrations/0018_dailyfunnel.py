@@ -0,0 +1,34 @@
+# Generated by Django 5.2.6 on 2026-10-19 15:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('engagement', '0017_analyticsexport'),
+        ('hostels', '0009_hostel_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyFunnel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('appearances', models.IntegerField(default=0)),
+                ('views', models.IntegerField(default=0)),
+                ('search_views', models.IntegerField(default=0)),
+                ('favorites', models.IntegerField(default=0)),
+                ('contacts', models.IntegerField(default=0)),
+                ('search_contacts', models.IntegerField(default=0)),
+                ('hostel', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_funnels', to='hostels.hostel')),
+            ],
+            options={
+                'ordering': ['-date'],
+                'indexes': [models.Index(fields=['date'], name='daily_funnel_date_idx')],
+                'unique_together': {('hostel', 'date')},
+            },
+        ),
+    ]
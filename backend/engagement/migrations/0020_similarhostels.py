@@ -0,0 +1,24 @@
+# Generated by Django 5.2.6 on 2026-10-19 16:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('engagement', '0019_trendingscore'),
+        ('hostels', '0009_hostel_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SimilarHostels',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entries', models.JSONField(default=list)),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+                ('hostel', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='similar_hostels', to='hostels.hostel')),
+            ],
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.6 on 2026-10-19 16:55
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('engagement', '0020_similarhostels'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserSearchProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('searches', models.PositiveIntegerField(default=0)),
+                ('radius_km', models.FloatField(default=5)),
+                ('log_price', models.FloatField(blank=True, null=True)),
+                ('log_price_spread', models.FloatField(default=0.5)),
+                ('facilities', models.JSONField(default=dict)),
+                ('genders', models.JSONField(default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='search_profile', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
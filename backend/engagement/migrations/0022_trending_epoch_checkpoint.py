@@ -0,0 +1,27 @@
+# Generated by Django 5.2.6 on 2026-10-19 19:40
+
+from datetime import datetime, timezone
+
+from django.db import migrations
+
+TRENDING_EPOCH = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def create_epoch_checkpoint(apps, schema_editor):
+    """
+    Seed the row TrendingScore.epoch() share-locks, so the first rescale
+    finds it already there instead of inserting it under concurrent writes.
+    """
+    RollupCheckpoint = apps.get_model('engagement', 'RollupCheckpoint')
+    RollupCheckpoint.objects.get_or_create(name='trending_epoch', defaults={'last_run_at': TRENDING_EPOCH})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('engagement', '0021_usersearchprofile'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_epoch_checkpoint, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 20:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('engagement', '0022_trending_epoch_checkpoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analyticsexport',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+    ]
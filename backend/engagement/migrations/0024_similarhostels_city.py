@@ -0,0 +1,29 @@
+# Generated by Django 5.2.6 on 2026-10-19 20:25
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def copy_hostel_city(apps, schema_editor):
+    SimilarHostels = apps.get_model('engagement', 'SimilarHostels')
+    Hostel = apps.get_model('hostels', 'Hostel')
+    SimilarHostels.objects.update(
+        city=Subquery(Hostel.objects.filter(id=OuterRef('hostel_id')).values('city')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('engagement', '0023_analyticsexport_attempts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='similarhostels',
+            name='city',
+            field=models.CharField(db_index=True, default='', max_length=10),
+            preserve_default=False,
+        ),
+        migrations.RunPython(copy_hostel_city, migrations.RunPython.noop),
+    ]
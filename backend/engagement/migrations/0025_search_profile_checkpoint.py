@@ -0,0 +1,26 @@
+# Generated by Django 5.2.6 on 2026-10-19 20:40
+
+from django.db import migrations
+from django.db.models import Max
+
+
+def create_search_profile_checkpoint(apps, schema_editor):
+    """
+    Start the search profile rollup after the newest search: every earlier
+    one was already folded in when it was made.
+    """
+    RollupCheckpoint = apps.get_model('engagement', 'RollupCheckpoint')
+    SearchHistory = apps.get_model('engagement', 'SearchHistory')
+    last_id = SearchHistory.objects.aggregate(last_id=Max('id'))['last_id'] or 0
+    RollupCheckpoint.objects.get_or_create(name='search_profiles', defaults={'position': last_id})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('engagement', '0024_similarhostels_city'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_profile_checkpoint, migrations.RunPython.noop),
+    ]
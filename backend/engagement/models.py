@@ -1,10 +1,45 @@
-from django.db import models
+from django.db import connection, models, transaction
 from django.core.validators import MinValueValidator, MaxValueValidator
-from django.db.models import Avg, Count, F, Sum
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Coalesce, ExtractHour, Substr, TruncDate
+from django.core.cache import cache
 from django.utils import timezone
-from datetime import timedelta
+import math
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
 from users.models import User
 from hostels.models import Hostel, Room
+from . import geohash
+from .hll import HyperLogLog
+from .similarity import similar_hostels_for_city
+from .utils import bulk_increment
+
+# Cached per-user favorite-id sets (see Favorite.status_for)
+FAVORITE_IDS_CACHE_TIMEOUT = 60 * 15
+FAVORITE_HOT_USER_LOOKUPS = 5
+
+# Trending: each event adds weight * 2**(age since epoch / half-life), so
+# ordering by the stored score equals ordering by the decayed score and
+# updates are plain additions. 2**1023 caps the epoch at ~8 years of 3-day
+# half-lives, so `manage.py rescale_trending` (daily from cron) moves the
+# epoch forward and divides every score by the same factor. The current
+# epoch lives in the 'trending_epoch' RollupCheckpoint; TRENDING_EPOCH is
+# where it starts.
+TRENDING_EPOCH = datetime(2026, 1, 1, tzinfo=dt_timezone.utc)
+TRENDING_EPOCH_CHECKPOINT = 'trending_epoch'
+TRENDING_HALF_LIFE = timedelta(days=3)
+TRENDING_WEIGHTS = {'view': 1.0, 'favorite': 3.0, 'contact': 5.0}
+TRENDING_TOP_N = 20
+TRENDING_CACHE_TIMEOUT = 60 * 15
+
+SIMILAR_HOSTELS_K = 10
+
+# Personalized search: profiles are exponential moving averages over a
+# student's searches, so each search updates them in O(1)
+SEARCH_PROFILE_ALPHA = 0.2
+SEARCH_PROFILE_CACHE_TIMEOUT = 60 * 60 * 24
+SEARCH_PROFILE_REPEAT_SECONDS = 60  # an identical repeat search within this window is not folded again
+SEARCH_PROFILE_CHECKPOINT = 'search_profiles'
 
 # ----------------- Search History -----------------
 class SearchHistory(models.Model):
@@ -56,6 +91,162 @@ class SearchHistory(models.Model):
     def __str__(self):
         return f"{self.user} - {self.created_at}"
 
+class UserSearchProfile(models.Model):
+    """
+    A student's typical search (radius, price band, facilities, gender),
+    folded in one search at a time with weight SEARCH_PROFILE_ALPHA so
+    recent searches count most. Used to rank personalized search results.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='search_profile')
+    searches = models.PositiveIntegerField(default=0)
+    radius_km = models.FloatField(default=5)
+    log_price = models.FloatField(null=True, blank=True)  # log2 of the typical budget
+    log_price_spread = models.FloatField(default=0.5)  # mean absolute deviation, in doublings
+    facilities = models.JSONField(default=dict)  # facility -> share of recent searches asking for it
+    genders = models.JSONField(default=dict)  # gender preference -> share of recent searches
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Search profile for {self.user}"
+
+    @staticmethod
+    def cache_key(user_id):
+        return f'search_profile:{user_id}'
+
+    @classmethod
+    def for_user(cls, user_id):
+        """The user's profile from cache (falling back to one indexed read), or None"""
+        key = cls.cache_key(user_id)
+        profile = cache.get(key)
+        if profile is None:
+            profile = cls.objects.filter(user_id=user_id).first()
+            if profile is not None:
+                cache.set(key, profile, SEARCH_PROFILE_CACHE_TIMEOUT)
+        return profile
+
+    @classmethod
+    def invalidate_cache(cls, user_id):
+        cache.delete(cls.cache_key(user_id))
+
+    @staticmethod
+    def criteria(search):
+        return (
+            search.latitude, search.longitude, search.radius, search.gender_preference,
+            search.min_price, search.max_price, sorted(search.facilities or []),
+        )
+
+    @classmethod
+    def rollup(cls, batch_size=5000, lag=timedelta(minutes=1)):
+        """
+        Fold SearchHistory rows added since the last run into their users'
+        profiles, oldest first, so searching never waits on a profile write.
+        A search identical to the user's previous one within
+        SEARCH_PROFILE_REPEAT_SECONDS (a reload) is not folded again. Same
+        checkpoint/lag scheme as SearchAreaAnalytics.rollup_searches.
+        Returns searches consumed.
+        """
+        processed, user_ids = 0, set()
+        with transaction.atomic():
+            checkpoint = RollupCheckpoint.acquire(SEARCH_PROFILE_CHECKPOINT)
+            target = SearchHistory.objects.filter(
+                id__gt=checkpoint.position,
+                created_at__lte=timezone.now() - lag
+            ).aggregate(last_id=models.Max('id'))['last_id']
+
+            while target and checkpoint.position < target:
+                upper = min(checkpoint.position + batch_size, target)
+                searches = defaultdict(list)
+                for search in SearchHistory.objects.filter(
+                    id__gt=checkpoint.position, id__lte=upper
+                ).order_by('id').iterator(chunk_size=5000):
+                    searches[search.user_id].append(search)
+                    processed += 1
+
+                existing = cls.objects.in_bulk(list(searches), field_name='user_id')
+                created, now = [], timezone.now()
+                for user_id, rows in searches.items():
+                    profile = existing.get(user_id)
+                    if profile is None:
+                        profile = cls(user_id=user_id)
+                        created.append(profile)
+                    previous = None
+                    for search in rows:
+                        current = cls.criteria(search)
+                        if previous and previous[0] == current and (
+                            search.created_at - previous[1]
+                        ).total_seconds() < SEARCH_PROFILE_REPEAT_SECONDS:
+                            continue
+                        profile.fold(search)
+                        previous = (current, search.created_at)
+                    profile.updated_at = now
+                cls.objects.bulk_create(created, batch_size=1000)
+                cls.objects.bulk_update(
+                    existing.values(),
+                    ['searches', 'radius_km', 'log_price', 'log_price_spread', 'facilities', 'genders', 'updated_at'],
+                    batch_size=1000
+                )
+                user_ids.update(searches)
+                checkpoint.position = upper
+
+            checkpoint.last_run_at = timezone.now()
+            checkpoint.save(update_fields=['position', 'last_run_at', 'updated_at'])
+        cache.delete_many([cls.cache_key(user_id) for user_id in user_ids])
+        return processed
+
+    def fold(self, search):
+        """Move the averages towards one search (the first search sets them)"""
+        alpha = 1.0 if self.searches == 0 else SEARCH_PROFILE_ALPHA
+
+        def blend(old, new):
+            return (1 - alpha) * old + alpha * new
+
+        self.radius_km = blend(self.radius_km, float(search.radius))
+
+        prices = [float(p) for p in (search.min_price, search.max_price) if p]
+        if prices:
+            target = math.log2(sum(prices) / len(prices))
+            if self.log_price is None:
+                self.log_price = target
+            else:
+                self.log_price_spread = blend(self.log_price_spread, abs(target - self.log_price))
+                self.log_price = blend(self.log_price, target)
+
+        requested = set(search.facilities or [])
+        self.facilities = {
+            name: round(weight, 4)
+            for name in set(self.facilities) | requested
+            if (weight := blend(self.facilities.get(name, 0.0), 1.0 if name in requested else 0.0)) >= 0.01
+        }
+        if search.gender_preference:
+            self.genders = {
+                gender: round(blend(self.genders.get(gender, 0.0), 1.0 if gender == search.gender_preference else 0.0), 4)
+                for gender in set(self.genders) | {search.gender_preference}
+            }
+        self.searches += 1
+
+    def score(self, room, distance_km):
+        """
+        How well a search result matches the profile, in [0, 1]: closeness
+        relative to the usual radius, rent vs. usual budget, overlap with
+        usually requested facilities and the usual gender preference.
+        """
+        proximity = math.exp(-distance_km / max(self.radius_km, 0.5))
+
+        price = 0.5
+        if self.log_price is not None and room.rent:
+            deviation = (math.log2(float(room.rent)) - self.log_price) / max(self.log_price_spread, 0.25)
+            price = math.exp(-0.5 * deviation * deviation)
+
+        facility = 0.5
+        wanted = sum(self.facilities.values())
+        if wanted:
+            facility = sum(self.facilities.get(name, 0.0) for name in room.facilities or []) / wanted
+
+        gender = self.genders.get(room.hostel.gender, 0.0) if self.genders else 0.5
+
+        return 0.35 * proximity + 0.3 * price + 0.2 * facility + 0.15 * gender
+
+
 # ----------------- Reviews -----------------
 class Review(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, limit_choices_to={'role': 'student'})
@@ -70,16 +261,89 @@ class Review(models.Model):
     class Meta:
         unique_together = ('user', 'hostel')
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination of the per-hostel and global review feeds
+            models.Index(fields=['hostel', '-created_at', '-id'], name='review_hostel_feed_idx'),
+            models.Index(fields=['-created_at', '-id'], name='review_feed_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user} -> {self.hostel} ({self.rating})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember what was persisted so save() can apply a rating delta
+        instance._persisted_rating = instance.__dict__.get('rating')
+        instance._persisted_hostel_id = instance.__dict__.get('hostel_id')
+        return instance
+
     def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        # Update hostel's average rating
-        avg_rating = Review.objects.filter(hostel=self.hostel).aggregate(Avg('rating'))['rating__avg']
-        self.hostel.average_rating = avg_rating
-        self.hostel.save()
+        old_rating = getattr(self, '_persisted_rating', None)
+        old_hostel_id = getattr(self, '_persisted_hostel_id', None)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            # Keep the hostel's rating aggregates in step by deltas
+            if old_rating is None:
+                Hostel.apply_rating_delta(self.hostel_id, self.rating, 1)
+                RatingDistribution.apply_change(self.hostel_id, new_rating=self.rating)
+            elif old_hostel_id != self.hostel_id:
+                Hostel.apply_rating_delta(old_hostel_id, -old_rating, -1)
+                Hostel.apply_rating_delta(self.hostel_id, self.rating, 1)
+                RatingDistribution.apply_change(old_hostel_id, old_rating=old_rating)
+                RatingDistribution.apply_change(self.hostel_id, new_rating=self.rating)
+            elif old_rating != self.rating:
+                Hostel.apply_rating_delta(self.hostel_id, self.rating - old_rating, 0)
+                RatingDistribution.apply_change(self.hostel_id, old_rating=old_rating, new_rating=self.rating)
+        self._persisted_rating = self.rating
+        self._persisted_hostel_id = self.hostel_id
+
+    def delete(self, *args, **kwargs):
+        rating = getattr(self, '_persisted_rating', None) or self.rating
+        hostel_id = getattr(self, '_persisted_hostel_id', None) or self.hostel_id
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            Hostel.apply_rating_delta(hostel_id, -rating, -1)
+            RatingDistribution.apply_change(hostel_id, old_rating=rating)
+        return result
+
+
+class RatingDistribution(models.Model):
+    """Per-hostel star histogram, kept in step with Review writes"""
+    STAR_FIELDS = {1: 'stars_1', 2: 'stars_2', 3: 'stars_3', 4: 'stars_4', 5: 'stars_5'}
+
+    hostel = models.OneToOneField(Hostel, on_delete=models.CASCADE, related_name='rating_distribution')
+    stars_1 = models.IntegerField(default=0)
+    stars_2 = models.IntegerField(default=0)
+    stars_3 = models.IntegerField(default=0)
+    stars_4 = models.IntegerField(default=0)
+    stars_5 = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"Rating distribution for {self.hostel}"
+
+    @classmethod
+    def apply_change(cls, hostel_id, old_rating=None, new_rating=None):
+        """Move one review between buckets (None means added/removed)"""
+        deltas = dict.fromkeys(cls.STAR_FIELDS.values(), 0)
+        if old_rating is not None:
+            deltas[cls.STAR_FIELDS[old_rating]] -= 1
+        if new_rating is not None:
+            deltas[cls.STAR_FIELDS[new_rating]] += 1
+        bulk_increment(cls, ['hostel_id'], list(deltas), [{'hostel_id': hostel_id, **deltas}])
+
+    def as_dict(self):
+        """Counts and whole-number percentages keyed by star value"""
+        counts = {star: getattr(self, field) for star, field in self.STAR_FIELDS.items()}
+        total = sum(counts.values())
+        return {
+            'total': total,
+            'counts': counts,
+            'percentages': {
+                star: round(count * 100 / total) if total else 0
+                for star, count in counts.items()
+            },
+        }
 
 # ----------------- Favorites -----------------
 class Favorite(models.Model):
@@ -94,6 +358,46 @@ class Favorite(models.Model):
     def __str__(self):
         return f"{self.user} ♥ {self.hostel}"
 
+    @staticmethod
+    def _ids_cache_key(user_id):
+        return f"favorite_hostel_ids:{user_id}"
+
+    @classmethod
+    def status_for(cls, user_id, hostel_ids):
+        """Map each hostel id to whether the user has favorited it.
+
+        Answers from the user's cached favorite-id set when present, otherwise
+        with one IN query. Users who look up favorites often get their full
+        set cached so subsequent pages skip the database entirely.
+        """
+        hostel_ids = set(hostel_ids)
+        favorite_ids = cache.get(cls._ids_cache_key(user_id))
+        if favorite_ids is None:
+            lookup_key = f"favorite_lookups:{user_id}"
+            cache.add(lookup_key, 0, FAVORITE_IDS_CACHE_TIMEOUT)
+            try:
+                lookups = cache.incr(lookup_key)
+            except ValueError:  # evicted or expired since add(); just answer from the database
+                lookups = 0
+            if lookups >= FAVORITE_HOT_USER_LOOKUPS:
+                favorite_ids = set(
+                    cls.objects.filter(user_id=user_id).values_list('hostel_id', flat=True)
+                )
+                cache.set(cls._ids_cache_key(user_id), favorite_ids, FAVORITE_IDS_CACHE_TIMEOUT)
+            elif hostel_ids:
+                favorite_ids = set(
+                    cls.objects.filter(user_id=user_id, hostel_id__in=hostel_ids)
+                    .values_list('hostel_id', flat=True)
+                )
+            else:
+                favorite_ids = set()
+        return {hostel_id: hostel_id in favorite_ids for hostel_id in hostel_ids}
+
+    @classmethod
+    def invalidate_cache(cls, user_id):
+        """Drop the cached favorite-id set once the current transaction commits"""
+        transaction.on_commit(lambda: cache.delete(cls._ids_cache_key(user_id)))
+
 # ----------------- Interaction Logs -----------------
 class InteractionLog(models.Model):
     INTERACTION_TYPES = (
@@ -115,9 +419,63 @@ class InteractionLog(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        # The table is range-partitioned by month on created_at in PostgreSQL
+        # (migration 0014, see engagement/partitions.py)
+        indexes = [
+            models.Index(fields=['hostel', '-created_at'], name='interaction_hostel_time_idx'),
+            models.Index(fields=['created_at'], name='interaction_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user} {self.interaction_type} {self.hostel}"
+
+    @classmethod
+    def apply_counters(cls, logs):
+        """
+        Fold newly created logs into HostelAnalytics and today's DailyAnalytics,
+        aggregating per hostel first so each table takes a single upsert.
+        Call inside a transaction.
+        """
+        views, contacts = Counter(), Counter()
+        viewers = defaultdict(set)
+        for log in logs:
+            if log.interaction_type == 'view':
+                views[log.hostel_id] += 1
+                viewers[log.hostel_id].add(log.user_id)
+            elif log.interaction_type in CONTACT_INTERACTIONS:
+                contacts[log.hostel_id] += 1
+
+        hostel_ids = views.keys() | contacts.keys()
+        if not hostel_ids:
+            return
+
+        today = timezone.now().date()
+        bulk_increment(
+            HostelAnalytics, ['hostel_id'], ['total_views', 'total_contacts'],
+            [
+                {'hostel_id': hostel_id, 'total_views': views[hostel_id], 'total_contacts': contacts[hostel_id]}
+                for hostel_id in hostel_ids
+            ],
+            touch_fields=['last_updated']
+        )
+        bulk_increment(
+            DailyAnalytics, ['hostel_id', 'date'], ['views', 'contacts'],
+            [
+                {'hostel_id': hostel_id, 'date': today, 'views': views[hostel_id], 'contacts': contacts[hostel_id]}
+                for hostel_id in hostel_ids
+            ],
+            touch_fields=['updated_at']
+        )
+        if viewers:
+            DailyAnalytics.add_visitors(viewers, today)
+        TrendingScore.record({
+            hostel_id: views[hostel_id] * TRENDING_WEIGHTS['view']
+            + contacts[hostel_id] * TRENDING_WEIGHTS['contact']
+            for hostel_id in hostel_ids
+        })
+
+
+CONTACT_INTERACTIONS = ['whatsapp', 'call']
         
 
 # ----------------- Analytics -----------------
@@ -131,26 +489,29 @@ class HostelAnalytics(models.Model):
     def __str__(self):
         return f"Analytics for {self.hostel}"
 
+    @classmethod
+    def _increment(cls, hostel_id, **deltas):
+        """Apply counter deltas atomically, creating the row if needed"""
+        bulk_increment(
+            cls, ['hostel_id'], list(deltas),
+            [{'hostel_id': hostel_id, **deltas}],
+            touch_fields=['last_updated']
+        )
+
     @classmethod
     def increment_view(cls, hostel_id):
         """Increment view count for a hostel"""
-        analytics, _ = cls.objects.get_or_create(hostel_id=hostel_id)
-        analytics.total_views = F('total_views') + 1
-        analytics.save()
+        cls._increment(hostel_id, total_views=1)
 
     @classmethod
     def increment_contact(cls, hostel_id):
         """Increment contact count for a hostel"""
-        analytics, _ = cls.objects.get_or_create(hostel_id=hostel_id)
-        analytics.total_contacts = F('total_contacts') + 1
-        analytics.save()
+        cls._increment(hostel_id, total_contacts=1)
 
     @classmethod
-    def update_favorites(cls, hostel_id):
-        """Update favorites count for a hostel"""
-        analytics, _ = cls.objects.get_or_create(hostel_id=hostel_id)
-        analytics.total_favorites = Favorite.objects.filter(hostel_id=hostel_id).count()
-        analytics.save()
+    def adjust_favorites(cls, hostel_id, delta):
+        """Add or remove favorites from a hostel's running total"""
+        cls._increment(hostel_id, total_favorites=delta)
 
 
 class DailyAnalytics(models.Model):
@@ -160,6 +521,10 @@ class DailyAnalytics(models.Model):
     contacts = models.IntegerField(default=0)
     favorites = models.IntegerField(default=0)
     searches_appeared = models.IntegerField(default=0)  # Number of times shown in search results
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)  # Drives incremental summaries
+    # Approximate distinct viewers: 1 KB HyperLogLog sketch and its estimate (see hll.py)
+    visitor_sketch = models.BinaryField(null=True, blank=True)
+    unique_visitors = models.IntegerField(default=0)
     
     class Meta:
         unique_together = ('hostel', 'date')
@@ -168,41 +533,557 @@ class DailyAnalytics(models.Model):
     def __str__(self):
         return f"Daily Analytics for {self.hostel} on {self.date}"
 
+    @classmethod
+    def _increment(cls, hostel_id, date=None, **deltas):
+        """Apply counter deltas to a day's bucket (today by default)"""
+        date = date or timezone.now().date()
+        bulk_increment(
+            cls, ['hostel_id', 'date'], list(deltas),
+            [{'hostel_id': hostel_id, 'date': date, **deltas}],
+            touch_fields=['updated_at']
+        )
+
+    @classmethod
+    def add_visitors(cls, visitors, date=None):
+        """
+        Fold viewer ids into each hostel's sketch for a day.
+        visitors maps hostel_id -> iterable of user ids; the day's rows must
+        already exist. Call inside a transaction (rows are locked).
+        """
+        date = date or timezone.now().date()
+        rows = list(
+            cls.objects.select_for_update()
+            .filter(hostel_id__in=list(visitors), date=date)
+            .only('id', 'hostel_id', 'visitor_sketch', 'unique_visitors')
+            .order_by('hostel_id')
+        )
+        for row in rows:
+            sketch = HyperLogLog.from_bytes(row.visitor_sketch).update(visitors[row.hostel_id])
+            row.visitor_sketch = sketch.to_bytes()
+            row.unique_visitors = sketch.count()
+        cls.objects.bulk_update(rows, ['visitor_sketch', 'unique_visitors'])
+
     @classmethod
     def log_view(cls, hostel_id):
         """Log a view for today"""
-        today = timezone.now().date()
-        analytics, _ = cls.objects.get_or_create(
-            hostel_id=hostel_id,
-            date=today,
-            defaults={'views': 0}
-        )
-        analytics.views = F('views') + 1
-        analytics.save()
+        cls._increment(hostel_id, views=1)
 
     @classmethod
     def log_contact(cls, hostel_id):
         """Log a contact for today"""
-        today = timezone.now().date()
-        analytics, _ = cls.objects.get_or_create(
-            hostel_id=hostel_id,
-            date=today,
-            defaults={'contacts': 0}
-        )
-        analytics.contacts = F('contacts') + 1
-        analytics.save()
+        cls._increment(hostel_id, contacts=1)
+
+    @classmethod
+    def log_favorite(cls, hostel_id, delta=1, date=None):
+        """Log a favorite added (or removed, with a negative delta) on a day"""
+        cls._increment(hostel_id, date=date, favorites=delta)
 
     @classmethod
     def log_search_appearance(cls, hostel_id):
         """Log when hostel appears in search results"""
-        today = timezone.now().date()
-        analytics, _ = cls.objects.get_or_create(
-            hostel_id=hostel_id,
-            date=today,
-            defaults={'searches_appeared': 0}
+        cls._increment(hostel_id, searches_appeared=1)
+
+
+class HourlyAnalytics(models.Model):
+    """Per-hour rollup of InteractionLog, filled by rollup_interactions()"""
+    hostel = models.ForeignKey(Hostel, on_delete=models.CASCADE, related_name='hourly_analytics')
+    date = models.DateField()
+    hour = models.PositiveSmallIntegerField(validators=[MaxValueValidator(23)])
+    views = models.IntegerField(default=0)
+    contacts = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('hostel', 'date', 'hour')
+        ordering = ['-date', 'hour']
+
+    def __str__(self):
+        return f"Hourly Analytics for {self.hostel} on {self.date} {self.hour:02d}:00"
+
+    @classmethod
+    def rollup_interactions(cls, batch_size=50000, lag=timedelta(minutes=1)):
+        """
+        Fold InteractionLog rows added since the last run into hourly buckets.
+        Rows younger than lag are left for the next run so ids still held by
+        uncommitted transactions are not skipped. Returns rows consumed.
+        """
+        processed = 0
+        with transaction.atomic():
+            checkpoint = RollupCheckpoint.acquire('hourly_analytics')
+            target = InteractionLog.objects.filter(
+                id__gt=checkpoint.position,
+                created_at__lte=timezone.now() - lag
+            ).aggregate(last_id=models.Max('id'))['last_id']
+
+            while target and checkpoint.position < target:
+                upper = min(checkpoint.position + batch_size, target)
+                batch = InteractionLog.objects.filter(id__gt=checkpoint.position, id__lte=upper)
+                rows = batch.annotate(
+                    day=TruncDate('created_at'), hour=ExtractHour('created_at')
+                ).values('hostel_id', 'day', 'hour').annotate(
+                    views=Count('id', filter=Q(interaction_type='view')),
+                    contacts=Count('id', filter=Q(interaction_type__in=CONTACT_INTERACTIONS)),
+                    events=Count('id'),
+                ).order_by()
+
+                buckets = []
+                for row in rows:
+                    processed += row['events']
+                    if row['views'] or row['contacts']:
+                        buckets.append({
+                            'hostel_id': row['hostel_id'], 'date': row['day'], 'hour': row['hour'],
+                            'views': row['views'], 'contacts': row['contacts'],
+                        })
+                bulk_increment(cls, ['hostel_id', 'date', 'hour'], ['views', 'contacts'], buckets)
+                checkpoint.position = upper
+
+            checkpoint.last_run_at = timezone.now()
+            checkpoint.save(update_fields=['position', 'last_run_at', 'updated_at'])
+        return processed
+
+    @classmethod
+    def peak_hours(cls, hostel_ids, since):
+        """Views per hour of day (0-23) since a date; reads at most 24 x days rows per hostel"""
+        return cls.peak_hours_for({'hostel_id__in': hostel_ids}, since)
+
+    @classmethod
+    def peak_hours_for(cls, hostel_filter, since):
+        """peak_hours() for an arbitrary hostel filter, e.g. {'hostel__owner': user}"""
+        totals = dict(
+            cls.objects.filter(**hostel_filter, date__gte=since)
+            .values_list('hour').annotate(total=Sum('views')).order_by()
         )
-        analytics.searches_appeared = F('searches_appeared') + 1
-        analytics.save()
+        return {hour: totals.get(hour, 0) for hour in range(24)}
+
+
+class SearchAreaAnalytics(models.Model):
+    """
+    Daily search counts per geohash cell, filled by rollup_searches().
+    latitude/longitude hold the cell centre so radius queries can use a
+    bounding-box index scan instead of touching SearchHistory.
+    """
+    cell = models.CharField(max_length=12)  # geohash at geohash.CELL_PRECISION
+    date = models.DateField()
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+    searches = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('cell', 'date')
+        ordering = ['-date', 'cell']
+        indexes = [
+            models.Index(fields=['date'], name='search_area_date_idx'),
+            models.Index(fields=['latitude', 'longitude'], name='search_area_point_idx'),
+        ]
+
+    def __str__(self):
+        return f"Searches in {self.cell} on {self.date}"
+
+    @classmethod
+    def rollup_searches(cls, batch_size=50000, lag=timedelta(minutes=1)):
+        """
+        Bucket SearchHistory rows added since the last run into (cell, day)
+        counts. Same checkpoint/lag scheme as HourlyAnalytics.rollup_interactions.
+        Returns rows consumed.
+        """
+        processed = 0
+        with transaction.atomic():
+            checkpoint = RollupCheckpoint.acquire('search_areas')
+            target = SearchHistory.objects.filter(
+                id__gt=checkpoint.position,
+                created_at__lte=timezone.now() - lag
+            ).aggregate(last_id=models.Max('id'))['last_id']
+
+            while target and checkpoint.position < target:
+                upper = min(checkpoint.position + batch_size, target)
+                counts = Counter()
+                searches = SearchHistory.objects.filter(
+                    id__gt=checkpoint.position, id__lte=upper
+                ).values_list('latitude', 'longitude', 'created_at')
+                for latitude, longitude, created_at in searches.iterator(chunk_size=5000):
+                    counts[geohash.encode(latitude, longitude), timezone.localdate(created_at)] += 1
+                    processed += 1
+
+                buckets = []
+                for (cell, day), total in counts.items():
+                    latitude, longitude = geohash.center(cell)
+                    buckets.append({
+                        'cell': cell, 'date': day, 'latitude': latitude,
+                        'longitude': longitude, 'searches': total,
+                    })
+                bulk_increment(cls, ['cell', 'date'], ['searches'], buckets)
+                checkpoint.position = upper
+
+            checkpoint.last_run_at = timezone.now()
+            checkpoint.save(update_fields=['position', 'last_run_at', 'updated_at'])
+        return processed
+
+    @classmethod
+    def heatmap(cls, since, precision=geohash.CELL_PRECISION, bbox=None):
+        """
+        Searches per cell since a date, coarsened to precision characters.
+        bbox is an optional (min_lat, min_lon, max_lat, max_lon).
+        Returns dicts of cell, latitude, longitude, searches, busiest first.
+        """
+        rows = cls.objects.filter(date__gte=since)
+        if bbox:
+            min_lat, min_lon, max_lat, max_lon = bbox
+            rows = rows.filter(latitude__range=(min_lat, max_lat), longitude__range=(min_lon, max_lon))
+        rows = rows.annotate(area=Substr('cell', 1, precision)).values('area').annotate(
+            total=Sum('searches')
+        ).order_by('-total', 'area')
+
+        areas = []
+        for row in rows:
+            latitude, longitude = geohash.center(row['area'])
+            areas.append({
+                'cell': row['area'], 'latitude': latitude,
+                'longitude': longitude, 'searches': row['total'],
+            })
+        return areas
+
+    @classmethod
+    def searches_near(cls, points, radius_km, since):
+        """
+        Cells whose centre lies within radius_km of any (latitude, longitude)
+        in points, with their searches since a date, busiest first. One
+        query: the union of the points' bounding boxes, refined in Python.
+        Accurate to about half a cell (~0.6 km) at the circle's edge.
+        """
+        points = list(points)
+        if not points:
+            return []
+
+        region = Q()
+        for latitude, longitude in points:
+            min_lat, min_lon, max_lat, max_lon = geohash.bounding_box(latitude, longitude, radius_km)
+            region |= Q(latitude__range=(min_lat, max_lat), longitude__range=(min_lon, max_lon))
+        rows = cls.objects.filter(region, date__gte=since).values(
+            'cell', 'latitude', 'longitude'
+        ).annotate(total=Sum('searches')).order_by('-total', 'cell')
+
+        return [
+            {
+                'cell': row['cell'], 'latitude': row['latitude'],
+                'longitude': row['longitude'], 'searches': row['total'],
+            }
+            for row in rows
+            if any(
+                geohash.distance_km(latitude, longitude, row['latitude'], row['longitude']) <= radius_km
+                for latitude, longitude in points
+            )
+        ]
+
+
+class DailyFunnel(models.Model):
+    """
+    Per-hostel, per-day search -> view -> favorite -> contact funnel,
+    filled incrementally by rollup(). search_views/search_contacts are the
+    views/contacts attributed to a search through InteractionLog.search_query.
+    """
+    FUNNEL_FIELDS = ['appearances', 'views', 'search_views', 'favorites', 'contacts', 'search_contacts']
+
+    hostel = models.ForeignKey(Hostel, on_delete=models.CASCADE, related_name='daily_funnels')
+    date = models.DateField()
+    appearances = models.IntegerField(default=0)  # times shown in search results
+    views = models.IntegerField(default=0)
+    search_views = models.IntegerField(default=0)  # views from a search
+    favorites = models.IntegerField(default=0)
+    contacts = models.IntegerField(default=0)
+    search_contacts = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('hostel', 'date')
+        ordering = ['-date']
+        indexes = [
+            models.Index(fields=['date'], name='daily_funnel_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"Funnel for {self.hostel} on {self.date}"
+
+    @staticmethod
+    def rates(totals):
+        """Step conversion percentages for a dict of funnel counts"""
+        def percent(part, whole):
+            return round(part / whole * 100, 2) if whole else 0
+        return {
+            'search_click_rate': percent(totals['search_views'], totals['appearances']),
+            'view_to_favorite_rate': percent(totals['favorites'], totals['views']),
+            'view_to_contact_rate': percent(totals['contacts'], totals['views']),
+            'search_to_contact_rate': percent(totals['search_contacts'], totals['appearances']),
+        }
+
+    @classmethod
+    def rollup(cls, batch_size=50000, lag=timedelta(minutes=1)):
+        """
+        Fold rows added since the last run into funnel rows: InteractionLog
+        by id checkpoint, and search appearances and favorites by copying
+        DailyAnalytics rows updated since the previous run, so favorite
+        removals count too. Rows younger than lag wait for the next run.
+        Returns source rows consumed.
+        """
+        processed = 0
+        cutoff = timezone.now() - lag
+        with transaction.atomic():
+            checkpoint = RollupCheckpoint.acquire('funnel_interactions')
+            target = InteractionLog.objects.filter(
+                id__gt=checkpoint.position, created_at__lte=cutoff
+            ).aggregate(last_id=models.Max('id'))['last_id']
+            from_search = Q(search_query__isnull=False)
+            while target and checkpoint.position < target:
+                upper = min(checkpoint.position + batch_size, target)
+                rows = InteractionLog.objects.filter(
+                    id__gt=checkpoint.position, id__lte=upper
+                ).annotate(day=TruncDate('created_at')).values('hostel_id', 'day').annotate(
+                    views=Count('id', filter=Q(interaction_type='view')),
+                    search_views=Count('id', filter=from_search & Q(interaction_type='view')),
+                    contacts=Count('id', filter=Q(interaction_type__in=CONTACT_INTERACTIONS)),
+                    search_contacts=Count('id', filter=from_search & Q(interaction_type__in=CONTACT_INTERACTIONS)),
+                    events=Count('id'),
+                ).order_by()
+                buckets = []
+                for row in rows:
+                    processed += row.pop('events')
+                    row['date'] = row.pop('day')
+                    buckets.append(row)
+                bulk_increment(cls, ['hostel_id', 'date'], ['views', 'search_views', 'contacts', 'search_contacts'], buckets)
+                checkpoint.position = upper
+            checkpoint.last_run_at = timezone.now()
+            checkpoint.save(update_fields=['position', 'last_run_at', 'updated_at'])
+
+            # Appearances and net favorites (adds minus removals, charged to
+            # the day the favorite was added) are only counted in
+            # DailyAnalytics; copy the totals of the days touched since the
+            # last run
+            checkpoint = RollupCheckpoint.acquire('funnel_daily_analytics')
+            changed = DailyAnalytics.objects.all()
+            if checkpoint.last_run_at:
+                changed = changed.filter(updated_at__gte=checkpoint.last_run_at)
+            else:
+                changed = changed.filter(~Q(searches_appeared=0) | ~Q(favorites=0))
+            buckets = []
+            for hostel_id, day, appearances, favorites in changed.values_list(
+                'hostel_id', 'date', 'searches_appeared', 'favorites'
+            ).order_by().iterator(chunk_size=5000):
+                buckets.append({'hostel_id': hostel_id, 'date': day, 'appearances': appearances, 'favorites': favorites})
+                processed += 1
+                if len(buckets) >= batch_size:
+                    bulk_increment(cls, ['hostel_id', 'date'], [], buckets, touch_fields=['appearances', 'favorites'])
+                    buckets = []
+            bulk_increment(cls, ['hostel_id', 'date'], [], buckets, touch_fields=['appearances', 'favorites'])
+            # Overlap by lag so late commits are re-read; the copy is idempotent
+            checkpoint.last_run_at = cutoff
+            checkpoint.save(update_fields=['last_run_at', 'updated_at'])
+        return processed
+
+    @classmethod
+    def totals(cls, queryset):
+        """Summed funnel counts plus step rates for a DailyFunnel queryset"""
+        totals = queryset.aggregate(**{
+            name: Coalesce(Sum(name), 0) for name in cls.FUNNEL_FIELDS
+        })
+        return {**totals, **cls.rates(totals)}
+
+
+class TrendingScore(models.Model):
+    """
+    Exponentially decayed activity score per hostel (see TRENDING_EPOCH).
+    score is stored in epoch units; current_score() converts it to
+    "weighted events as of now", halving every TRENDING_HALF_LIFE.
+    """
+    hostel = models.OneToOneField(Hostel, on_delete=models.CASCADE, related_name='trending_score')
+    score = models.FloatField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-score']
+        indexes = [
+            models.Index(fields=['-score'], name='trending_score_idx'),
+        ]
+
+    def __str__(self):
+        return f"Trending score for {self.hostel}"
+
+    @staticmethod
+    def epoch(share_lock=False):
+        """
+        The epoch scores are currently stored against. share_lock keeps the
+        checkpoint row share-locked until commit (PostgreSQL), so rescale()
+        waits for writes that already read the old epoch; call inside a transaction.
+        """
+        table = connection.ops.quote_name(RollupCheckpoint._meta.db_table)
+        lock = ' FOR SHARE' if share_lock and connection.vendor == 'postgresql' else ''
+        checkpoint = next(iter(RollupCheckpoint.objects.raw(
+            f"SELECT id, last_run_at FROM {table} WHERE name = %s{lock}", [TRENDING_EPOCH_CHECKPOINT]
+        )), None)
+        return (checkpoint and checkpoint.last_run_at) or TRENDING_EPOCH
+
+    @classmethod
+    def growth(cls, at=None, epoch=None):
+        """Weight multiplier for an event at a time: 2**(elapsed half-lives since the epoch)"""
+        elapsed = (at or timezone.now()) - (epoch or cls.epoch())
+        return 2.0 ** (elapsed / TRENDING_HALF_LIFE)
+
+    @classmethod
+    def record(cls, weights, at=None):
+        """Add {hostel_id: weighted event count} in one upsert"""
+        rows = [(hostel_id, weight) for hostel_id, weight in weights.items() if weight]
+        if not rows:
+            return
+        with transaction.atomic():
+            growth = cls.growth(at, cls.epoch(share_lock=True))
+            bulk_increment(cls, ['hostel_id'], ['score'], [
+                {'hostel_id': hostel_id, 'score': weight * growth} for hostel_id, weight in rows
+            ], touch_fields=['updated_at'])
+
+    @classmethod
+    def rescale(cls, to=None):
+        """
+        Move the epoch forward to `to` (default now), dividing every stored
+        score by the growth in between in one UPDATE so current scores and
+        ordering are unchanged. Returns the factor scores were divided by.
+        """
+        to = to or timezone.now()
+        with transaction.atomic():
+            checkpoint = RollupCheckpoint.acquire(TRENDING_EPOCH_CHECKPOINT)
+            epoch = checkpoint.last_run_at or TRENDING_EPOCH
+            if to <= epoch:
+                return 1.0
+            factor = cls.growth(to, epoch)
+            cls.objects.update(score=F('score') / factor)
+            checkpoint.last_run_at = to
+            checkpoint.save(update_fields=['last_run_at', 'updated_at'])
+        return factor
+
+    def current_score(self, now=None, epoch=None):
+        return self.score / self.growth(now, epoch)
+
+    @staticmethod
+    def cache_key(city):
+        return f'trending:{city or "all"}'
+
+    @classmethod
+    def top(cls, city=None, limit=TRENDING_TOP_N):
+        """Top hostels for a city (or everywhere), served from the per-city cache"""
+        key = cls.cache_key(city)
+        entries = cache.get(key)
+        if entries is None:
+            entries = cls.build_top(city, limit)
+            cache.set(key, entries, TRENDING_CACHE_TIMEOUT)
+        return entries
+
+    @classmethod
+    def build_top(cls, city=None, limit=TRENDING_TOP_N):
+        """Recompute a city's top-N list from the score index"""
+        scores = cls.objects.filter(score__gt=0).select_related('hostel')
+        if city:
+            scores = scores.filter(hostel__city=city)
+        now, epoch = timezone.now(), cls.epoch()
+        return [
+            {
+                'hostel_id': entry.hostel_id,
+                'name': entry.hostel.name,
+                'city': entry.hostel.city,
+                'gender': entry.hostel.gender,
+                'average_rating': entry.hostel.average_rating,
+                'rating_count': entry.hostel.rating_count,
+                'score': round(entry.current_score(now, epoch), 3),
+            }
+            for entry in scores.order_by('-score')[:limit]
+        ]
+
+    @classmethod
+    def refresh_cache(cls, cities):
+        """Rebuild the cached top-N for each city plus the global list"""
+        for city in [None, *cities]:
+            cache.set(cls.cache_key(city), cls.build_top(city), TRENDING_CACHE_TIMEOUT)
+
+
+class SimilarHostels(models.Model):
+    """
+    Precomputed most-similar hostels in the same city (see similarity.py),
+    stored as display-ready entries so a hostel page needs one indexed read.
+    """
+    hostel = models.OneToOneField(Hostel, on_delete=models.CASCADE, related_name='similar_hostels')
+    city = models.CharField(max_length=10, db_index=True)  # city the entries were computed in
+    entries = models.JSONField(default=list)  # closest first
+    computed_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Similar hostels for {self.hostel}"
+
+    @classmethod
+    def rebuild_city(cls, city, k=SIMILAR_HOSTELS_K):
+        """
+        Recompute every hostel's neighbours in a city; returns hostels written.
+        Rows the rebuild did not write (hostels that moved to another city)
+        are deleted in the same transaction, so readers never see a list
+        computed against a city the hostel has left.
+        """
+        results = similar_hostels_for_city(city, k)
+        with transaction.atomic():
+            cls.objects.bulk_create(
+                [cls(hostel_id=hostel_id, city=city, entries=entries) for hostel_id, entries in results.items()],
+                batch_size=500,
+                update_conflicts=True,
+                unique_fields=['hostel'],
+                update_fields=['city', 'entries', 'computed_at']
+            )
+            cls.objects.filter(city=city).exclude(hostel_id__in=list(results)).delete()
+        return len(results)
+
+
+class AnalyticsExport(models.Model):
+    """
+    Background export of an owner's analytics to a gzip CSV file.
+    Created by the API and built by the process_analytics_exports command.
+    """
+    KIND_CHOICES = (
+        ('daily', 'Daily Analytics'),
+        ('interactions', 'Interaction History')
+    )
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed')
+    )
+
+    owner = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        limit_choices_to={'role': 'owner'},
+        related_name='analytics_exports'
+    )
+    hostel = models.ForeignKey(  # None exports every hostel the owner has
+        Hostel,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='analytics_exports'
+    )
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    start_date = models.DateField()
+    end_date = models.DateField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', db_index=True)
+    file_path = models.CharField(max_length=255, blank=True)
+    row_count = models.IntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)  # claims so far, see exports.claim_next_job
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.get_kind_display()} export for {self.owner} ({self.status})"
+
+    def hostel_ids(self):
+        if self.hostel_id:
+            return [self.hostel_id]
+        return list(Hostel.objects.filter(owner_id=self.owner_id).values_list('id', flat=True))
 
 
 # ----------------- Reports -----------------
@@ -266,6 +1147,7 @@ class AnalyticsSummary(models.Model):
     total_contacts = models.IntegerField(default=0)
     total_favorites = models.IntegerField(default=0)
     total_searches = models.IntegerField(default=0)
+    unique_visitors = models.IntegerField(default=0)  # merged daily HyperLogLog sketches
     conversion_rate = models.FloatField(default=0)  # contacts/views * 100
     
     class Meta:
@@ -275,14 +1157,25 @@ class AnalyticsSummary(models.Model):
     def __str__(self):
         return f"{self.get_period_type_display()} Summary for {self.hostel} ({self.start_date})"
 
+    @staticmethod
+    def period_start(period_type, day):
+        """First day of the week (Monday) or month containing day"""
+        if period_type == 'W':
+            return day - timedelta(days=day.weekday())
+        return day.replace(day=1)
+
+    @staticmethod
+    def period_end(period_type, start_date):
+        """Last day of the period starting at start_date"""
+        if period_type == 'W':
+            return start_date + timedelta(days=6)
+        next_month = start_date.replace(day=28) + timedelta(days=4)
+        return next_month - timedelta(days=next_month.day)
+
     @classmethod
     def generate_summary(cls, hostel_id, period_type, start_date):
         """Generate analytics summary for a given period"""
-        if period_type == 'W':
-            end_date = start_date + timedelta(days=6)
-        else:  # Monthly
-            next_month = start_date.replace(day=28) + timedelta(days=4)
-            end_date = next_month - timedelta(days=next_month.day)
+        end_date = cls.period_end(period_type, start_date)
         
         # Aggregate daily analytics
         daily_data = DailyAnalytics.objects.filter(
@@ -299,6 +1192,14 @@ class AnalyticsSummary(models.Model):
         views = daily_data['total_views'] or 0
         contacts = daily_data['total_contacts'] or 0
         conversion_rate = (contacts / views * 100) if views > 0 else 0
+
+        # Merge the period's daily visitor sketches instead of rescanning logs
+        sketches = DailyAnalytics.objects.filter(
+            hostel_id=hostel_id,
+            date__range=[start_date, end_date],
+            visitor_sketch__isnull=False
+        ).values_list('visitor_sketch', flat=True)
+        unique_visitors = HyperLogLog.merged(HyperLogLog.from_bytes(s) for s in sketches).count()
         
         # Create or update summary
         summary, _ = cls.objects.update_or_create(
@@ -311,10 +1212,127 @@ class AnalyticsSummary(models.Model):
                 'total_contacts': daily_data['total_contacts'] or 0,
                 'total_favorites': daily_data['total_favorites'] or 0,
                 'total_searches': daily_data['total_searches'] or 0,
+                'unique_visitors': unique_visitors,
                 'conversion_rate': conversion_rate
             }
         )
         return summary
 
+    @classmethod
+    def generate_all(cls, period_type, start_date, batch_size=1000):
+        """
+        Generate summaries for every hostel with activity in a period.
+        One GROUP BY hostel_id over DailyAnalytics, then a bulk upsert.
+        """
+        end_date = cls.period_end(period_type, start_date)
+        rows = DailyAnalytics.objects.filter(
+            date__range=[start_date, end_date]
+        ).values('hostel_id').annotate(
+            total_views=Sum('views'),
+            total_contacts=Sum('contacts'),
+            total_favorites=Sum('favorites'),
+            total_searches=Sum('searches_appeared')
+        ).order_by()
+
+        visitors = defaultdict(HyperLogLog)
+        sketches = DailyAnalytics.objects.filter(
+            date__range=[start_date, end_date], visitor_sketch__isnull=False
+        ).values_list('hostel_id', 'visitor_sketch')
+        for hostel_id, sketch in sketches.iterator(chunk_size=2000):
+            visitors[hostel_id].merge(HyperLogLog.from_bytes(sketch))
+
+        summaries = [
+            cls(
+                hostel_id=row['hostel_id'],
+                period_type=period_type,
+                start_date=start_date,
+                end_date=end_date,
+                total_views=row['total_views'],
+                total_contacts=row['total_contacts'],
+                total_favorites=row['total_favorites'],
+                total_searches=row['total_searches'],
+                unique_visitors=visitors[row['hostel_id']].count() if row['hostel_id'] in visitors else 0,
+                conversion_rate=(
+                    row['total_contacts'] / row['total_views'] * 100
+                    if row['total_views'] > 0 else 0
+                )
+            )
+            for row in rows
+        ]
+        cls.objects.bulk_create(
+            summaries,
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=['hostel', 'period_type', 'start_date'],
+            update_fields=[
+                'end_date', 'total_views', 'total_contacts', 'total_favorites',
+                'total_searches', 'unique_visitors', 'conversion_rate'
+            ],
+        )
+        return len(summaries)
+
+    @classmethod
+    def changed_periods(cls, since):
+        """(period_type, start_date) pairs whose daily rows changed after since"""
+        dates = DailyAnalytics.objects.filter(
+            updated_at__gt=since
+        ).values_list('date', flat=True).distinct().order_by()
+        return sorted({
+            (period_type, cls.period_start(period_type, day))
+            for day in dates
+            for period_type, _ in cls.PERIOD_CHOICES
+        })
+
+    @classmethod
+    def generate_periods(cls, period_types, day=None, incremental=False, lag=timedelta(minutes=5)):
+        """
+        Regenerate summaries for every hostel.
+        Non-incremental runs rebuild the periods containing day (default today);
+        incremental runs rebuild only periods touched since the previous run,
+        re-reading the last lag before it so rows committed late by
+        transactions that started earlier are not missed (regeneration is
+        idempotent). Returns a list of (period_type, start_date, summaries_written).
+        """
+        if not incremental:
+            day = day or timezone.now().date()
+            return [
+                (period_type, start, cls.generate_all(period_type, start))
+                for period_type in period_types
+                for start in [cls.period_start(period_type, day)]
+            ]
+
+        with transaction.atomic():
+            checkpoint = RollupCheckpoint.acquire('analytics_summaries')
+            started_at = timezone.now()
+            if checkpoint.last_run_at:
+                since = checkpoint.last_run_at - lag
+            else:
+                since = timezone.make_aware(datetime.min + timedelta(days=1))
+            results = [
+                (period_type, start, cls.generate_all(period_type, start))
+                for period_type, start in cls.changed_periods(since)
+                if period_type in period_types
+            ]
+            checkpoint.last_run_at = started_at
+            checkpoint.save(update_fields=['last_run_at', 'updated_at'])
+        return results
+
+
+class RollupCheckpoint(models.Model):
+    """Progress marker for incremental analytics jobs, one row per job"""
+    name = models.CharField(max_length=50, unique=True)
+    position = models.BigIntegerField(default=0)  # e.g. last processed row id
+    last_run_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.position}"
+
+    @classmethod
+    def acquire(cls, name):
+        """Lock and return the job's checkpoint; call inside a transaction"""
+        cls.objects.get_or_create(name=name)
+        return cls.objects.select_for_update().get(name=name)
+
 
 # This section was removed as it was duplicated
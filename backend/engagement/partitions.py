@@ -0,0 +1,209 @@
+"""
+Monthly range partitions for InteractionLog (PostgreSQL only).
+
+The parent table is partitioned on created_at by migration 0014. Each
+month lives in engagement_interactionlog_pYYYY_MM covering
+[first day of month, first day of next month); anything outside the
+created months falls into engagement_interactionlog_default.
+See INTERACTION_ARCHIVE.md for the retention/archival format.
+"""
+import gzip
+import hashlib
+import json
+import os
+from datetime import date
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+PARENT_TABLE = 'engagement_interactionlog'
+DEFAULT_PARTITION = f'{PARENT_TABLE}_default'
+ARCHIVE_FORMAT_VERSION = 1
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def add_months(day, months):
+    """First day of the month `months` away from day's month"""
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f'{PARENT_TABLE}_p{month.year:04d}_{month.month:02d}'
+
+
+def is_partitioned(cursor):
+    cursor.execute(
+        "SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid "
+        "WHERE c.relname = %s",
+        [PARENT_TABLE]
+    )
+    return cursor.fetchone() is not None
+
+
+def list_partitions(cursor):
+    """Attached monthly partitions as a sorted list of (month, table name)"""
+    cursor.execute(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = %s",
+        [PARENT_TABLE]
+    )
+    prefix = f'{PARENT_TABLE}_p'
+    partitions = []
+    for (name,) in cursor.fetchall():
+        if name.startswith(prefix):
+            year, month = name[len(prefix):].split('_')
+            partitions.append((date(int(year), int(month), 1), name))
+    return sorted(partitions)
+
+
+def create_partition(cursor, month):
+    """
+    Create the partition for month if missing; returns True when created.
+
+    PostgreSQL refuses to create a partition while the DEFAULT partition
+    holds rows in its range, so those rows are moved into the new partition
+    in the same transaction: detach the default, create the month, copy the
+    rows across, delete them from the default and attach it again.
+    """
+    name = partition_name(month)
+    cursor.execute("SELECT to_regclass(%s)", [name])
+    if cursor.fetchone()[0] is not None:
+        return False
+    qn = connection.ops.quote_name
+    start, end = month.isoformat(), add_months(month, 1).isoformat()
+    in_range = "WHERE created_at >= %s AND created_at < %s"
+
+    with transaction.atomic():
+        cursor.execute(f"SELECT 1 FROM {qn(DEFAULT_PARTITION)} {in_range} LIMIT 1", [start, end])
+        stray = cursor.fetchone() is not None
+        if stray:
+            detach_partition(cursor, DEFAULT_PARTITION)
+        # DDL cannot take bound parameters; the bounds are generated dates
+        cursor.execute(
+            f"CREATE TABLE {qn(name)} PARTITION OF {qn(PARENT_TABLE)} "
+            f"FOR VALUES FROM ('{start}') TO ('{end}')"
+        )
+        if stray:
+            columns = ', '.join(qn(column) for column in table_columns(cursor, PARENT_TABLE))
+            cursor.execute(
+                f"INSERT INTO {qn(name)} ({columns}) "
+                f"SELECT {columns} FROM {qn(DEFAULT_PARTITION)} {in_range}",
+                [start, end]
+            )
+            cursor.execute(f"DELETE FROM {qn(DEFAULT_PARTITION)} {in_range}", [start, end])
+            cursor.execute(
+                f"ALTER TABLE {qn(PARENT_TABLE)} ATTACH PARTITION {qn(DEFAULT_PARTITION)} DEFAULT"
+            )
+    return True
+
+
+def ensure_partitions(cursor, months_ahead, today=None):
+    """Make sure partitions exist from this month through months_ahead"""
+    current = month_start(today or timezone.now().date())
+    return [
+        partition_name(add_months(current, offset))
+        for offset in range(months_ahead + 1)
+        if create_partition(cursor, add_months(current, offset))
+    ]
+
+
+def default_partition_rows(cursor):
+    qn = connection.ops.quote_name
+    cursor.execute(f"SELECT count(*) FROM {qn(DEFAULT_PARTITION)}")
+    return cursor.fetchone()[0]
+
+
+def table_columns(cursor, name):
+    cursor.execute(
+        "SELECT attname FROM pg_attribute WHERE attrelid = to_regclass(%s) "
+        "AND attnum > 0 AND NOT attisdropped ORDER BY attnum",
+        [name]
+    )
+    return [row[0] for row in cursor.fetchall()]
+
+
+def detach_partition(cursor, name):
+    qn = connection.ops.quote_name
+    cursor.execute(f"ALTER TABLE {qn(PARENT_TABLE)} DETACH PARTITION {qn(name)}")
+
+
+def drop_partition(cursor, name):
+    cursor.execute(f"DROP TABLE {connection.ops.quote_name(name)}")
+
+
+def archive_partition(cursor, name, month, archive_dir):
+    """
+    Stream a (detached) partition to <archive_dir>/<name>.csv.gz with COPY and
+    write a <name>.json manifest next to it. Returns the manifest dict.
+    """
+    os.makedirs(archive_dir, exist_ok=True)
+    data_path = os.path.join(archive_dir, f'{name}.csv.gz')
+    tmp_path = f'{data_path}.partial'
+
+    columns = table_columns(cursor, name)
+    copy_sql = f"COPY {connection.ops.quote_name(name)} TO STDOUT WITH (FORMAT csv, HEADER true)"
+
+    with gzip.open(tmp_path, 'wb') as archive:
+        raw = cursor.cursor if hasattr(cursor, 'cursor') else cursor
+        if hasattr(raw, 'copy_expert'):  # psycopg2
+            raw.copy_expert(copy_sql, archive)
+        else:  # psycopg 3
+            with raw.copy(copy_sql) as copy:
+                for chunk in copy:
+                    archive.write(chunk)
+
+    # Count rows from the file rather than trusting a second scan of the table
+    digest = hashlib.sha256()
+    rows = -1  # header line
+    with gzip.open(tmp_path, 'rb') as archive:
+        for line in archive:
+            digest.update(line)
+            rows += 1
+    os.replace(tmp_path, data_path)
+
+    manifest = {
+        'format_version': ARCHIVE_FORMAT_VERSION,
+        'table': PARENT_TABLE,
+        'partition': name,
+        'range_start': month.isoformat(),
+        'range_end': add_months(month, 1).isoformat(),
+        'columns': columns,
+        'rows': max(rows, 0),
+        'data_file': os.path.basename(data_path),
+        'sha256_uncompressed': digest.hexdigest(),
+        'archived_at': timezone.now().isoformat(),
+    }
+    with open(os.path.join(archive_dir, f'{name}.json'), 'w') as fh:
+        json.dump(manifest, fh, indent=2)
+    return manifest
+
+
+def explain_partitions_scanned(cursor, start, end):
+    """Partition tables the planner touches for a created_at range query"""
+    qn = connection.ops.quote_name
+    cursor.execute(
+        f"EXPLAIN (FORMAT JSON) SELECT id FROM {qn(PARENT_TABLE)} "
+        f"WHERE created_at >= %s AND created_at < %s",
+        [start.isoformat(), end.isoformat()]
+    )
+    plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    scanned = set()
+
+    def walk(node):
+        relation = node.get('Relation Name')
+        if relation:
+            scanned.add(relation)
+        for child in node.get('Plans', []):
+            walk(child)
+
+    walk(plan[0]['Plan'])
+    return sorted(scanned)
@@ -1,11 +1,14 @@
 from rest_framework import serializers
+from backend.fieldsets import SparseFieldsetMixin
 from hostels.models import Hostel, Room
 from .models import (
     Review, Favorite, InteractionLog, SearchHistory,
-    HostelAnalytics, DailyAnalytics, AnalyticsSummary, Report
+    HostelAnalytics, DailyAnalytics, AnalyticsSummary, Report, AnalyticsExport,
+    DailyFunnel
 )
 from users.models import User
 from django.db.models import Avg
+from django.urls import reverse
 
 class OwnerInfoSerializer(serializers.ModelSerializer):
     full_name = serializers.SerializerMethodField()
@@ -23,24 +26,35 @@ class OwnerInfoSerializer(serializers.ModelSerializer):
             return obj.profile_picture.url
         return None
 
-class RoomSearchResultSerializer(serializers.ModelSerializer):
+class RoomSearchResultSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     hostel_name = serializers.CharField(source='hostel.name')
+    hostel_rating = serializers.FloatField(source='hostel.average_rating', read_only=True)
+    hostel_rating_count = serializers.IntegerField(source='hostel.rating_count', read_only=True)
     owner = serializers.SerializerMethodField()
+    is_favorite = serializers.SerializerMethodField()
     distance = serializers.FloatField(read_only=True)
     facilities = serializers.JSONField()
 
+    # Model paths read by the method fields, for ?fields= query narrowing
+    sparse_sources = {'owner': ['hostel__owner'], 'is_favorite': ['hostel']}
+
     class Meta:
         model = Room
         fields = [
-            'id', 'hostel_name', 'owner', 'room_type',
+            'id', 'hostel_name', 'hostel_rating', 'hostel_rating_count',
+            'owner', 'room_type',
             'total_capacity', 'available_capacity', 'rent',
             'security_deposit', 'facilities', 'is_available',
-            'verification_status', 'distance'
+            'verification_status', 'is_favorite', 'distance'
         ]
 
     def get_owner(self, obj):
         return OwnerInfoSerializer(obj.hostel.owner).data
 
+    def get_is_favorite(self, obj):
+        # Resolved in one batch by the view, see Favorite.status_for
+        return self.context.get('favorite_status', {}).get(obj.hostel_id, False)
+
 class SearchHistorySerializer(serializers.ModelSerializer):
     class Meta:
         model = SearchHistory
@@ -106,7 +120,7 @@ class DailyAnalyticsSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = DailyAnalytics
-        fields = ['date', 'views', 'contacts', 'favorites', 'searches_appeared']
+        fields = ['date', 'views', 'unique_visitors', 'contacts', 'favorites', 'searches_appeared']
 
 
 class AnalyticsSummarySerializer(serializers.ModelSerializer):
@@ -118,7 +132,7 @@ class AnalyticsSummarySerializer(serializers.ModelSerializer):
         model = AnalyticsSummary
         fields = [
             'period_type', 'start_date', 'end_date',
-            'total_views', 'total_contacts', 'total_favorites',
+            'total_views', 'unique_visitors', 'total_contacts', 'total_favorites',
             'total_searches', 'conversion_rate'
         ]
 
@@ -139,6 +153,30 @@ class ReportSerializer(serializers.ModelSerializer):
         read_only_fields = ['user', 'status', 'admin_notes', 'created_at', 'updated_at']
 
 
+class InteractionEventSerializer(serializers.Serializer):
+    """One event in an InteractionBatchCreateView batch; ids are checked by the view"""
+    hostel = serializers.IntegerField()
+    interaction_type = serializers.ChoiceField(choices=InteractionLog.INTERACTION_TYPES)
+    search_query = serializers.IntegerField(required=False, allow_null=True)
+    safety_confirmed = serializers.BooleanField(default=False)
+
+
+class SearchAreaSerializer(serializers.Serializer):
+    """Search count for one geohash cell"""
+    cell = serializers.CharField()
+    latitude = serializers.FloatField()
+    longitude = serializers.FloatField()
+    searches = serializers.IntegerField()
+
+
+class DailyFunnelSerializer(serializers.ModelSerializer):
+    date = serializers.DateField(format="%Y-%m-%d")
+
+    class Meta:
+        model = DailyFunnel
+        fields = ['date'] + DailyFunnel.FUNNEL_FIELDS
+
+
 class HostelStatsSerializer(serializers.Serializer):
     """Comprehensive stats for hostel owners"""
     total_stats = HostelAnalyticsSerializer()
@@ -150,4 +188,37 @@ class HostelStatsSerializer(serializers.Serializer):
     avg_daily_views = serializers.FloatField()
     avg_daily_contacts = serializers.FloatField()
     peak_viewing_hours = serializers.DictField()  # hour -> view count
-    most_searched_areas = serializers.ListField()  # list of areas where hostel appears in searches
+    most_searched_areas = SearchAreaSerializer(many=True)  # busiest search cells near the hostel(s)
+
+
+class AnalyticsExportSerializer(serializers.ModelSerializer):
+    """Export request (validated against the owner in context['request']) and job status"""
+    max_days = 366
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = AnalyticsExport
+        fields = [
+            'id', 'kind', 'hostel', 'start_date', 'end_date', 'status',
+            'row_count', 'error', 'created_at', 'completed_at', 'download_url'
+        ]
+        read_only_fields = ['status', 'row_count', 'error', 'created_at', 'completed_at']
+
+    def validate_hostel(self, value):
+        if value is not None and value.owner_id != self.context['request'].user.id:
+            raise serializers.ValidationError("You can only export your own hostels.")
+        return value
+
+    def validate(self, data):
+        if data['start_date'] > data['end_date']:
+            raise serializers.ValidationError("start_date must not be after end_date.")
+        if (data['end_date'] - data['start_date']).days >= self.max_days:
+            raise serializers.ValidationError(f"Exports can cover at most {self.max_days} days.")
+        return data
+
+    def get_download_url(self, obj):
+        if obj.status != 'completed':
+            return None
+        return self.context['request'].build_absolute_uri(
+            reverse('analytics-export-download', args=[obj.id])
+        )
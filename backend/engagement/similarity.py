@@ -0,0 +1,133 @@
+"""
+"Similar hostels" recommendations, precomputed per city.
+
+Each hostel becomes a feature vector of location, price band, gender,
+facilities (union over its rooms) and rating. Features are scaled so one
+unit means roughly the same amount of dissimilarity:
+
+- location: km from the city's centroid / LOCATION_SCALE_KM
+- price: log2 of the cheapest rent, so one unit is a doubling
+- gender: one-hot times GENDER_WEIGHT, so a mismatch outweighs the rest
+- facilities: multi-hot over ALLOWED_FACILITIES, each worth FACILITY_WEIGHT
+- rating: average_rating / RATING_SCALE (city mean when unrated)
+
+Neighbours are the k smallest Euclidean distances within the city,
+computed blockwise with NumPy so memory stays at BLOCK_SIZE x n floats.
+"""
+import math
+
+import numpy as np
+
+from hostels.models import Hostel, Room, ALLOWED_FACILITIES, GENDER_CHOICES
+
+from . import geohash
+
+LOCATION_SCALE_KM = 3.0
+GENDER_WEIGHT = 10.0
+FACILITY_WEIGHT = 0.35
+RATING_SCALE = 2.0
+BLOCK_SIZE = 512
+KM_PER_DEGREE = 111.2
+
+_GENDERS = [value for value, _ in GENDER_CHOICES]
+_FACILITY_INDEX = {name: index for index, name in enumerate(ALLOWED_FACILITIES)}
+
+
+def city_hostels(city):
+    """Hostel rows plus per-hostel cheapest rent and facility set for a city"""
+    hostels = list(
+        Hostel.objects.filter(city=city).order_by('id').values(
+            'id', 'name', 'latitude', 'longitude', 'gender', 'average_rating'
+        )
+    )
+    rents, facilities = {}, {}
+    rooms = Room.objects.filter(hostel__city=city).values_list('hostel_id', 'rent', 'facilities')
+    for hostel_id, rent, room_facilities in rooms.iterator(chunk_size=2000):
+        if rent and (hostel_id not in rents or rent < rents[hostel_id]):
+            rents[hostel_id] = rent
+        facilities.setdefault(hostel_id, set()).update(room_facilities or [])
+    for hostel in hostels:
+        hostel['min_rent'] = rents.get(hostel['id'])
+        hostel['facilities'] = facilities.get(hostel['id'], set())
+    return hostels
+
+
+def feature_matrix(hostels):
+    """One row per hostel, scaled as described in the module docstring"""
+    n = len(hostels)
+    latitudes = np.array([h['latitude'] for h in hostels], dtype=np.float64)
+    longitudes = np.array([h['longitude'] for h in hostels], dtype=np.float64)
+    origin = math.radians(float(latitudes.mean()))
+    y = (latitudes - latitudes.mean()) * KM_PER_DEGREE / LOCATION_SCALE_KM
+    x = (longitudes - longitudes.mean()) * KM_PER_DEGREE * math.cos(origin) / LOCATION_SCALE_KM
+
+    rents = np.array([float(h['min_rent']) if h['min_rent'] else np.nan for h in hostels])
+    price = np.log2(rents)
+    price[np.isnan(price)] = np.nanmean(price) if np.isfinite(price).any() else 0.0
+
+    ratings = np.array([h['average_rating'] if h['average_rating'] is not None else np.nan for h in hostels])
+    ratings[np.isnan(ratings)] = np.nanmean(ratings) if np.isfinite(ratings).any() else 0.0
+
+    gender = np.zeros((n, len(_GENDERS)))
+    facilities = np.zeros((n, len(ALLOWED_FACILITIES)))
+    for row, hostel in enumerate(hostels):
+        if hostel['gender'] in _GENDERS:
+            gender[row, _GENDERS.index(hostel['gender'])] = GENDER_WEIGHT
+        for name in hostel['facilities']:
+            if name in _FACILITY_INDEX:
+                facilities[row, _FACILITY_INDEX[name]] = FACILITY_WEIGHT
+
+    return np.column_stack([x, y, price, ratings / RATING_SCALE, gender, facilities])
+
+
+def nearest_neighbours(features, k):
+    """(indices, distances) of each row's k nearest other rows, closest first"""
+    n = features.shape[0]
+    k = min(k, n - 1)
+    if k <= 0:
+        return np.empty((n, 0), dtype=np.int64), np.empty((n, 0))
+
+    squared_norms = np.einsum('ij,ij->i', features, features)
+    indices = np.empty((n, k), dtype=np.int64)
+    distances = np.empty((n, k))
+    for start in range(0, n, BLOCK_SIZE):
+        block = features[start:start + BLOCK_SIZE]
+        # |a - b|^2 = |a|^2 + |b|^2 - 2ab, for the whole block at once
+        squared = squared_norms[start:start + BLOCK_SIZE, None] + squared_norms[None, :] - 2 * block @ features.T
+        np.maximum(squared, 0, out=squared)
+        rows = np.arange(block.shape[0])
+        squared[rows, rows + start] = np.inf  # never your own neighbour
+
+        nearest = np.argpartition(squared, k - 1, axis=1)[:, :k]
+        nearest_squared = np.take_along_axis(squared, nearest, axis=1)
+        order = np.argsort(nearest_squared, axis=1)
+        indices[start:start + BLOCK_SIZE] = np.take_along_axis(nearest, order, axis=1)
+        distances[start:start + BLOCK_SIZE] = np.sqrt(np.take_along_axis(nearest_squared, order, axis=1))
+    return indices, distances
+
+
+def similar_hostels_for_city(city, k):
+    """{hostel_id: [entry, ...]} with each hostel's k most similar hostels in the city"""
+    hostels = city_hostels(city)
+    if not hostels:
+        return {}
+    indices, distances = nearest_neighbours(feature_matrix(hostels), k)
+
+    results = {}
+    for row, hostel in enumerate(hostels):
+        results[hostel['id']] = [
+            {
+                'hostel_id': hostels[index]['id'],
+                'name': hostels[index]['name'],
+                'gender': hostels[index]['gender'],
+                'min_rent': str(hostels[index]['min_rent']) if hostels[index]['min_rent'] else None,
+                'average_rating': hostels[index]['average_rating'],
+                'distance_km': round(geohash.distance_km(
+                    hostel['latitude'], hostel['longitude'],
+                    hostels[index]['latitude'], hostels[index]['longitude']
+                ), 2),
+                'similarity': round(1 / (1 + float(distance)), 4),
+            }
+            for index, distance in zip(indices[row], distances[row])
+        ]
+    return results
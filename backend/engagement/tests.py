@@ -1,3 +1,415 @@
-from django.test import TestCase
+import csv
+import gzip
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import date, datetime, time, timedelta
 
-# Create your tests here.
+from django.db import connection
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from django.utils import timezone
+
+from engagement import exports, partitions
+from engagement.models import (
+    AnalyticsExport, DailyAnalytics, DailyFunnel, Favorite, InteractionLog, RatingDistribution, Review,
+    SearchHistory, SimilarHostels, UserSearchProfile
+)
+from hostels.models import Hostel
+from users.models import User
+
+
+def make_user(username, role='student'):
+    return User.objects.create(
+        username=username, email=f'{username}@example.com', role=role,
+        phone='03001234567', city='lahore', first_name=username, last_name='test'
+    )
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', 'InteractionLog partitioning is PostgreSQL only')
+class InteractionLogPartitionTests(TestCase):
+    """Migration 0014 partitions InteractionLog by month; see INTERACTION_ARCHIVE.md"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = make_user('student')
+        owner = make_user('owner', role='owner')
+        cls.hostel = Hostel.objects.create(
+            owner=owner, name='Test Hostel', latitude=31.5, longitude=74.3, total_rooms=1
+        )
+
+    def log_interactions(self, count, day):
+        """count InteractionLog rows dated day (created_at is auto_now_add, so set it afterwards)"""
+        ids = [
+            InteractionLog.objects.create(user=self.student, hostel=self.hostel, interaction_type='view').id
+            for _ in range(count)
+        ]
+        created_at = timezone.make_aware(datetime.combine(day, time(12)))
+        InteractionLog.objects.filter(id__in=ids).update(created_at=created_at)
+
+    def test_table_is_partitioned(self):
+        with connection.cursor() as cursor:
+            self.assertTrue(partitions.is_partitioned(cursor))
+
+    def test_one_month_range_scans_only_that_partition(self):
+        with connection.cursor() as cursor:
+            partitions.ensure_partitions(cursor, months_ahead=2)
+            month = partitions.month_start(timezone.now().date())
+            for start in (month, partitions.add_months(month, 1)):
+                scanned = partitions.explain_partitions_scanned(cursor, start, partitions.add_months(start, 1))
+                self.assertEqual(scanned, [partitions.partition_name(start)])
+
+    def test_past_month_range_scans_only_that_partition(self):
+        month = date(2020, 3, 1)
+        with connection.cursor() as cursor:
+            self.assertTrue(partitions.create_partition(cursor, month))
+            self.assertFalse(partitions.create_partition(cursor, month))
+            scanned = partitions.explain_partitions_scanned(cursor, month, partitions.add_months(month, 1))
+        self.assertEqual(scanned, [partitions.partition_name(month)])
+
+    def test_create_partition_moves_rows_out_of_default(self):
+        month = date(2099, 5, 1)
+        self.log_interactions(3, date(2099, 5, 10))  # no partition yet: lands in the default
+        self.log_interactions(1, date(2099, 6, 10))
+        with connection.cursor() as cursor:
+            self.assertEqual(partitions.default_partition_rows(cursor), 4)
+            self.assertTrue(partitions.create_partition(cursor, month))
+            self.assertEqual(partitions.default_partition_rows(cursor), 1)
+            cursor.execute(f'SELECT count(*) FROM {partitions.partition_name(month)}')
+            self.assertEqual(cursor.fetchone()[0], 3)
+            cursor.execute(
+                "SELECT 1 FROM pg_inherits WHERE inhrelid = to_regclass(%s)", [partitions.DEFAULT_PARTITION]
+            )
+            self.assertIsNotNone(cursor.fetchone())  # re-attached
+        self.assertEqual(InteractionLog.objects.count(), 4)
+
+    def test_archive_and_drop_partition(self):
+        month = date(2020, 1, 1)
+        name = partitions.partition_name(month)
+        with connection.cursor() as cursor:
+            partitions.create_partition(cursor, month)
+        self.log_interactions(5, date(2020, 1, 15))
+        self.log_interactions(2, timezone.now().date())  # stays attached
+
+        with tempfile.TemporaryDirectory() as archive_dir, connection.cursor() as cursor:
+            partitions.detach_partition(cursor, name)
+            manifest = partitions.archive_partition(cursor, name, month, archive_dir)
+            partitions.drop_partition(cursor, name)
+
+            cursor.execute("SELECT to_regclass(%s)", [name])
+            self.assertIsNone(cursor.fetchone()[0])
+            self.assertEqual(InteractionLog.objects.count(), 2)
+
+            with open(os.path.join(archive_dir, f'{name}.json')) as fh:
+                self.assertEqual(json.load(fh), manifest)
+            with gzip.open(os.path.join(archive_dir, manifest['data_file']), 'rb') as fh:
+                data = fh.read()
+
+        rows = list(csv.reader(io.StringIO(data.decode())))
+        self.assertEqual(manifest['rows'], 5)
+        self.assertEqual(len(rows) - 1, manifest['rows'])
+        self.assertEqual(rows[0], manifest['columns'])
+        self.assertEqual(manifest['sha256_uncompressed'], hashlib.sha256(data).hexdigest())
+        self.assertEqual((manifest['range_start'], manifest['range_end']), ('2020-01-01', '2020-02-01'))
+
+
+class ReviewRatingAggregateTests(TestCase):
+    """Review writes keep Hostel rating_sum/count/average and RatingDistribution in step by deltas"""
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = make_user('owner', role='owner')
+        cls.hostel = Hostel.objects.create(owner=owner, name='Hostel', latitude=31.5, longitude=74.3, total_rooms=1)
+        cls.other = Hostel.objects.create(owner=owner, name='Other', latitude=31.5, longitude=74.3, total_rooms=1)
+        cls.students = [make_user(f'student{i}') for i in range(3)]
+
+    def assertAggregates(self, hostel, total, count, average, counts):
+        hostel.refresh_from_db()
+        self.assertEqual((hostel.rating_sum, hostel.rating_count), (total, count))
+        if average is None:
+            self.assertIsNone(hostel.average_rating)
+        else:
+            self.assertAlmostEqual(hostel.average_rating, average)
+        self.assertEqual(RatingDistribution.objects.get(hostel=hostel).as_dict()['counts'], counts)
+
+    def review(self, student, rating, hostel=None):
+        return Review.objects.create(user=student, hostel=hostel or self.hostel, rating=rating, comment='ok')
+
+    def test_create(self):
+        self.review(self.students[0], 5)
+        self.review(self.students[1], 2)
+        self.assertAggregates(self.hostel, 7, 2, 3.5, {1: 0, 2: 1, 3: 0, 4: 0, 5: 1})
+
+    def test_rating_change(self):
+        review = self.review(self.students[0], 5)
+        self.review(self.students[1], 3)
+        review = Review.objects.get(pk=review.pk)  # persisted rating comes from the DB
+        review.rating = 1
+        review.save()
+        self.assertAggregates(self.hostel, 4, 2, 2.0, {1: 1, 2: 0, 3: 1, 4: 0, 5: 0})
+
+    def test_save_without_change_is_a_no_op(self):
+        review = self.review(self.students[0], 4)
+        review.comment = 'edited'
+        review.save()
+        Review.objects.get(pk=review.pk).save()
+        self.assertAggregates(self.hostel, 4, 1, 4.0, {1: 0, 2: 0, 3: 0, 4: 1, 5: 0})
+
+    def test_move_to_another_hostel(self):
+        review = self.review(self.students[0], 4)
+        review.hostel = self.other
+        review.rating = 2
+        review.save()
+        self.assertAggregates(self.hostel, 0, 0, None, {1: 0, 2: 0, 3: 0, 4: 0, 5: 0})
+        self.assertAggregates(self.other, 2, 1, 2.0, {1: 0, 2: 1, 3: 0, 4: 0, 5: 0})
+
+    def test_delete(self):
+        keep = self.review(self.students[0], 5)
+        Review.objects.get(pk=self.review(self.students[1], 1).pk).delete()
+        self.assertAggregates(self.hostel, 5, 1, 5.0, {1: 0, 2: 0, 3: 0, 4: 0, 5: 1})
+
+        keep.delete()  # the last review: the average goes back to None, not a division by zero
+        self.assertAggregates(self.hostel, 0, 0, None, {1: 0, 2: 0, 3: 0, 4: 0, 5: 0})
+
+    def test_delete_after_unsaved_rating_change_removes_the_stored_rating(self):
+        review = self.review(self.students[0], 5)
+        review.rating = 1
+        review.delete()
+        self.assertAggregates(self.hostel, 0, 0, None, {1: 0, 2: 0, 3: 0, 4: 0, 5: 0})
+
+
+class ReviewListTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = make_user('student')
+        owner = make_user('owner', role='owner')
+        cls.hostel = Hostel.objects.create(owner=owner, name='Hostel', latitude=31.5, longitude=74.3, total_rooms=1)
+        Review.objects.create(user=cls.student, hostel=cls.hostel, rating=4, comment='ok')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+
+    def test_filter_by_hostel_includes_distribution(self):
+        response = self.client.get('/api/engagement/reviews/', {'hostel_id': self.hostel.id})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(response.data['rating_distribution']['counts'][4], 1)
+
+    def test_non_integer_hostel_id_is_400(self):
+        response = self.client.get('/api/engagement/reviews/', {'hostel_id': 'abc'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], 'Invalid hostel_id')
+
+
+class InteractionBatchTests(TestCase):
+    url = '/api/engagement/interactions/batch/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = make_user('student')
+        owner = make_user('owner', role='owner')
+        cls.hostel = Hostel.objects.create(owner=owner, name='Hostel', latitude=31.5, longitude=74.3, total_rooms=1)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+
+    def post(self, *events):
+        return self.client.post(self.url, {'events': list(events)}, format='json')
+
+    def test_safety_confirmed_is_parsed_strictly(self):
+        response = self.post(
+            {'hostel': self.hostel.id, 'interaction_type': 'view', 'safety_confirmed': 'false'},
+            {'hostel': self.hostel.id, 'interaction_type': 'view', 'safety_confirmed': 'true'},
+            {'hostel': self.hostel.id, 'interaction_type': 'view'},
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            list(InteractionLog.objects.order_by('id').values_list('safety_confirmed', flat=True)),
+            [False, True, False]
+        )
+
+    def test_bad_values_are_reported_per_index(self):
+        response = self.post(
+            {'hostel': self.hostel.id, 'interaction_type': 'view'},
+            {'hostel': self.hostel.id, 'interaction_type': 'view', 'safety_confirmed': 'maybe'},
+            {'hostel': 'abc', 'interaction_type': 'view'},
+            {'hostel': self.hostel.id, 'interaction_type': 'teleport'},
+            {'hostel': self.hostel.id + 100, 'interaction_type': 'view'},
+        )
+        self.assertEqual(response.status_code, 400)
+        details = response.data['details']
+        self.assertEqual(sorted(details), [1, 2, 3, 4])
+        self.assertIn('safety_confirmed', details[1])
+        self.assertIn('hostel', details[2])
+        self.assertIn('interaction_type', details[3])
+        self.assertFalse(InteractionLog.objects.exists())
+
+
+class ExportClaimTests(TestCase):
+    def setUp(self):
+        self.owner = make_user('owner', role='owner')
+        self.export_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.export_dir, ignore_errors=True)
+        self.now = timezone.now()
+
+    def make_job(self, **kwargs):
+        today = date.today()
+        return AnalyticsExport.objects.create(
+            owner=self.owner, kind='daily', start_date=today, end_date=today, **kwargs
+        )
+
+    def test_fresh_running_job_is_left_alone(self):
+        self.make_job(status='running', started_at=self.now - timedelta(minutes=5), attempts=1)
+        self.assertIsNone(exports.claim_next_job(self.now))
+
+    def test_stale_running_job_is_reclaimed(self):
+        job = self.make_job(status='running', started_at=self.now - timedelta(hours=3), attempts=1)
+        claimed = exports.claim_next_job(self.now)
+        self.assertEqual(claimed.pk, job.pk)
+        self.assertEqual((claimed.status, claimed.started_at, claimed.attempts), ('running', self.now, 2))
+
+    def test_stale_job_out_of_attempts_fails(self):
+        job = self.make_job(status='running', started_at=self.now - timedelta(hours=3), attempts=3)
+        self.assertIsNone(exports.claim_next_job(self.now))
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertTrue(job.error)
+
+    def test_late_result_from_a_reclaimed_worker_is_dropped(self):
+        self.make_job()
+        with override_settings(ANALYTICS_EXPORT_DIR=self.export_dir):
+            stale_claim = exports.claim_next_job(self.now)
+            fresh_claim = exports.claim_next_job(self.now + timedelta(hours=3))
+            self.assertEqual(fresh_claim.pk, stale_claim.pk)
+
+            exports.run_job(stale_claim)
+            job = AnalyticsExport.objects.get(pk=stale_claim.pk)
+            self.assertEqual((job.status, job.attempts), ('running', 2))
+            self.assertEqual(os.listdir(self.export_dir), [])
+
+            exports.run_job(fresh_claim)
+            job.refresh_from_db()
+            self.assertEqual(job.status, 'completed')
+            self.assertTrue(os.path.exists(job.file_path))
+
+
+class DailyFunnelRollupTests(TestCase):
+    def setUp(self):
+        self.owner = make_user('owner', role='owner')
+        self.student = make_user('student')
+        self.other = make_user('other')
+        self.hostel = Hostel.objects.create(owner=self.owner, name='Funnel', latitude=31.5, longitude=74.3, total_rooms=1)
+        self.client = APIClient()
+
+    def rollup(self):
+        DailyFunnel.rollup(lag=timedelta(0))
+        return DailyFunnel.objects.get(hostel=self.hostel, date=date.today())
+
+    def favorite(self, user):
+        self.client.force_authenticate(user)
+        response = self.client.post('/api/engagement/favorites/', {'hostel': self.hostel.id}, format='json')
+        self.assertEqual(response.status_code, 201)
+        return response.data['id']
+
+    def test_favorite_removals_are_counted(self):
+        self.favorite(self.student)
+        favorite_id = self.favorite(self.other)
+        self.assertEqual(self.rollup().favorites, 2)
+
+        self.client.force_authenticate(self.other)
+        response = self.client.delete(f'/api/engagement/favorites/{favorite_id}/')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.rollup().favorites, 1)
+        self.assertEqual(DailyAnalytics.objects.get(hostel=self.hostel, date=date.today()).favorites, 1)
+        self.assertEqual(Favorite.objects.count(), 1)
+
+    def test_search_views_count_views_only(self):
+        search = SearchHistory.objects.create(user=self.student, latitude=31.5, longitude=74.3, radius=5)
+        InteractionLog.objects.bulk_create([
+            InteractionLog(user=self.student, hostel=self.hostel, interaction_type='view'),
+            InteractionLog(user=self.student, hostel=self.hostel, interaction_type='view', search_query=search),
+            InteractionLog(user=self.student, hostel=self.hostel, interaction_type='search', search_query=search),
+        ])
+        funnel = self.rollup()
+        self.assertEqual((funnel.views, funnel.search_views), (2, 1))
+
+
+class SimilarHostelsRebuildTests(TestCase):
+    def setUp(self):
+        owner = make_user('owner', role='owner')
+        self.hostels = [
+            Hostel.objects.create(
+                owner=owner, name=f'Hostel {n}', city='lahore', latitude=31.5 + n / 100, longitude=74.3, total_rooms=1
+            )
+            for n in range(3)
+        ]
+
+    def test_rebuild_writes_every_hostel_in_the_city(self):
+        self.assertEqual(SimilarHostels.rebuild_city('lahore', k=2), 3)
+        rows = SimilarHostels.objects.order_by('hostel_id')
+        self.assertEqual([row.hostel_id for row in rows], [hostel.id for hostel in self.hostels])
+        self.assertEqual({row.city for row in rows}, {'lahore'})
+
+    def test_hostel_that_left_the_city_loses_its_row(self):
+        SimilarHostels.rebuild_city('lahore', k=2)
+        moved = self.hostels[0]
+        Hostel.objects.filter(id=moved.id).update(city='karachi')
+
+        self.assertEqual(SimilarHostels.rebuild_city('lahore', k=2), 2)
+        self.assertFalse(SimilarHostels.objects.filter(hostel=moved).exists())
+        for row in SimilarHostels.objects.all():
+            self.assertNotIn(moved.id, [entry['hostel_id'] for entry in row.entries])
+
+        SimilarHostels.rebuild_city('karachi', k=2)
+        self.assertEqual(SimilarHostels.objects.get(hostel=moved).city, 'karachi')
+
+
+class SearchProfileRollupTests(TestCase):
+    def setUp(self):
+        owner = make_user('owner', role='owner')
+        self.student = make_user('student')
+        Hostel.objects.create(owner=owner, name='Near', latitude=31.5, longitude=74.3, total_rooms=1)
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+
+    def search(self, **data):
+        response = self.client.post(
+            '/api/engagement/search/', {'latitude': 31.5, 'longitude': 74.3, 'radius': 5, **data}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_search_does_not_write_the_profile(self):
+        self.search(max_price=9000, min_price=7000)
+        self.search(sort_by='personalized')
+        self.assertEqual(SearchHistory.objects.count(), 2)
+        self.assertFalse(UserSearchProfile.objects.exists())
+
+    def test_rollup_folds_new_searches_once(self):
+        self.search(radius=10)
+        self.search(radius=10)  # reload, not folded again
+        self.search(radius=20)
+        self.assertEqual(UserSearchProfile.rollup(lag=timedelta(0)), 3)
+        profile = UserSearchProfile.objects.get(user=self.student)
+        self.assertEqual(profile.searches, 2)
+        self.assertAlmostEqual(profile.radius_km, 12)
+
+        self.search(radius=20)
+        self.assertEqual(UserSearchProfile.rollup(lag=timedelta(0)), 1)
+        self.assertEqual(UserSearchProfile.rollup(lag=timedelta(0)), 0)
+        profile.refresh_from_db()
+        self.assertEqual(profile.searches, 3)
+
+    def test_rollup_refreshes_the_cached_profile(self):
+        self.search(radius=10)
+        UserSearchProfile.rollup(lag=timedelta(0))
+        self.assertEqual(UserSearchProfile.for_user(self.student.id).searches, 1)
+        self.search(radius=20)
+        UserSearchProfile.rollup(lag=timedelta(0))
+        self.assertEqual(UserSearchProfile.for_user(self.student.id).searches, 2)
+        self.search(sort_by='personalized')
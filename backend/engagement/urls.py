@@ -6,12 +6,28 @@ from .views import (
     FavoriteListCreateView,
     FavoriteDeleteView,
     HostelFavoritesView,
-    InteractionLogCreateView
+    FavoriteStatusView,
+    InteractionLogCreateView,
+    InteractionBatchCreateView,
+    AnalyticsSummaryGenerateView,
+    HostelStatsView,
+    SearchHeatmapView,
+    HostelSearchDemandView,
+    AnalyticsExportStreamView,
+    AnalyticsExportListCreateView,
+    AnalyticsExportDetailView,
+    AnalyticsExportDownloadView,
+    HostelFunnelView,
+    FunnelReportView,
+    TrendingHostelsView,
+    SimilarHostelsView
 )
 
 urlpatterns = [
     # Search
     path('search/', HostelSearchView.as_view(), name='hostel-search'),
+    path('trending/', TrendingHostelsView.as_view(), name='trending-hostels'),
+    path('hostels/<int:hostel_id>/similar/', SimilarHostelsView.as_view(), name='similar-hostels'),
     
     # Reviews
     path('reviews/', ReviewListCreateView.as_view(), name='review-list-create'),
@@ -20,9 +36,27 @@ urlpatterns = [
 
     # Favorites
     path('favorites/', FavoriteListCreateView.as_view(), name='favorite-list-create'),
+    path('favorites/status/', FavoriteStatusView.as_view(), name='favorite-status'),
     path('favorites/<int:pk>/', FavoriteDeleteView.as_view(), name='favorite-delete'),
     path('hostels/<int:hostel_id>/favorite/', HostelFavoritesView.as_view(), name='check-favorite'),
 
     # Contact & Interactions
     path('interactions/', InteractionLogCreateView.as_view(), name='create-interaction'),
+    path('interactions/batch/', InteractionBatchCreateView.as_view(), name='create-interaction-batch'),
+
+    # Analytics
+    path('analytics/summaries/generate/', AnalyticsSummaryGenerateView.as_view(), name='generate-analytics-summaries'),
+    path('hostels/stats/', HostelStatsView.as_view(), name='portfolio-stats'),
+    path('hostels/<int:hostel_id>/stats/', HostelStatsView.as_view(), name='hostel-stats'),
+    path('analytics/search-heatmap/', SearchHeatmapView.as_view(), name='search-heatmap'),
+    path('hostels/<int:hostel_id>/search-demand/', HostelSearchDemandView.as_view(), name='hostel-search-demand'),
+    path('hostels/funnel/', HostelFunnelView.as_view(), name='portfolio-funnel'),
+    path('hostels/<int:hostel_id>/funnel/', HostelFunnelView.as_view(), name='hostel-funnel'),
+    path('analytics/funnel/', FunnelReportView.as_view(), name='funnel-report'),
+
+    # Exports
+    path('analytics/export/', AnalyticsExportStreamView.as_view(), name='analytics-export-stream'),
+    path('analytics/exports/', AnalyticsExportListCreateView.as_view(), name='analytics-export-list-create'),
+    path('analytics/exports/<int:pk>/', AnalyticsExportDetailView.as_view(), name='analytics-export-detail'),
+    path('analytics/exports/<int:pk>/download/', AnalyticsExportDownloadView.as_view(), name='analytics-export-download'),
 ]
\ No newline at end of file
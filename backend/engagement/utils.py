@@ -1,7 +1,64 @@
+from django.db import connection
 from django.db.models import F
 from django.db.models.functions import Sin, Cos, ACos, Radians
 from math import pi
 
+
+def bulk_increment(model, key_fields, counter_fields, rows, touch_fields=(), batch_size=500):
+    """
+    Add counter deltas to rows keyed by a unique constraint in one statement
+    :param model: Model class with a unique constraint over key_fields
+    :param key_fields: Field names of the conflict target
+    :param counter_fields: Field names incremented by the supplied deltas
+    :param rows: Iterable of dicts of field name -> value (keys plus deltas)
+    :param touch_fields: Field names overwritten with the new row's value
+    :param batch_size: Rows per INSERT statement
+    :return: None
+
+    Missing rows are inserted with the deltas as their starting values, so
+    callers never need a get_or_create round-trip before incrementing.
+    Each key may appear only once in rows; aggregate duplicates beforehand.
+    """
+    rows = list(rows)
+    if not rows:
+        return
+
+    opts = model._meta
+    qn = connection.ops.quote_name
+    table = qn(opts.db_table)
+    fields = [f for f in opts.concrete_fields if not f.primary_key]
+
+    def column(name):
+        return qn(opts.get_field(name).column)
+
+    assignments = [
+        f"{column(name)} = {table}.{column(name)} + EXCLUDED.{column(name)}"
+        for name in counter_fields
+    ] + [
+        f"{column(name)} = EXCLUDED.{column(name)}"
+        for name in touch_fields
+    ]
+    placeholders = '(' + ', '.join(['%s'] * len(fields)) + ')'
+    conflict = (
+        f"ON CONFLICT ({', '.join(column(name) for name in key_fields)}) "
+        f"DO UPDATE SET {', '.join(assignments)}"
+    )
+
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            params = []
+            for row in batch:
+                obj = model(**row)
+                for field in fields:
+                    params.append(field.get_db_prep_save(field.pre_save(obj, True), connection))
+            cursor.execute(
+                f"INSERT INTO {table} ({', '.join(qn(f.column) for f in fields)}) "
+                f"VALUES {', '.join([placeholders] * len(batch))} {conflict}",
+                params
+            )
+
+
 def get_hostels_in_radius(latitude, longitude, radius_km, queryset):
     """
     Returns hostels within a given radius using the Haversine formula
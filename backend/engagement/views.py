@@ -2,27 +2,41 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import generics, status, permissions, serializers
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Q, Avg, Count, F
+from rest_framework.exceptions import PermissionDenied
+from django.db import transaction
+from django.db.models import Q, Count, F, Max, Sum
+from django.db.models.functions import Coalesce
 from django.db.models.functions import ExtractHour, Sin, Cos, ACos, Radians
+from django.core.cache import cache
+from django.http import FileResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
-from datetime import timedelta
-from hostels.models import Hostel, Room
+from datetime import date, timedelta
+from backend.fieldsets import sparse_queryset
+from backend.pagination import KeysetPagination
+from hostels.models import Hostel, Room, CITY_CHOICES
 from users.models import User
 from .models import (
     Review, Favorite, InteractionLog, SearchHistory,
-    HostelAnalytics, DailyAnalytics, AnalyticsSummary
+    HostelAnalytics, DailyAnalytics, HourlyAnalytics, AnalyticsSummary,
+    RatingDistribution, SearchAreaAnalytics, AnalyticsExport, DailyFunnel,
+    TrendingScore, SimilarHostels, UserSearchProfile, CONTACT_INTERACTIONS,
+    TRENDING_WEIGHTS
 )
 from .serializers import (
     ReviewSerializer, FavoriteSerializer, InteractionLogSerializer,
     RoomSearchResultSerializer, SearchHistorySerializer,
-    HostelStatsSerializer
+    HostelStatsSerializer, SearchAreaSerializer, AnalyticsExportSerializer,
+    DailyFunnelSerializer, InteractionEventSerializer
 )
+from . import geohash
+from .exports import export_filename, stream_export
 from .utils import get_hostels_in_radius
 
 class HostelSearchView(APIView):
     """
     Search for available rooms based on location and filters.
+    sort_by: 'rating', or 'personalized' to rank by the user's search profile.
     """
     permission_classes = [IsAuthenticated]
 
@@ -105,7 +119,12 @@ class HostelSearchView(APIView):
                     for facility in facilities:
                         rooms = rooms.filter(facilities__contains=[facility])
 
-                # Log search history and analytics
+                # Ratings are denormalized on the hostel, so sorting needs no aggregate
+                if request.data.get('sort_by') == 'rating':
+                    rooms = rooms.order_by(F('hostel__average_rating').desc(nulls_last=True), 'rent')
+
+                # Log search history and analytics; rollup_search_profiles
+                # folds the search into the user's profile later
                 try:
                     search_history = SearchHistory.objects.create(
                         user=request.user,
@@ -126,9 +145,32 @@ class HostelSearchView(APIView):
                     # Log the error but don't fail the search
                     print(f"Failed to log search history: {str(e)}")
 
-                # Serialize and return results
-                room_count = rooms.count()
-                serializer = RoomSearchResultSerializer(rooms, many=True)
+                # Serialize and return results; ?fields= narrows the SELECT too
+                profile = None
+                if request.data.get('sort_by') == 'personalized':
+                    profile = UserSearchProfile.for_user(request.user.id)
+                personalized = profile is not None
+                extra = ['hostel']
+                if personalized:
+                    extra += ['rent', 'facilities', 'hostel__latitude', 'hostel__longitude', 'hostel__gender']
+                rooms = list(sparse_queryset(rooms, RoomSearchResultSerializer(context={'request': request}), extra))
+
+                # Personalized: rerank by the user's incrementally maintained profile
+                if personalized:
+                    distances = {}
+                    for room in rooms:
+                        if room.hostel_id not in distances:
+                            distances[room.hostel_id] = geohash.distance_km(
+                                latitude, longitude, room.hostel.latitude, room.hostel.longitude
+                            )
+                    rooms.sort(key=lambda room: -profile.score(room, distances[room.hostel_id]))
+                room_count = len(rooms)
+                favorite_status = Favorite.status_for(
+                    request.user.id, {room.hostel_id for room in rooms}
+                )
+                serializer = RoomSearchResultSerializer(
+                    rooms, many=True, context={'request': request, 'favorite_status': favorite_status}
+                )
                 
                 return Response({
                     "count": room_count,
@@ -167,10 +209,13 @@ class FavoriteListCreateView(generics.ListCreateAPIView):
         # Check if already favorited
         if Favorite.objects.filter(user=self.request.user, hostel_id=hostel_id).exists():
             raise serializers.ValidationError("This hostel is already in your favorites")
-        favorite = serializer.save(user=self.request.user)
-        
-        # Update analytics
-        HostelAnalytics.update_favorites(hostel_id)
+        with transaction.atomic():
+            favorite = serializer.save(user=self.request.user)
+            # Counters move by deltas in the same transaction as the insert
+            HostelAnalytics.adjust_favorites(favorite.hostel_id, 1)
+            DailyAnalytics.log_favorite(favorite.hostel_id)
+            TrendingScore.record({favorite.hostel_id: TRENDING_WEIGHTS['favorite']})
+        Favorite.invalidate_cache(self.request.user.id)
 
 
 class FavoriteDeleteView(generics.DestroyAPIView):
@@ -182,6 +227,14 @@ class FavoriteDeleteView(generics.DestroyAPIView):
 
     def get_queryset(self):
         return Favorite.objects.filter(user=self.request.user)
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            instance.delete()
+            # Undo the favorite in its original day's bucket as well as the total
+            HostelAnalytics.adjust_favorites(instance.hostel_id, -1)
+            DailyAnalytics.log_favorite(instance.hostel_id, -1, date=instance.created_at.date())
+        Favorite.invalidate_cache(self.request.user.id)
         
 
 class HostelFavoritesView(APIView):
@@ -191,15 +244,41 @@ class HostelFavoritesView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request, hostel_id):
-        is_favorite = Favorite.objects.filter(
-            user=request.user,
-            hostel_id=hostel_id
-        ).exists()
+        is_favorite = Favorite.status_for(request.user.id, [hostel_id])[hostel_id]
         return Response({
             'is_favorite': is_favorite
         })
 
 
+class FavoriteStatusView(APIView):
+    """
+    GET: Check favorite status for many hostels at once
+    Query: ?hostel_ids=1,2,3
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    max_hostel_ids = 200
+
+    def get(self, request):
+        raw_ids = request.query_params.get('hostel_ids', '')
+        try:
+            hostel_ids = {int(value) for value in raw_ids.split(',') if value.strip()}
+        except ValueError:
+            return Response({
+                'error': 'Invalid hostel_ids',
+                'details': 'hostel_ids must be a comma-separated list of integers'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        if len(hostel_ids) > self.max_hostel_ids:
+            return Response({
+                'error': 'Too many hostel_ids',
+                'details': f'At most {self.max_hostel_ids} hostels can be checked per request'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'favorites': Favorite.status_for(request.user.id, hostel_ids)
+        })
+
+
 # ---------- Reviews API ----------
 
 class ReviewListCreateView(generics.ListCreateAPIView):
@@ -209,13 +288,40 @@ class ReviewListCreateView(generics.ListCreateAPIView):
     """
     serializer_class = ReviewSerializer
     permission_classes = [permissions.IsAuthenticated]
+    # Seeks on (created_at, id); see Review.Meta.indexes
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-created_at', '-id')
+
+    def get_hostel_id(self):
+        hostel_id = self.kwargs.get("hostel_id") or self.request.query_params.get("hostel_id")
+        if hostel_id in (None, ""):
+            return None
+        try:
+            return int(hostel_id)
+        except (TypeError, ValueError):
+            raise serializers.ValidationError({
+                'error': 'Invalid hostel_id',
+                'details': 'hostel_id must be an integer'
+            })
 
     def get_queryset(self):
-        hostel_id = self.request.query_params.get("hostel_id")
+        hostel_id = self.get_hostel_id()
         if hostel_id:
             return Review.objects.filter(hostel_id=hostel_id).select_related('user', 'hostel')
         return Review.objects.all().select_related('user', 'hostel')
 
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        hostel_id = self.get_hostel_id()
+        if hostel_id:
+            # Histogram is maintained on write, so this is a single-row read
+            distribution = (
+                RatingDistribution.objects.filter(hostel_id=hostel_id).first()
+                or RatingDistribution(hostel_id=hostel_id)
+            )
+            response.data['rating_distribution'] = distribution.as_dict()
+        return response
+
     def perform_create(self, serializer):
         hostel_id = self.request.data.get('hostel')
         # Check if user has already reviewed this hostel
@@ -234,19 +340,30 @@ class ReviewDetailView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
+        # Hostel rating aggregates are kept in step by Review.save()/delete()
         return Review.objects.filter(user=self.request.user)
 
-    def perform_update(self, serializer):
-        serializer.save()
-        # Recalculate hostel rating after update
-        hostel = serializer.instance.hostel
-        avg_rating = Review.objects.filter(hostel=hostel).aggregate(Avg('rating'))['rating__avg']
-        hostel.average_rating = avg_rating
-        hostel.save()
-
 
 # ---------- Contact & Interaction API ----------
 
+def contact_restriction(user, hostel):
+    """Return the error payload blocking user from contacting hostel, if any"""
+    # Check if user and hostel genders match (for female users)
+    if user.gender == 'female' and hostel.gender != 'female':
+        return {
+            'error': 'Safety restriction',
+            'message': 'Female students can only contact female hostels'
+        }
+
+    # Check if user has verified their phone number
+    if not user.phone_verified:
+        return {
+            'error': 'Verification required',
+            'message': 'Please verify your phone number to contact hostel owners'
+        }
+    return None
+
+
 class InteractionLogCreateView(generics.CreateAPIView):
     """
     Create a log entry for user-hostel interaction (view/contact)
@@ -259,22 +376,565 @@ class InteractionLogCreateView(generics.CreateAPIView):
         interaction_type = self.request.data.get('interaction_type')
         
         # If it's a contact interaction, verify user's status
-        if interaction_type in ['whatsapp', 'call']:
-            user = self.request.user
+        if interaction_type in CONTACT_INTERACTIONS:
             hostel = Hostel.objects.get(id=hostel_id)
-            
-            # Check if user and hostel genders match (for female users)
-            if user.gender == 'female' and hostel.gender != 'female':
-                raise serializers.ValidationError({
-                    'error': 'Safety restriction',
-                    'message': 'Female students can only contact female hostels'
-                })
-            
-            # Check if user has verified their phone number
-            if not user.phone_verified:
-                raise serializers.ValidationError({
-                    'error': 'Verification required',
-                    'message': 'Please verify your phone number to contact hostel owners'
-                })
+            restriction = contact_restriction(self.request.user, hostel)
+            if restriction:
+                raise serializers.ValidationError(restriction)
 
-        serializer.save(user=self.request.user)
+        with transaction.atomic():
+            log = serializer.save(user=self.request.user)
+            InteractionLog.apply_counters([log])
+
+
+class InteractionBatchCreateView(APIView):
+    """
+    POST: Record many interactions at once so clients can flush periodically
+    Body: {"events": [{"hostel": 1, "interaction_type": "view",
+                       "search_query": 5, "safety_confirmed": false}, ...]}
+
+    Events are validated together and stored all-or-nothing; errors are
+    reported per event index.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    max_events = 500
+
+    def post(self, request):
+        events = request.data.get('events')
+        if not isinstance(events, list) or not events:
+            return Response({
+                'error': 'Invalid events',
+                'details': 'events must be a non-empty list'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if len(events) > self.max_events:
+            return Response({
+                'error': 'Too many events',
+                'details': f'At most {self.max_events} events can be sent per request'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        errors = {}
+        parsed = []
+        for index, event in enumerate(events):
+            serializer = InteractionEventSerializer(data=event)
+            if not serializer.is_valid():
+                errors[index] = serializer.errors
+                continue
+            data = serializer.validated_data
+            parsed.append((index, data['hostel'], data['interaction_type'],
+                           data.get('search_query'), data['safety_confirmed']))
+
+        # Each referenced hostel and search is fetched once for the whole batch
+        hostels = Hostel.objects.only('id', 'gender').in_bulk({event[1] for event in parsed})
+        search_ids = {event[3] for event in parsed if event[3] is not None}
+        own_searches = set(
+            SearchHistory.objects.filter(user=request.user, id__in=search_ids).values_list('id', flat=True)
+        ) if search_ids else set()
+
+        logs = []
+        restrictions = {}
+        for index, hostel_id, interaction_type, search_query_id, safety_confirmed in parsed:
+            hostel = hostels.get(hostel_id)
+            if hostel is None:
+                errors[index] = f'Hostel {hostel_id} does not exist'
+                continue
+            if search_query_id is not None and search_query_id not in own_searches:
+                errors[index] = f'Search {search_query_id} does not exist'
+                continue
+            if interaction_type in CONTACT_INTERACTIONS:
+                if hostel_id not in restrictions:
+                    restrictions[hostel_id] = contact_restriction(request.user, hostel)
+                if restrictions[hostel_id]:
+                    errors[index] = restrictions[hostel_id]
+                    continue
+            logs.append(InteractionLog(
+                user=request.user,
+                hostel_id=hostel_id,
+                interaction_type=interaction_type,
+                search_query_id=search_query_id,
+                safety_confirmed=safety_confirmed
+            ))
+
+        if errors:
+            return Response({
+                'error': 'Invalid events',
+                'details': errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            InteractionLog.objects.bulk_create(logs)
+            InteractionLog.apply_counters(logs)
+
+        return Response({'created': len(logs)}, status=status.HTTP_201_CREATED)
+
+
+# ---------- Analytics API ----------
+
+class AnalyticsSummaryGenerateView(APIView):
+    """
+    POST: Regenerate weekly/monthly summaries for all hostels (staff only)
+    Body: {"period_type": "W" | "M" | "all", "date": "YYYY-MM-DD", "incremental": bool}
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def post(self, request):
+        period = request.data.get('period_type', 'all')
+        if period not in ('W', 'M', 'all'):
+            return Response({
+                'error': 'Invalid period_type',
+                'details': "period_type must be 'W', 'M' or 'all'"
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        day = request.data.get('date')
+        if day:
+            try:
+                day = date.fromisoformat(day)
+            except (TypeError, ValueError):
+                return Response({
+                    'error': 'Invalid date',
+                    'details': 'date must be in YYYY-MM-DD format'
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+        results = AnalyticsSummary.generate_periods(
+            ['W', 'M'] if period == 'all' else [period],
+            day=day or None,
+            incremental=bool(request.data.get('incremental', False))
+        )
+        return Response({
+            'periods': [
+                {'period_type': period_type, 'start_date': start_date, 'summaries': written}
+                for period_type, start_date, written in results
+            ]
+        }, status=status.HTTP_200_OK)
+
+
+class HostelStatsView(APIView):
+    """
+    GET: Owner dashboard stats for one hostel, or for every hostel the owner
+    has when no hostel_id is given (portfolio mode).
+    Query: ?days=30 (1-90)
+
+    Built only from rollup tables (HostelAnalytics, DailyAnalytics,
+    AnalyticsSummary, HourlyAnalytics, SearchAreaAnalytics) and cached per
+    scope per day, so it never scans InteractionLog or SearchHistory at
+    request time.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    cache_timeout = 60 * 15
+    max_days = 90
+    search_area_radius_km = 5
+    search_area_limit = 10
+
+    def get(self, request, hostel_id=None):
+        user = request.user
+        if user.role != 'owner':
+            return Response({
+                'error': 'Only owners can view hostel stats.'
+            }, status=status.HTTP_403_FORBIDDEN)
+
+        try:
+            days = int(request.query_params.get('days', 30))
+        except ValueError:
+            days = 0
+        if not 1 <= days <= self.max_days:
+            return Response({
+                'error': 'Invalid days',
+                'details': f'days must be an integer between 1 and {self.max_days}'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        if hostel_id is not None:
+            get_object_or_404(Hostel, pk=hostel_id, owner=user)
+            scope, hostel_filter = f'hostel-{hostel_id}', {'hostel_id': hostel_id}
+            hostels = Hostel.objects.filter(pk=hostel_id)
+        else:
+            scope, hostel_filter = f'owner-{user.id}', {'hostel__owner': user}
+            hostels = Hostel.objects.filter(owner=user)
+
+        today = timezone.now().date()
+        cache_key = f'hostel_stats:{scope}:{today}:{days}'
+        data = cache.get(cache_key)
+        if data is None:
+            stats = self.build_stats(hostel_filter, hostels, today, days)
+            data = HostelStatsSerializer(stats).data
+            cache.set(cache_key, data, self.cache_timeout)
+        return Response(data, status=status.HTTP_200_OK)
+
+    def build_stats(self, hostel_filter, hostels, today, days):
+        since = today - timedelta(days=days - 1)
+
+        totals = HostelAnalytics.objects.filter(**hostel_filter).aggregate(
+            total_views=Coalesce(Sum('total_views'), 0),
+            total_contacts=Coalesce(Sum('total_contacts'), 0),
+            total_favorites=Coalesce(Sum('total_favorites'), 0),
+            last_updated=Max('last_updated')
+        )
+
+        daily_stats = [
+            DailyAnalytics(**row)
+            for row in DailyAnalytics.objects.filter(**hostel_filter, date__gte=since)
+            .values('date').annotate(
+                views=Sum('views'),
+                unique_visitors=Sum('unique_visitors'),
+                contacts=Sum('contacts'),
+                favorites=Sum('favorites'),
+                searches_appeared=Sum('searches_appeared')
+            ).order_by('-date')
+        ]
+
+        return {
+            'total_stats': HostelAnalytics(**totals),
+            'daily_stats': daily_stats,
+            'weekly_summary': self.latest_summary(hostel_filter, 'W'),
+            'monthly_summary': self.latest_summary(hostel_filter, 'M'),
+            'avg_daily_views': sum(day.views for day in daily_stats) / days,
+            'avg_daily_contacts': sum(day.contacts for day in daily_stats) / days,
+            'peak_viewing_hours': HourlyAnalytics.peak_hours_for(hostel_filter, since),
+            'most_searched_areas': SearchAreaAnalytics.searches_near(
+                hostels.values_list('latitude', 'longitude'), self.search_area_radius_km, since
+            )[:self.search_area_limit],
+        }
+
+    def latest_summary(self, hostel_filter, period_type):
+        """Most recent generated period, summed across the hostels in scope"""
+        summaries = AnalyticsSummary.objects.filter(**hostel_filter, period_type=period_type)
+        start_date = summaries.aggregate(latest=Max('start_date'))['latest']
+        if start_date is None:
+            return None
+
+        totals = summaries.filter(start_date=start_date).aggregate(
+            total_views=Sum('total_views'),
+            unique_visitors=Sum('unique_visitors'),
+            total_contacts=Sum('total_contacts'),
+            total_favorites=Sum('total_favorites'),
+            total_searches=Sum('total_searches')
+        )
+        views, contacts = totals['total_views'], totals['total_contacts']
+        return AnalyticsSummary(
+            period_type=period_type,
+            start_date=start_date,
+            end_date=AnalyticsSummary.period_end(period_type, start_date),
+            conversion_rate=(contacts / views * 100) if views > 0 else 0,
+            **totals
+        )
+
+
+def parse_days(request, max_days, default=30):
+    """Validated ?days= value, or None when it is missing a 1..max_days integer"""
+    try:
+        days = int(request.query_params.get('days', default))
+    except ValueError:
+        return None
+    return days if 1 <= days <= max_days else None
+
+
+class SearchHeatmapView(APIView):
+    """
+    GET: Where students have been searching, from the geohash rollup.
+    Query: ?days=30 (1-90), ?precision=5 (1-6 geohash characters),
+    optional ?bbox=min_lat,min_lng,max_lat,max_lng
+    Owners and staff only.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    max_days = 90
+    max_cells = 2000
+
+    def get(self, request):
+        if request.user.role != 'owner' and not request.user.is_staff:
+            return Response({
+                'error': 'Only owners can view search demand.'
+            }, status=status.HTTP_403_FORBIDDEN)
+
+        days = parse_days(request, self.max_days)
+        if days is None:
+            return Response({
+                'error': 'Invalid days',
+                'details': f'days must be an integer between 1 and {self.max_days}'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            precision = int(request.query_params.get('precision', 5))
+            bbox = request.query_params.get('bbox')
+            bbox = tuple(float(value) for value in bbox.split(',')) if bbox else None
+            if not 1 <= precision <= geohash.CELL_PRECISION or (bbox and len(bbox) != 4):
+                raise ValueError
+        except ValueError:
+            return Response({
+                'error': 'Invalid parameters',
+                'details': f'precision must be 1-{geohash.CELL_PRECISION}; bbox must be min_lat,min_lng,max_lat,max_lng'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        since = timezone.now().date() - timedelta(days=days - 1)
+        cells = SearchAreaAnalytics.heatmap(since, precision, bbox)[:self.max_cells]
+        return Response({
+            'days': days,
+            'precision': precision,
+            'cells': SearchAreaSerializer(cells, many=True).data
+        }, status=status.HTTP_200_OK)
+
+
+class HostelSearchDemandView(APIView):
+    """
+    GET: How many searches were run within X km of the owner's hostel.
+    Query: ?radius=5 (1-50 km), ?days=30 (1-90)
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    max_days = 90
+    top_areas = 10
+
+    def get(self, request, hostel_id):
+        hostel = get_object_or_404(Hostel, pk=hostel_id)
+        if hostel.owner_id != request.user.id:
+            return Response({
+                'error': 'You can only view search demand for your own hostels.'
+            }, status=status.HTTP_403_FORBIDDEN)
+
+        days = parse_days(request, self.max_days)
+        try:
+            radius = float(request.query_params.get('radius', 5))
+        except ValueError:
+            radius = 0
+        if days is None or not 1 <= radius <= 50:
+            return Response({
+                'error': 'Invalid parameters',
+                'details': f'radius must be 1-50 km and days an integer between 1 and {self.max_days}'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        since = timezone.now().date() - timedelta(days=days - 1)
+        areas = SearchAreaAnalytics.searches_near([(hostel.latitude, hostel.longitude)], radius, since)
+        return Response({
+            'hostel_id': hostel.id,
+            'radius_km': radius,
+            'days': days,
+            'searches': sum(area['searches'] for area in areas),
+            'top_areas': SearchAreaSerializer(areas[:self.top_areas], many=True).data
+        }, status=status.HTTP_200_OK)
+
+
+class AnalyticsExportStreamView(APIView):
+    """
+    GET: Stream an export straight back as a .csv.gz download.
+    Query: ?kind=daily|interactions&start_date=YYYY-MM-DD&end_date=YYYY-MM-DD[&hostel=<id>]
+    Ranges longer than max_stream_days must go through POST analytics/exports/.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    max_stream_days = {'daily': 366, 'interactions': 31}
+
+    def get(self, request):
+        if request.user.role != 'owner':
+            return Response({
+                'error': 'Only owners can export analytics.'
+            }, status=status.HTTP_403_FORBIDDEN)
+
+        serializer = AnalyticsExportSerializer(data=request.query_params, context={'request': request})
+        if not serializer.is_valid():
+            return Response({
+                'error': 'Invalid export request',
+                'details': serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        data = serializer.validated_data
+        kind, start_date, end_date = data['kind'], data['start_date'], data['end_date']
+        if (end_date - start_date).days >= self.max_stream_days[kind]:
+            return Response({
+                'error': 'Export too large to stream',
+                'details': f'Use POST /api/engagement/analytics/exports/ for more than '
+                           f'{self.max_stream_days[kind]} days of {kind} data'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        hostel = data.get('hostel')
+        hostel_ids = [hostel.id] if hostel else list(
+            Hostel.objects.filter(owner=request.user).values_list('id', flat=True)
+        )
+        response = StreamingHttpResponse(
+            stream_export(kind, hostel_ids, start_date, end_date),
+            content_type='application/gzip'
+        )
+        response['Content-Disposition'] = f'attachment; filename="{export_filename(kind, start_date, end_date)}"'
+        return response
+
+
+class AnalyticsExportListCreateView(generics.ListCreateAPIView):
+    """
+    GET: The owner's export jobs
+    POST: Queue a background export; poll the returned job until it is completed
+    """
+    serializer_class = AnalyticsExportSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return AnalyticsExport.objects.filter(owner=self.request.user)
+
+    def create(self, request, *args, **kwargs):
+        if request.user.role != 'owner':
+            raise PermissionDenied("Only owners can export analytics.")
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save(owner=request.user)
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+
+
+class AnalyticsExportDetailView(generics.RetrieveAPIView):
+    """GET: Poll an export job's status"""
+    serializer_class = AnalyticsExportSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return AnalyticsExport.objects.filter(owner=self.request.user)
+
+
+class AnalyticsExportDownloadView(APIView):
+    """GET: Download a completed export's .csv.gz file"""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, pk):
+        job = get_object_or_404(AnalyticsExport, pk=pk, owner=request.user)  # 404 for other users' jobs
+        if job.status != 'completed':
+            return Response({
+                'error': 'Export not ready',
+                'details': f'Export is {job.status}'
+            }, status=status.HTTP_409_CONFLICT)
+        try:
+            handle = open(job.file_path, 'rb')
+        except OSError:
+            return Response({
+                'error': 'Export file is no longer available'
+            }, status=status.HTTP_410_GONE)
+        return FileResponse(
+            handle,
+            as_attachment=True,
+            filename=export_filename(job.kind, job.start_date, job.end_date),
+            content_type='application/gzip'
+        )
+
+
+class HostelFunnelView(APIView):
+    """
+    GET: Search -> view -> favorite -> contact funnel for one of the owner's
+    hostels, or for all of them when no hostel_id is given.
+    Query: ?days=30 (1-90). Reads DailyFunnel rows only.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    max_days = 90
+
+    def get(self, request, hostel_id=None):
+        if request.user.role != 'owner':
+            return Response({
+                'error': 'Only owners can view funnels.'
+            }, status=status.HTTP_403_FORBIDDEN)
+
+        days = parse_days(request, self.max_days)
+        if days is None:
+            return Response({
+                'error': 'Invalid days',
+                'details': f'days must be an integer between 1 and {self.max_days}'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        if hostel_id is not None:
+            get_object_or_404(Hostel, pk=hostel_id, owner=request.user)
+            funnels = DailyFunnel.objects.filter(hostel_id=hostel_id)
+        else:
+            funnels = DailyFunnel.objects.filter(hostel__owner=request.user)
+        funnels = funnels.filter(date__gte=timezone.now().date() - timedelta(days=days - 1))
+
+        daily = [
+            DailyFunnel(**row)
+            for row in funnels.values('date').annotate(
+                **{name: Sum(name) for name in DailyFunnel.FUNNEL_FIELDS}
+            ).order_by('-date')
+        ]
+        return Response({
+            'days': days,
+            'totals': DailyFunnel.totals(funnels),
+            'daily': DailyFunnelSerializer(daily, many=True).data
+        }, status=status.HTTP_200_OK)
+
+
+class FunnelReportView(APIView):
+    """
+    GET: Platform-wide funnel with a per-hostel breakdown (staff only).
+    Query: ?days=30 (1-365), ?city=, ?limit=50 (1-500)
+    Hostels are ordered by search appearances.
+    """
+    permission_classes = [permissions.IsAdminUser]
+    max_days = 365
+    max_limit = 500
+
+    def get(self, request):
+        days = parse_days(request, self.max_days)
+        try:
+            limit = int(request.query_params.get('limit', 50))
+        except ValueError:
+            limit = 0
+        if days is None or not 1 <= limit <= self.max_limit:
+            return Response({
+                'error': 'Invalid parameters',
+                'details': f'days must be 1-{self.max_days} and limit 1-{self.max_limit}'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        funnels = DailyFunnel.objects.filter(date__gte=timezone.now().date() - timedelta(days=days - 1))
+        city = request.query_params.get('city')
+        if city:
+            funnels = funnels.filter(hostel__city=city)
+
+        hostels = funnels.values('hostel_id', 'hostel__name', 'hostel__city').annotate(
+            **{name: Sum(name) for name in DailyFunnel.FUNNEL_FIELDS}
+        ).order_by('-appearances', 'hostel_id')[:limit]
+        return Response({
+            'days': days,
+            'city': city,
+            'totals': DailyFunnel.totals(funnels),
+            'hostels': [
+                {
+                    'hostel_id': row.pop('hostel_id'),
+                    'hostel_name': row.pop('hostel__name'),
+                    'city': row.pop('hostel__city'),
+                    **row,
+                    **DailyFunnel.rates(row),
+                }
+                for row in hostels
+            ]
+        }, status=status.HTTP_200_OK)
+
+
+class TrendingHostelsView(APIView):
+    """
+    GET: Hostels with the most recent activity (views, favorites, contacts,
+    decaying with a 3-day half-life), optionally for one city.
+    Query: ?city=lahore
+    The top-N list per city is precomputed and read from cache.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        city = request.query_params.get('city') or None
+        if city and city not in dict(CITY_CHOICES):
+            return Response({
+                'error': 'Invalid city',
+                'details': f"city must be one of: {', '.join(dict(CITY_CHOICES))}"
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'city': city,
+            'results': TrendingScore.top(city)
+        }, status=status.HTTP_200_OK)
+
+
+class SimilarHostelsView(APIView):
+    """
+    GET: Hostels most similar to this one in the same city (location, price,
+    gender, facilities, rating), precomputed nightly by compute_similar_hostels.
+    Query: ?limit=10
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, hostel_id):
+        row = SimilarHostels.objects.filter(hostel_id=hostel_id).values_list('entries', 'computed_at').first()
+        entries, computed_at = row or ([], None)
+        try:
+            limit = max(1, int(request.query_params.get('limit', len(entries) or 1)))
+        except ValueError:
+            limit = len(entries)
+        return Response({
+            'hostel_id': hostel_id,
+            'computed_at': computed_at,
+            'results': entries[:limit]
+        }, status=status.HTTP_200_OK)
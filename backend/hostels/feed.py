@@ -0,0 +1,186 @@
+"""
+Room availability change feed.
+
+Clients keep the id of the last RoomChange they saw (the cursor) and ask
+for rows after it, optionally limited to some hostels or a map viewport.
+With no cursor they get the current head and only see changes from then
+on. Both transports below read the same query, an index range scan on
+feed_position (or on (hostel, feed_position) when filtering by hostel):
+
+- long-poll: the request waits up to `wait` seconds for the first change
+- Server-Sent Events: a stream of `room_change` events that ends after
+  STREAM_SECONDS; EventSource reconnects with Last-Event-ID as the cursor
+
+Ids are handed out at insert but become visible at commit, so a row can
+appear after a higher id. Readers therefore order by feed_position, which
+stamp() hands out to rows only once they are committed (one stamper at a
+time), so a position is never passed over by a cursor that has moved on.
+A transaction that is still open only delays its own rows; nothing else
+waits for it, however long it runs.
+
+Waiting requests hold a worker thread, so each process lets at most
+ROOM_CHANGE_MAX_WAITERS wait at once (past that, long-polls answer
+straight away and streams ask the client to come back later) and gives
+its database connection back between polls. Route rooms/changes/ to
+workers sized for that, e.g. a separate gunicorn pool with gthread
+workers, so waiting clients never starve the rest of the API.
+"""
+import json
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from .models import RoomChange
+
+POLL_SECONDS = 1
+HEARTBEAT_SECONDS = 15
+STREAM_SECONDS = 300
+BATCH_SIZE = 200
+RETRY_MS = 3000  # EventSource reconnect delay
+BUSY_RETRY_MS = 30000  # reconnect delay when the process has no waiter slot free
+STAMP_BATCH = 5000  # rows numbered per stamp() call
+STAMP_LOCK_KEY = 0x524f4f4d  # pg advisory lock serializing stamp()
+
+_waiters = 0
+_waiters_lock = threading.Lock()
+
+
+def acquire_waiter():
+    """Take one of this process's ROOM_CHANGE_MAX_WAITERS slots; False when all are in use"""
+    global _waiters
+    with _waiters_lock:
+        if _waiters >= settings.ROOM_CHANGE_MAX_WAITERS:
+            return False
+        _waiters += 1
+        return True
+
+
+def release_waiter():
+    global _waiters
+    with _waiters_lock:
+        _waiters -= 1
+
+
+def _sleep(seconds):
+    """Sleep without holding a database connection (unless inside a transaction)"""
+    if not connection.in_atomic_block:
+        connection.close()
+    time.sleep(seconds)
+
+
+def stamp(limit=STAMP_BATCH):
+    """
+    Number committed, unstamped rows after the highest feed_position, in id
+    order; returns the rows stamped. On PostgreSQL stampers take turns on a
+    transaction-level advisory lock and a caller that finds it taken skips,
+    since the holder is stamping the same rows; rows a stamper cannot see
+    yet (still uncommitted) get a higher position from a later stamp.
+    """
+    table = connection.ops.quote_name(RoomChange._meta.db_table)
+    column = connection.ops.quote_name('feed_position')
+    with transaction.atomic(), connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute("SELECT pg_try_advisory_xact_lock(%s)", [STAMP_LOCK_KEY])
+            if not cursor.fetchone()[0]:
+                return 0
+        cursor.execute(
+            f"UPDATE {table} SET {column} = numbered.next_position FROM ("
+            f" SELECT id, (SELECT COALESCE(MAX({column}), 0) FROM {table})"
+            f" + ROW_NUMBER() OVER (ORDER BY id) AS next_position"
+            f" FROM {table} WHERE {column} IS NULL ORDER BY id LIMIT %s"
+            f") AS numbered WHERE {table}.id = numbered.id",
+            [limit]
+        )
+        return cursor.rowcount
+
+
+def head():
+    """(feed_position, id) of the newest change, (0, 0) on an empty feed; its id is the cursor"""
+    stamp()
+    return (
+        RoomChange.objects.filter(feed_position__isnull=False)
+        .order_by('-feed_position').values_list('feed_position', 'id').first()
+    ) or (0, 0)
+
+
+def position(cursor):
+    """
+    feed_position to read after, or None when the cursor's row is gone
+    (pruned or never handed out) and the client has to start again from head()
+    """
+    if cursor == 0:
+        return 0
+    return RoomChange.objects.filter(id=cursor, feed_position__isnull=False).values_list(
+        'feed_position', flat=True
+    ).first()
+
+
+def changes_since(after, hostel_ids=None, bbox=None, limit=BATCH_SIZE):
+    """Changes after a position() in feed order"""
+    stamp()
+    queryset = RoomChange.objects.filter(feed_position__gt=after)
+    if hostel_ids:
+        queryset = queryset.filter(hostel_id__in=hostel_ids)
+    if bbox:
+        min_lat, min_lng, max_lat, max_lng = bbox
+        queryset = queryset.filter(
+            hostel__latitude__range=(min_lat, max_lat),
+            hostel__longitude__range=(min_lng, max_lng),
+        )
+    return list(queryset.order_by('feed_position')[:limit])
+
+
+def wait_for_changes(after, hostel_ids=None, bbox=None, wait=0):
+    """changes_since(), polling every POLL_SECONDS for up to wait seconds until something arrives"""
+    deadline = time.monotonic() + wait
+    while True:
+        changes = changes_since(after, hostel_ids, bbox)
+        if changes or time.monotonic() >= deadline:
+            return changes
+        _sleep(POLL_SECONDS)
+
+
+def _event(name, data, event_id=None):
+    lines = [f'id: {event_id}'] if event_id is not None else []
+    lines += [f'event: {name}', f'data: {json.dumps(data)}']
+    return '\n'.join(lines) + '\n\n'
+
+
+def event_stream(cursor, serialize, hostel_ids=None, bbox=None):
+    """
+    Yield SSE text for changes after cursor until STREAM_SECONDS pass.
+    serialize turns a RoomChange into a JSON-ready dict. A cursor that has
+    been pruned gets a `reset` event carrying the head to resume from; a
+    process with no waiter slot free sends `busy` and a longer retry.
+    """
+    if not acquire_waiter():
+        yield f'retry: {BUSY_RETRY_MS}\n\n'
+        yield _event('busy', {'retry_ms': BUSY_RETRY_MS})
+        return
+
+    try:
+        yield f'retry: {RETRY_MS}\n\n'
+        after = None if cursor is None else position(cursor)
+        if after is None:
+            after, head_id = head()
+            yield _event('ready' if cursor is None else 'reset', {'cursor': head_id}, head_id)
+
+        deadline = time.monotonic() + STREAM_SECONDS
+        last_sent = time.monotonic()
+        while time.monotonic() < deadline:
+            changes = changes_since(after, hostel_ids, bbox)
+            for change in changes:
+                after = change.feed_position
+                yield _event('room_change', serialize(change), change.id)
+            if changes:
+                last_sent = time.monotonic()
+                if len(changes) == BATCH_SIZE:
+                    continue  # more waiting, skip the sleep
+            elif time.monotonic() - last_sent >= HEARTBEAT_SECONDS:
+                yield ': keep-alive\n\n'
+                last_sent = time.monotonic()
+            _sleep(POLL_SECONDS)
+    finally:
+        release_waiter()
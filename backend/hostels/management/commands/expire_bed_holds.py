@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from hostels.models import BedHold
+
+
+class Command(BaseCommand):
+    help = (
+        'Expire bed holds past their expires_at and return the beds to their '
+        'rooms. Run every minute or so; safe to run from several workers.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Holds expired per transaction'
+        )
+
+    def handle(self, *args, **options):
+        expired = BedHold.expire_due(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Expired {expired} bed hold(s)"))
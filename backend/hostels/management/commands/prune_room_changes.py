@@ -0,0 +1,24 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from hostels.models import RoomChange
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete room availability feed rows older than ROOM_CHANGE_RETENTION_DAYS. '
+        'Clients holding an older cursor get reset=true and re-run their search.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.ROOM_CHANGE_RETENTION_DAYS,
+            help='Keep this many days of changes'
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        deleted, _ = RoomChange.objects.filter(created_at__lt=cutoff).delete()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} room change(s)"))
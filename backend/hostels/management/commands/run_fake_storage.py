@@ -0,0 +1,98 @@
+import json
+import mimetypes
+import os
+from email import policy
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+from django.core.management.base import BaseCommand
+from hostels.storage import LocalImageStorage
+
+MAX_UPLOAD_BYTES = 10 * 1024 * 1024
+
+
+class FakeStorageHandler(BaseHTTPRequestHandler):
+    """
+    POST /upload: multipart form with public_id, expires, signature and file,
+    as returned by LocalImageStorage.signed_upload(). GET /<public_id.ext>
+    serves a stored file back.
+    """
+    storage = None
+
+    def do_POST(self):
+        if urlparse(self.path).path != '/upload':
+            return self.reply(404, {'error': 'Not found'})
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > MAX_UPLOAD_BYTES:
+            return self.reply(413, {'error': 'File too large'})
+
+        body = self.rfile.read(length)
+        header = f"Content-Type: {self.headers.get('Content-Type', '')}\r\n\r\n".encode()
+        message = BytesParser(policy=policy.HTTP).parsebytes(header + body)
+        if not message.is_multipart():
+            return self.reply(400, {'error': 'Expected multipart/form-data'})
+
+        fields, file_part = {}, None
+        for part in message.iter_parts():
+            name = part.get_param('name', header='content-disposition')
+            if part.get_filename() is not None:
+                file_part = part
+            elif name:
+                fields[name] = part.get_payload(decode=True).decode()
+
+        public_id = fields.get('public_id', '')
+        if not self.storage.check_signature(public_id, fields.get('expires'), fields.get('signature')):
+            return self.reply(401, {'error': 'Invalid or expired signature'})
+        if file_part is None:
+            return self.reply(400, {'error': 'No file'})
+
+        stored = self.storage.save(public_id, file_part.get_filename(), [file_part.get_payload(decode=True)])
+        self.reply(200, {'public_id': public_id, 'path': stored})
+
+    def do_GET(self):
+        public_id = urlparse(self.path).path.lstrip('/')
+        path = self.storage.path(public_id)
+        if '..' in public_id.split('/') or not os.path.isfile(path):
+            return self.reply(404, {'error': 'Not found'})
+        with open(path, 'rb') as fh:
+            data = fh.read()
+        self.send_response(200)
+        self.send_header('Content-Type', mimetypes.guess_type(path)[0] or 'application/octet-stream')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def reply(self, code, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class Command(BaseCommand):
+    help = (
+        'Run a local stand-in for direct-to-storage uploads. Point '
+        'IMAGE_STORAGE_BACKEND at hostels.storage.LocalImageStorage and '
+        'LOCAL_UPLOAD_SERVER_URL at this server; files land in LOCAL_IMAGE_STORAGE_ROOT.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+
+    def handle(self, *args, **options):
+        FakeStorageHandler.storage = LocalImageStorage()
+        server = ThreadingHTTPServer((options['host'], options['port']), FakeStorageHandler)
+        self.stdout.write(self.style.SUCCESS(
+            f"Fake storage on http://{options['host']}:{options['port']}/upload "
+            f"-> {FakeStorageHandler.storage.root}"
+        ))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
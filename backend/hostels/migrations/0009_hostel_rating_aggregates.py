@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-19 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hostels', '0008_hostel_media_hostel_verification_status_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hostel',
+            name='average_rating',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='hostel',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='hostel',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-19 18:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hostels', '0010_bed_holds'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoomChange',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('room_id', models.BigIntegerField()),
+                ('kind', models.CharField(choices=[('created', 'Created'), ('updated', 'Updated'), ('deleted', 'Deleted')], default='updated', max_length=10)),
+                ('total_capacity', models.PositiveIntegerField()),
+                ('available_capacity', models.PositiveIntegerField()),
+                ('rent', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('is_available', models.BooleanField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('hostel', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='room_changes', to='hostels.hostel')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['hostel', 'id'], name='hostels_roo_hostel__533845_idx'), models.Index(fields=['created_at'], name='hostels_roo_created_fa29f9_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-19 18:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hostels', '0011_roomchange'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='hostel',
+            index=models.Index(fields=['created_at', 'id'], name='hostels_hos_created_c7b825_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='hostel',
+            index=models.Index(fields=['city', 'created_at', 'id'], name='hostels_hos_city_f17916_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='hostel',
+            index=models.Index(fields=['gender', 'created_at', 'id'], name='hostels_hos_gender_e2e742_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='hostel',
+            index=models.Index(fields=['verification_status', 'created_at', 'id'], name='hostels_hos_verific_bbc579_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='hostel',
+            index=models.Index(fields=['owner', 'created_at', 'id'], name='hostels_hos_owner_i_0350f9_idx'),
+        ),
+    ]
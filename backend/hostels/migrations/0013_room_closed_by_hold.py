@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 19:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hostels', '0012_hostel_list_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='room',
+            name='closed_by_hold',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.6 on 2026-10-19 20:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hostels', '0013_room_closed_by_hold'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='roomchange',
+            name='hostels_roo_hostel__533845_idx',
+        ),
+        migrations.AddField(
+            model_name='roomchange',
+            name='txid',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='roomchange',
+            index=models.Index(fields=['txid', 'id'], name='hostels_roo_txid_60b8eb_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='roomchange',
+            index=models.Index(fields=['hostel', 'txid', 'id'], name='hostels_roo_hostel__19b02f_idx'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.6 on 2026-10-19 20:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import F
+
+
+def stamp_existing_changes(apps, schema_editor):
+    """Existing rows are all committed; number them by id so old cursors keep working"""
+    RoomChange = apps.get_model('hostels', 'RoomChange')
+    RoomChange.objects.update(feed_position=F('id'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hostels', '0014_roomchange_txid'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='roomchange',
+            name='hostels_roo_txid_60b8eb_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='roomchange',
+            name='hostels_roo_hostel__19b02f_idx',
+        ),
+        migrations.AddField(
+            model_name='roomchange',
+            name='feed_position',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.RunPython(stamp_existing_changes, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='roomchange',
+            name='txid',
+        ),
+        migrations.AlterField(
+            model_name='roomchange',
+            name='hostel',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='room_changes', to='hostels.hostel'),
+        ),
+        migrations.AddIndex(
+            model_name='roomchange',
+            index=models.Index(fields=['feed_position'], name='hostels_roo_feed_po_fdd1ae_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='roomchange',
+            index=models.Index(fields=['hostel', 'feed_position'], name='hostels_roo_hostel__6dc297_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='roomchange',
+            index=models.Index(condition=models.Q(('feed_position__isnull', True)), fields=['id'], name='roomchange_unstamped_idx'),
+        ),
+    ]
@@ -1,4 +1,9 @@
-from django.db import models
+from datetime import timedelta
+
+from django.db import models, transaction
+from django.db.models import Case, Count, F, FloatField, Q, Value, When
+from django.db.models.functions import Cast, Least, NullIf
+from django.utils import timezone
 from users.models import User
 from cloudinary.models import CloudinaryField
 
@@ -40,8 +45,44 @@ class Hostel(models.Model):
     description = models.TextField(blank=True, null=True)
     verification_status = models.BooleanField(default=False)
     verification_status = models.BooleanField(default=False)
+    # Denormalized review aggregates, maintained by Review.save()/delete()
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
+    average_rating = models.FloatField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        # The hostel list pages newest first on (created_at, id), alone or after one filter
+        indexes = [
+            models.Index(fields=['created_at', 'id']),
+            models.Index(fields=['city', 'created_at', 'id']),
+            models.Index(fields=['gender', 'created_at', 'id']),
+            models.Index(fields=['verification_status', 'created_at', 'id']),
+            models.Index(fields=['owner', 'created_at', 'id']),
+        ]
+
+    @classmethod
+    def apply_rating_delta(cls, hostel_id, rating_delta, count_delta):
+        """Shift the stored rating aggregates in a single UPDATE.
+
+        The average is derived from the pre-update column values in the same
+        statement, so concurrent reviews never read a half-applied state.
+        """
+        new_sum = F('rating_sum') + rating_delta
+        new_count = F('rating_count') + count_delta
+        cls.objects.filter(pk=hostel_id).update(
+            rating_sum=new_sum,
+            rating_count=new_count,
+            average_rating=Cast(new_sum, FloatField()) / NullIf(new_count, 0),
+        )
+
+    def delete(self, *args, **kwargs):
+        # The cascade deletes rooms without Room.delete(), so log them here;
+        # RoomChange rows outlive the hostel for clients following the feed
+        with transaction.atomic():
+            RoomChange.record_deleted(self.rooms.all())
+            return super().delete(*args, **kwargs)
+
 
 class Room(models.Model):
     hostel = models.ForeignKey(Hostel, on_delete=models.CASCADE,  related_name="rooms")
@@ -54,10 +95,123 @@ class Room(models.Model):
     facilities = models.JSONField(blank=True, null=True, help_text="List of available facilities")
     description = models.TextField(blank=True, null=True)
     is_available = models.BooleanField(default=True)  
+    # Set when take_bed() closed the room by taking its last bed, so
+    # return_beds() reopens only those rooms and never one the owner closed
+    closed_by_hold = models.BooleanField(default=False)
     verification_status = models.BooleanField(default=False)
     verification_status = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        update_fields = kwargs.get('update_fields')
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if adding or update_fields is None or set(update_fields) & set(RoomChange.TRACKED_FIELDS):
+                RoomChange.record([self.pk], 'created' if adding else 'updated')
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            RoomChange.record_deleted([self])
+            return super().delete(*args, **kwargs)
+
+    @classmethod
+    def take_bed(cls, room_id):
+        """Claim one bed with a conditional UPDATE; returns False when none is free.
+
+        The WHERE clause does the check, so concurrent callers can never drive
+        available_capacity below zero. Taking the last bed also marks the room
+        unavailable (and closed_by_hold) in the same statement, and the
+        RoomChange row commits with it.
+        """
+        last_bed = Q(available_capacity=1)
+        with transaction.atomic():
+            taken = cls.objects.filter(
+                pk=room_id, is_available=True, available_capacity__gt=0
+            ).update(
+                available_capacity=F('available_capacity') - 1,
+                is_available=Case(When(last_bed, then=Value(False)), default=F('is_available')),
+                closed_by_hold=Case(When(last_bed, then=Value(True)), default=F('closed_by_hold')),
+            ) == 1
+            if taken:
+                RoomChange.record([room_id])
+        return taken
+
+    @classmethod
+    def return_beds(cls, room_id, count=1):
+        """
+        Give beds back (capped at total_capacity), reopening the room only if
+        take_bed() closed it; a room the owner closed stays closed.
+        """
+        with transaction.atomic():
+            cls.objects.filter(pk=room_id).update(
+                available_capacity=Least(F('available_capacity') + count, F('total_capacity')),
+                is_available=Case(When(closed_by_hold=True, then=Value(True)), default=F('is_available')),
+                closed_by_hold=Value(False),
+            )
+            RoomChange.record([room_id])
+
+class RoomChange(models.Model):
+    """
+    Append-only log of room availability and rent, one row per change.
+
+    The feed (see hostels/feed.py) reads rows in feed_position order, a
+    number stamped on each row after its transaction commits, and clients
+    resume after the id of the last row they saw. Rows snapshot the room
+    after the change so a client can apply them without re-fetching.
+    Written in the same transaction as the change by Room.save()/delete(),
+    Hostel.delete(), take_bed()/return_beds() and the bulk room endpoint;
+    pruned by prune_room_changes. Rows are kept when their hostel is
+    deleted, so hostel is not a database-level foreign key.
+    """
+    KIND_CHOICES = (
+        ('created', 'Created'),
+        ('updated', 'Updated'),
+        ('deleted', 'Deleted'),
+    )
+    TRACKED_FIELDS = ('total_capacity', 'available_capacity', 'rent', 'is_available')
+
+    id = models.BigAutoField(primary_key=True)
+    room_id = models.BigIntegerField()  # not a FK: deleted rooms keep their 'deleted' row
+    hostel = models.ForeignKey(
+        Hostel, on_delete=models.DO_NOTHING, db_constraint=False, related_name='room_changes'
+    )
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, default='updated')
+    total_capacity = models.PositiveIntegerField()
+    available_capacity = models.PositiveIntegerField()
+    rent = models.DecimalField(max_digits=10, decimal_places=2)
+    is_available = models.BooleanField()
+    feed_position = models.BigIntegerField(null=True, blank=True)  # set by feed.stamp() once committed
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['feed_position']),
+            models.Index(fields=['hostel', 'feed_position']),
+            models.Index(fields=['id'], condition=Q(feed_position__isnull=True), name='roomchange_unstamped_idx'),
+            models.Index(fields=['created_at']),
+        ]
+
+    @classmethod
+    def record(cls, room_ids, kind='updated'):
+        """Append the current state of the given rooms"""
+        rooms = list(Room.objects.filter(pk__in=room_ids).values('id', 'hostel_id', *cls.TRACKED_FIELDS))
+        if not rooms:
+            return
+        cls.objects.bulk_create([cls(room_id=room.pop('id'), kind=kind, **room) for room in rooms])
+
+    @classmethod
+    def record_deleted(cls, rooms):
+        cls.objects.bulk_create([
+            cls(
+                room_id=room.pk, hostel_id=room.hostel_id, kind='deleted',
+                total_capacity=room.total_capacity, available_capacity=0,
+                rent=room.rent, is_available=False,
+            )
+            for room in rooms
+        ])
+
+
 # List of allowed facilities
 ALLOWED_FACILITIES = [
     'wifi', 'ac', 'heater', 'tv', 'laundry', 
@@ -70,3 +224,94 @@ class RoomImage(models.Model):
     room = models.ForeignKey(Room, on_delete=models.CASCADE, related_name="images")
     image = CloudinaryField('image', blank=False, null=False)
     uploaded_at = models.DateTimeField(auto_now_add=True)
+
+
+class BedHold(models.Model):
+    """
+    A bed set aside for a student. Placing a hold takes a bed through
+    Room.take_bed(); releasing or expiring it gives the bed back. Status
+    changes are conditional UPDATEs on the hold row, so a hold is returned
+    at most once even when release and the expiry sweep race.
+    """
+    STATUS_CHOICES = (
+        ('active', 'Active'),
+        ('confirmed', 'Confirmed'),
+        ('released', 'Released'),
+        ('expired', 'Expired'),
+    )
+
+    room = models.ForeignKey(Room, on_delete=models.CASCADE, related_name='holds')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='bed_holds')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='active')
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'expires_at']),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['room', 'user'], condition=Q(status='active'),
+                name='one_active_hold_per_user_room'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} holds a bed in room {self.room_id} ({self.status})"
+
+    @classmethod
+    def place(cls, room_id, user, minutes):
+        """Take a bed and record the hold; None when the room has no free bed"""
+        with transaction.atomic():
+            if not Room.take_bed(room_id):
+                return None
+            return cls.objects.create(
+                room_id=room_id, user=user,
+                expires_at=timezone.now() + timedelta(minutes=minutes)
+            )
+
+    def _finish(self, new_status, return_bed):
+        """Move an active hold to new_status; False if it was no longer active"""
+        with transaction.atomic():
+            changed = type(self).objects.filter(pk=self.pk, status='active').update(
+                status=new_status, updated_at=timezone.now()
+            )
+            if not changed:
+                return False
+            if return_bed:
+                Room.return_beds(self.room_id)
+        self.status = new_status
+        return True
+
+    def release(self):
+        return self._finish('released', return_bed=True)
+
+    def confirm(self):
+        """The bed stays taken for good"""
+        return self._finish('confirmed', return_bed=False)
+
+    @classmethod
+    def expire_due(cls, now=None, batch_size=500):
+        """Expire active holds past expires_at and give their beds back; returns the count"""
+        now = now or timezone.now()
+        expired = 0
+        while True:
+            with transaction.atomic():
+                ids = list(
+                    cls.objects.select_for_update(skip_locked=True)
+                    .filter(status='active', expires_at__lte=now)
+                    .values_list('id', flat=True)[:batch_size]
+                )
+                if not ids:
+                    return expired
+                cls.objects.filter(id__in=ids).update(status='expired', updated_at=now)
+                per_room = (
+                    cls.objects.filter(id__in=ids).values('room_id')
+                    .annotate(beds=Count('id')).order_by('room_id')
+                )
+                for row in per_room:
+                    Room.return_beds(row['room_id'], row['beds'])
+            expired += len(ids)
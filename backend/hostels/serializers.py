@@ -1,6 +1,7 @@
 
 from rest_framework import serializers
-from .models import RoomImage, Hostel, Room, ALLOWED_FACILITIES
+from backend.fieldsets import SparseFieldsetMixin
+from .models import RoomImage, Hostel, Room, BedHold, RoomChange, ALLOWED_FACILITIES
 from .choices import VALID_FACILITIES, FACILITY_DICT, HOSTEL_FACILITIES
 
 # RoomImage serializer for multiple images per room
@@ -13,7 +14,7 @@ class RoomImageSerializer(serializers.ModelSerializer):
 from rest_framework import serializers
 from .models import Room, Hostel
 
-class RoomSerializer(serializers.ModelSerializer):
+class RoomSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     def validate(self, data):
         # Validate capacity
         if 'available_capacity' in data and 'total_capacity' in data:
@@ -74,10 +75,53 @@ class RoomSerializer(serializers.ModelSerializer):
         if hostel.owner != request.user:
             raise serializers.ValidationError("You can only add rooms to your own hostels.")
         return hostel
+
+    def update(self, instance, validated_data):
+        # The owner changing availability takes over from a hold that closed
+        # the room (see Room.take_bed); a PUT resending the same value does not
+        if validated_data.get('is_available', instance.is_available) != instance.is_available:
+            validated_data['closed_by_hold'] = False
+        return super().update(instance, validated_data)
     
 
 # serializers.py
-class RoomDetailSerializer(serializers.ModelSerializer):
+class BulkRoomCreateSerializer(RoomSerializer):
+    """A new room in a bulk request; the hostel comes from the URL"""
+
+    class Meta(RoomSerializer.Meta):
+        fields = [name for name in RoomSerializer.Meta.fields if name != 'hostel']
+
+
+class BulkRoomUpdateSerializer(serializers.ModelSerializer):
+    """Availability, rent and capacity changes to one existing room in a bulk request"""
+
+    class Meta:
+        model = Room
+        fields = ['total_capacity', 'available_capacity', 'rent', 'is_available']
+
+    def validate(self, data):
+        if not data:
+            raise serializers.ValidationError(
+                f'Provide at least one of: {", ".join(self.Meta.fields)}'
+            )
+
+        # Compare against the stored value for whichever side is not being changed
+        total = data.get('total_capacity', self.instance.total_capacity)
+        available = data.get('available_capacity', self.instance.available_capacity)
+        if available > total:
+            raise serializers.ValidationError({
+                'available_capacity': 'Available capacity cannot exceed total capacity'
+            })
+
+        if 'rent' in data and data['rent'] <= 0:
+            raise serializers.ValidationError({
+                'rent': 'Rent must be greater than 0'
+            })
+
+        return data
+
+
+class RoomDetailSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     # facilities_display = serializers.SerializerMethodField()
     hostel_name = serializers.CharField(source="hostel.name", read_only=True)
     images = RoomImageSerializer(many=True, read_only=True)
@@ -135,7 +179,7 @@ class RoomUpdateSerializer(serializers.ModelSerializer):
 # -----------------------------
 # Hostel Serializer
 # -----------------------------
-class HostelSerializer(serializers.ModelSerializer):
+class HostelSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     rooms = RoomSerializer(many=True, read_only=True)
 
     class Meta:
@@ -151,10 +195,113 @@ class HostelSerializer(serializers.ModelSerializer):
             "gender",
             "total_rooms",
             "description",
+            "average_rating",
+            "rating_count",
+            "created_at",
+            "rooms",
+        ]
+        read_only_fields = ["owner", "average_rating", "rating_count"]   # owner is not settable from API input
+
+
+# -----------------------------
+# Owner portfolio
+# -----------------------------
+class PortfolioRoomSerializer(serializers.ModelSerializer):
+    image_count = serializers.IntegerField(read_only=True)  # annotated by the view
+
+    class Meta:
+        model = Room
+        fields = [
+            "id",
+            "room_type",
+            "total_capacity",
+            "available_capacity",
+            "rent",
+            "security_deposit",
+            "facilities",
+            "is_available",
+            "verification_status",
+            "image_count",
+            "created_at",
+        ]
+
+
+class PortfolioHostelSerializer(serializers.ModelSerializer):
+    """Reads only prefetched/joined data; see OwnerPortfolioView"""
+    rooms = PortfolioRoomSerializer(many=True, read_only=True)
+    available_beds = serializers.SerializerMethodField()
+    rating_distribution = serializers.SerializerMethodField()
+    totals = serializers.SerializerMethodField()
+    today = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Hostel
+        fields = [
+            "id",
+            "name",
+            "city",
+            "gender",
+            "total_rooms",
+            "verification_status",
+            "average_rating",
+            "rating_count",
+            "rating_distribution",
+            "available_beds",
+            "totals",
+            "today",
             "created_at",
             "rooms",
         ]
-        read_only_fields = ["owner"]   # owner is not settable from API input
 
+    def get_available_beds(self, obj):
+        return sum(room.available_capacity for room in obj.rooms.all() if room.is_available)
+
+    def get_rating_distribution(self, obj):
+        try:
+            return obj.rating_distribution.as_dict()
+        except Hostel.rating_distribution.RelatedObjectDoesNotExist:
+            return None
+
+    def get_totals(self, obj):
+        try:
+            analytics = obj.analytics
+        except Hostel.analytics.RelatedObjectDoesNotExist:
+            return {"views": 0, "contacts": 0, "favorites": 0}
+        return {
+            "views": analytics.total_views,
+            "contacts": analytics.total_contacts,
+            "favorites": analytics.total_favorites,
+        }
+
+    def get_today(self, obj):
+        day = obj.today_analytics[0] if obj.today_analytics else None
+        return {
+            "views": day.views if day else 0,
+            "unique_visitors": day.unique_visitors if day else 0,
+            "contacts": day.contacts if day else 0,
+            "favorites": day.favorites if day else 0,
+            "searches_appeared": day.searches_appeared if day else 0,
+        }
 
 
+class BedHoldSerializer(serializers.ModelSerializer):
+    hostel = serializers.IntegerField(source="room.hostel_id", read_only=True)
+
+    class Meta:
+        model = BedHold
+        fields = ["id", "room", "hostel", "user", "status", "expires_at", "created_at"]
+        read_only_fields = fields
+
+
+class RoomChangeSerializer(serializers.ModelSerializer):
+    cursor = serializers.IntegerField(source="id", read_only=True)
+    room = serializers.IntegerField(source="room_id", read_only=True)
+    changed_at = serializers.DateTimeField(source="created_at", read_only=True)
+
+    class Meta:
+        model = RoomChange
+        fields = [
+            "cursor", "room", "hostel", "kind", "total_capacity",
+            "available_capacity", "rent", "is_available", "changed_at",
+        ]
+        read_only_fields = fields
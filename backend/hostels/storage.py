@@ -0,0 +1,146 @@
+"""
+Pluggable image storage for uploads.
+
+settings.IMAGE_STORAGE_BACKEND names the backend class; get_storage()
+returns an instance. A backend's upload(file, folder) stores one file and
+returns the value to assign to a CloudinaryField (a CloudinaryResource
+or a plain public id string). Assigning that instead of the raw file keeps
+CloudinaryField.pre_save() from uploading again on save()/bulk_create().
+
+- CloudinaryImageStorage: the production backend
+- LocalImageStorage: writes under LOCAL_IMAGE_STORAGE_ROOT, for tests,
+  benchmarks and offline development
+
+upload_images() fans a request's files out over a bounded thread pool so
+the request waits for the slowest upload instead of the sum of them.
+
+For direct uploads (client -> storage, bytes never touch Django) a backend
+also provides signed_upload(public_id), the URL and form fields a client
+POSTs the file to, and find(public_id), which returns the stored value once
+the file has arrived (None before). LocalImageStorage's URL is the fake
+server started by `manage.py run_fake_storage`.
+"""
+import glob
+import hashlib
+import hmac
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+SIGNED_UPLOAD_SECONDS = 3600  # Cloudinary rejects signatures older than an hour
+
+
+class CloudinaryImageStorage:
+    def upload(self, file, folder):
+        import cloudinary.uploader
+
+        if hasattr(file, 'seekable') and file.seekable():
+            file.seek(0)
+        return cloudinary.uploader.upload_resource(file, folder=folder)
+
+    def signed_upload(self, public_id):
+        import cloudinary
+        import cloudinary.utils
+
+        config = cloudinary.config()
+        params = {'public_id': public_id, 'timestamp': int(time.time())}
+        params['signature'] = cloudinary.utils.api_sign_request(params, config.api_secret)
+        params['api_key'] = config.api_key
+        return {
+            'url': cloudinary.utils.cloudinary_api_url('upload', resource_type='image'),
+            'fields': params,
+            'file_field': 'file',
+        }
+
+    def find(self, public_id):
+        import cloudinary
+        import cloudinary.api
+
+        try:
+            resource = cloudinary.api.resource(public_id)
+        except cloudinary.api.NotFound:
+            return None
+        return cloudinary.CloudinaryResource(
+            resource['public_id'], format=resource.get('format'), version=resource.get('version'),
+            type=resource.get('type'), resource_type=resource.get('resource_type'),
+        )
+
+
+class LocalImageStorage:
+    def __init__(self, root=None):
+        self.root = str(root or settings.LOCAL_IMAGE_STORAGE_ROOT)
+
+    def upload(self, file, folder):
+        chunks = file.chunks() if hasattr(file, 'chunks') else [file.read()]
+        return self.save(f'{folder}/{uuid.uuid4().hex}', getattr(file, 'name', ''), chunks)
+
+    def path(self, public_id):
+        return os.path.join(self.root, *public_id.split('/'))
+
+    def signed_upload(self, public_id):
+        expires = int(time.time()) + SIGNED_UPLOAD_SECONDS
+        return {
+            'url': settings.LOCAL_UPLOAD_SERVER_URL,
+            'fields': {
+                'public_id': public_id,
+                'expires': expires,
+                'signature': self.signature(public_id, expires),
+            },
+            'file_field': 'file',
+        }
+
+    @staticmethod
+    def signature(public_id, expires):
+        message = f'{public_id}:{expires}'.encode()
+        return hmac.new(settings.SECRET_KEY.encode(), message, hashlib.sha256).hexdigest()
+
+    def check_signature(self, public_id, expires, signature):
+        try:
+            expires = int(expires)
+        except (TypeError, ValueError):
+            return False
+        return expires >= time.time() and hmac.compare_digest(self.signature(public_id, expires), signature or '')
+
+    def save(self, public_id, filename, chunks):
+        """Store an uploaded file as public_id plus the file's extension (used by the fake server)"""
+        extension = os.path.splitext(filename or '')[1].lower()
+        path = self.path(public_id + extension)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as fh:
+            for chunk in chunks:
+                fh.write(chunk)
+        return public_id + extension
+
+    def find(self, public_id):
+        if os.path.exists(self.path(public_id)):
+            return public_id
+        matches = sorted(glob.glob(glob.escape(self.path(public_id)) + '.*'))
+        return public_id + os.path.splitext(matches[0])[1] if matches else None
+
+
+def get_storage():
+    return import_string(settings.IMAGE_STORAGE_BACKEND)()
+
+
+def upload_images(files, folder, storage=None, max_workers=None):
+    """
+    Upload files concurrently; returns [(stored value, None) or (None, error message)]
+    in the same order as files. One failed upload does not affect the others.
+    """
+    storage = storage or get_storage()
+    max_workers = max_workers or settings.IMAGE_UPLOAD_WORKERS
+
+    def upload(file):
+        try:
+            return storage.upload(file, folder), None
+        except Exception as e:
+            return None, str(e) or e.__class__.__name__
+
+    if len(files) <= 1:
+        return [upload(file) for file in files]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(files))) as executor:
+        return list(executor.map(upload, files))
@@ -1,3 +1,839 @@
-from django.test import TestCase
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from datetime import timedelta
 
-# Create your tests here.
+from django.db import IntegrityError, connection, connections, transaction
+from django.db.models import Count, F, Prefetch
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from backend.fieldsets import sparse_queryset
+from backend.pagination import KeysetPagination
+from engagement.models import DailyAnalytics, HostelAnalytics, RatingDistribution
+from moderation.models import VerificationRequest
+from hostels import feed
+from hostels.models import BedHold, Hostel, Room, RoomChange, RoomImage
+from hostels.serializers import HostelSerializer
+from hostels.storage import LocalImageStorage, upload_images
+from users.models import User
+
+
+def make_user(username, role='student'):
+    return User.objects.create(
+        username=username, email=f'{username}@example.com', role=role,
+        phone='03001234567', city='lahore', first_name=username, last_name='test'
+    )
+
+
+def make_hostel(owner, name, rooms=2, images=2, **kwargs):
+    """A hostel with rooms, room images, lifetime and today's analytics and a rating histogram"""
+    hostel = Hostel.objects.create(
+        owner=owner, name=name, latitude=31.5, longitude=74.3, total_rooms=rooms, **kwargs
+    )
+    for _ in range(rooms):
+        room = Room.objects.create(
+            hostel=hostel, total_capacity=4, available_capacity=2, rent=8000, security_deposit=4000
+        )
+        RoomImage.objects.bulk_create([
+            RoomImage(room=room, image=f'hamari_manzil/rooms/{room.id}-{i}') for i in range(images)
+        ])
+    HostelAnalytics.objects.create(hostel=hostel, total_views=10)
+    DailyAnalytics.objects.create(hostel=hostel, date=timezone.now().date(), views=3)
+    RatingDistribution.objects.create(hostel=hostel, stars_4=2, stars_5=1)
+    return hostel
+
+
+class OwnerHostelListQueryTests(TestCase):
+    """Owner listings cost a fixed number of queries however many hostels, rooms and images there are"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_user('owner', role='owner')
+        for i in range(3):
+            make_hostel(cls.owner, f'Hostel {i}', rooms=i + 1)
+        make_hostel(make_user('other', role='owner'), 'Not mine')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def test_my_hostels_queries(self):
+        # hostels, rooms
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/hostels/my-hostels/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 3)
+        self.assertEqual(sorted(len(hostel['rooms']) for hostel in response.data), [1, 2, 3])
+
+    def test_my_hostels_queries_do_not_grow_with_hostels(self):
+        with CaptureQueriesContext(connection) as before:
+            self.client.get('/api/hostels/my-hostels/')
+        make_hostel(self.owner, 'Hostel 3', rooms=4, images=3)
+        with CaptureQueriesContext(connection) as after:
+            response = self.client.get('/api/hostels/my-hostels/')
+        self.assertEqual(len(response.data), 4)
+        self.assertEqual(len(after), len(before))
+
+    def test_portfolio_queries(self):
+        # hostels with analytics and rating distribution, rooms with image counts, today's analytics
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/hostels/portfolio/')
+        self.assertEqual(response.status_code, 200)
+        results = response.data['results']
+        self.assertEqual(len(results), 3)
+        rooms = [room for hostel in results for room in hostel['rooms']]
+        self.assertEqual(len(rooms), 6)
+        self.assertTrue(all(room['image_count'] == 2 for room in rooms))
+
+    def test_portfolio_queries_do_not_grow_with_hostels(self):
+        make_hostel(self.owner, 'Hostel 3', rooms=4, images=3)
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/hostels/portfolio/')
+        self.assertEqual(len(response.data['results']), 4)
+
+    def test_portfolio_next_page_queries(self):
+        first = self.client.get('/api/hostels/portfolio/', {'page_size': 2})
+        self.assertIsNotNone(first.data['next'])
+        with self.assertNumQueries(3):
+            second = self.client.get(first.data['next'])
+        self.assertEqual(len(second.data['results']), 1)
+
+
+class SparseQuerysetTests(TestCase):
+    """sparse_queryset() narrows the caller's own Prefetch querysets instead of replacing them"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.hostel = make_hostel(make_user('owner', role='owner'), 'Hostel', rooms=3, images=1)
+        cls.cheap = Room.objects.filter(hostel=cls.hostel).order_by('id').first()
+        Room.objects.filter(pk=cls.cheap.pk).update(rent=5000)
+
+    def narrowed(self, fields):
+        request = Request(APIRequestFactory().get('/', {'fields': fields}))
+        queryset = Hostel.objects.filter(pk=self.hostel.pk).prefetch_related(
+            Prefetch('rooms', queryset=Room.objects.annotate(image_count=Count('images')).order_by('-id')),
+            Prefetch('rooms', queryset=Room.objects.filter(rent__lt=6000), to_attr='cheap_rooms'),
+        )
+        return sparse_queryset(queryset, HostelSerializer(context={'request': request}))
+
+    def test_nested_prefetch_keeps_caller_queryset(self):
+        with self.assertNumQueries(3):
+            hostel = self.narrowed('id,rooms.rent').get()
+            rooms = list(hostel.rooms.all())
+        self.assertEqual([room.id for room in rooms], sorted((room.id for room in rooms), reverse=True))
+        self.assertEqual([room.image_count for room in rooms], [1, 1, 1])
+        self.assertEqual(hostel.cheap_rooms, [self.cheap])
+        self.assertIn('rent', rooms[0].__dict__)
+        self.assertNotIn('description', rooms[0].__dict__)
+
+    def test_unselected_prefetch_is_dropped(self):
+        with self.assertNumQueries(2):  # hostel, to_attr prefetch
+            hostel = self.narrowed('id,name').get()
+        self.assertNotIn('rooms', getattr(hostel, '_prefetched_objects_cache', {}))
+        self.assertEqual(hostel.cheap_rooms, [self.cheap])
+
+
+class BedHoldTests(TestCase):
+    """Holds never oversell a room, and only reopen rooms they closed"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_user('owner', role='owner')
+        cls.hostel = make_hostel(cls.owner, 'Hostel', rooms=0)
+        cls.room = Room.objects.create(
+            hostel=cls.hostel, total_capacity=3, available_capacity=3, rent=8000, security_deposit=4000
+        )
+        cls.students = [make_user(f'student{i}') for i in range(8)]
+
+    def hold(self, student):
+        client = APIClient()
+        client.force_authenticate(student)
+        return client.post(f'/api/hostels/rooms/{self.room.id}/holds/')
+
+    def test_more_holds_than_beds(self):
+        codes = [self.hold(student).status_code for student in self.students]
+        self.room.refresh_from_db()
+        self.assertEqual(codes.count(201), 3)
+        self.assertEqual(codes.count(409), 5)
+        self.assertEqual(self.room.available_capacity, 0)
+        self.assertFalse(self.room.is_available)
+        self.assertTrue(self.room.closed_by_hold)
+        self.assertEqual(BedHold.objects.filter(room=self.room, status='active').count(), 3)
+
+    def test_release_reopens_room_closed_by_hold(self):
+        holds = [BedHold.place(self.room.id, student, 15) for student in self.students[:3]]
+        self.assertTrue(holds[0].release())
+        self.room.refresh_from_db()
+        self.assertEqual(self.room.available_capacity, 1)
+        self.assertTrue(self.room.is_available)
+        self.assertFalse(self.room.closed_by_hold)
+
+    def test_release_keeps_owner_closed_room_closed(self):
+        holds = [BedHold.place(self.room.id, student, 15) for student in self.students[:3]]
+        client = APIClient()
+        client.force_authenticate(self.owner)
+        response = client.patch(
+            f'/api/hostels/rooms/{self.room.id}/availability/', {'is_available': False}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+
+        holds[0].release()
+        self.room.refresh_from_db()
+        self.assertEqual(self.room.available_capacity, 1)
+        self.assertFalse(self.room.is_available)
+
+    def test_release_keeps_room_closed_with_free_beds_closed(self):
+        Room.objects.filter(pk=self.room.pk).update(is_available=False)
+        self.assertIsNone(BedHold.place(self.room.id, self.students[0], 15))
+        Room.return_beds(self.room.id)
+        self.room.refresh_from_db()
+        self.assertFalse(self.room.is_available)
+        self.assertEqual(self.room.available_capacity, 3)
+
+
+    def test_two_holds_cannot_take_the_last_bed(self):
+        room = Room.objects.create(
+            hostel=self.hostel, total_capacity=1, available_capacity=1, rent=8000, security_deposit=4000
+        )
+        # Both students loaded the room while its last bed was still free
+        seen = [Room.objects.get(pk=room.pk) for _ in range(2)]
+        self.assertTrue(all(r.available_capacity == 1 and r.is_available for r in seen))
+
+        first = BedHold.place(seen[0].id, self.students[0], 15)
+        second = BedHold.place(seen[1].id, self.students[1], 15)
+        self.assertIsNotNone(first)
+        self.assertIsNone(second)
+        room.refresh_from_db()
+        self.assertEqual(room.available_capacity, 0)
+        self.assertFalse(room.is_available)
+        self.assertEqual(list(BedHold.objects.filter(room=room).values_list('user', flat=True)), [self.students[0].id])
+
+    def test_failed_hold_gives_the_bed_back(self):
+        BedHold.place(self.room.id, self.students[0], 15)
+        changes = RoomChange.objects.filter(room_id=self.room.id).count()
+        with self.assertRaises(IntegrityError):
+            BedHold.place(self.room.id, self.students[0], 15)  # one active hold per student and room
+        self.room.refresh_from_db()
+        self.assertEqual(self.room.available_capacity, 2)
+        self.assertEqual(RoomChange.objects.filter(room_id=self.room.id).count(), changes)
+
+    def test_hold_cost_does_not_grow_with_holds(self):
+        room = Room.objects.create(
+            hostel=self.hostel, total_capacity=50, available_capacity=50, rent=8000, security_deposit=4000
+        )
+        for student in self.students[:6]:
+            BedHold.place(room.id, student, 15)
+        with self.assertNumQueries(8):  # savepoints, update, snapshot, inserts
+            hold = BedHold.place(room.id, self.students[6], 15)
+        with self.assertNumQueries(8):  # savepoints, update, snapshot, inserts
+            hold.release()
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', 'needs a database that takes concurrent writers')
+class ConcurrentBedHoldTests(TransactionTestCase):
+    """Many students racing for the same beds, one connection per thread"""
+
+    def test_concurrent_holds_never_oversell(self):
+        owner = make_user('owner', role='owner')
+        room = Room.objects.create(
+            hostel=make_hostel(owner, 'Hostel', rooms=0),
+            total_capacity=5, available_capacity=5, rent=8000, security_deposit=4000
+        )
+        students = [make_user(f'student{i}') for i in range(40)]
+        barrier = threading.Barrier(len(students))
+        results = []
+
+        def place(student):
+            try:
+                barrier.wait()
+                results.append(BedHold.place(room.id, student, 15) is not None)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=place, args=(student,)) for student in students]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        room.refresh_from_db()
+        self.assertEqual(results.count(True), 5)
+        self.assertEqual(room.available_capacity, 0)
+        self.assertFalse(room.is_available)
+        self.assertEqual(BedHold.objects.filter(room=room, status='active').count(), 5)
+
+    def test_hold_throughput_on_one_room(self):
+        """Place/release cycles from many threads on one 3-bed room"""
+        owner = make_user('owner', role='owner')
+        room = Room.objects.create(
+            hostel=make_hostel(owner, 'Hostel', rooms=0),
+            total_capacity=3, available_capacity=3, rent=8000, security_deposit=4000
+        )
+        students = [make_user(f'student{i}') for i in range(20)]
+        cycles = 25
+        barrier = threading.Barrier(len(students))
+        attempts, capacities = [], []
+
+        def churn(student):
+            try:
+                barrier.wait()
+                for _ in range(cycles):
+                    hold = BedHold.place(room.id, student, 15)
+                    attempts.append(hold is not None)
+                    capacities.append(Room.objects.values_list('available_capacity', flat=True).get(pk=room.id))
+                    if hold is not None:
+                        hold.release()
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=churn, args=(student,)) for student in students]
+        started = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - started
+
+        room.refresh_from_db()
+        self.assertEqual(len(attempts), len(students) * cycles)
+        self.assertGreater(attempts.count(True), 0)
+        self.assertGreaterEqual(min(capacities), 0)
+        self.assertEqual(room.available_capacity, 3)
+        self.assertTrue(room.is_available)
+        self.assertFalse(BedHold.objects.filter(room=room, status='active').exists())
+        # A hold is one conditional UPDATE on a hot row; 500 attempts should
+        # clear in well under 10s (~50 holds/s) even on a slow CI database
+        self.assertLess(elapsed, 10, f'{len(attempts)} holds took {elapsed:.1f}s')
+
+
+class RoomChangeFeedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.hostel = make_hostel(make_user('owner', role='owner'), 'Hostel', rooms=1)
+        cls.room = cls.hostel.rooms.get()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(make_user('student'))
+
+    def poll(self, **params):
+        return self.client.get('/api/hostels/rooms/changes/', params)
+
+    def test_follow_from_head(self):
+        cursor = self.poll().data['cursor']
+        self.assertEqual(cursor, RoomChange.objects.latest('id').id)
+
+        self.assertTrue(Room.take_bed(self.room.id))
+        response = self.poll(cursor=cursor)
+        self.assertEqual([change['available_capacity'] for change in response.data['changes']], [1])
+        self.assertEqual(self.poll(cursor=response.data['cursor']).data['changes'], [])
+
+    def test_pruned_cursor_resets(self):
+        cursor = self.poll().data['cursor']
+        Room.take_bed(self.room.id)
+        RoomChange.objects.filter(id__lte=cursor).delete()
+        response = self.poll(cursor=cursor)
+        self.assertTrue(response.data['reset'])
+        self.assertEqual(response.data['cursor'], RoomChange.objects.latest('id').id)
+
+    @override_settings(ROOM_CHANGE_MAX_WAITERS=0)
+    def test_long_poll_over_waiter_cap_answers_at_once(self):
+        cursor = self.poll().data['cursor']
+        started = time.monotonic()
+        response = self.poll(cursor=cursor, wait=10)
+        self.assertLess(time.monotonic() - started, 5)
+        self.assertEqual(response.data['changes'], [])
+        self.assertIn('Retry-After', response)
+
+    @override_settings(ROOM_CHANGE_MAX_WAITERS=0)
+    def test_stream_over_waiter_cap_sends_busy(self):
+        response = self.client.get('/api/hostels/rooms/changes/stream/')
+        body = b''.join(response.streaming_content).decode()
+        self.assertIn(f'retry: {feed.BUSY_RETRY_MS}', body)
+        self.assertIn('event: busy', body)
+
+
+class RoomChangeOrderTests(TestCase):
+    """Feed positions follow commit order, and hostel deletion keeps the history"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.hostel = make_hostel(make_user('owner', role='owner'), 'Hostel', rooms=2)
+        cls.slow_room, cls.fast_room = cls.hostel.rooms.order_by('id')
+
+    def test_row_committed_late_under_a_lower_id_is_delivered(self):
+        after = feed.position(feed.head()[1])
+        late_id = RoomChange.objects.latest('id').id + 1  # handed out first, committed last
+        Room.take_bed(self.fast_room.id)
+        RoomChange.objects.filter(id=late_id).update(id=late_id + 1)
+
+        first = feed.changes_since(after)
+        self.assertEqual([change.room_id for change in first], [self.fast_room.id])
+
+        RoomChange.objects.create(
+            id=late_id, room_id=self.slow_room.id, hostel=self.hostel, total_capacity=4,
+            available_capacity=3, rent=8000, is_available=True
+        )
+        second = feed.changes_since(first[-1].feed_position)
+        self.assertEqual([change.id for change in second], [late_id])
+        self.assertGreater(second[0].feed_position, first[-1].feed_position)
+
+    def test_stamp_numbers_each_row_once(self):
+        Room.take_bed(self.fast_room.id)
+        Room.take_bed(self.slow_room.id)
+        self.assertEqual(feed.stamp(), RoomChange.objects.count())
+        self.assertEqual(feed.stamp(), 0)
+        positions = list(RoomChange.objects.order_by('id').values_list('feed_position', flat=True))
+        self.assertEqual(positions, list(range(1, len(positions) + 1)))
+
+    def test_deleting_a_hostel_keeps_its_changes_and_logs_its_rooms(self):
+        after = feed.position(feed.head()[1])
+        history = RoomChange.objects.filter(hostel_id=self.hostel.id).count()
+        hostel_id = self.hostel.id
+        self.hostel.delete()
+
+        self.assertEqual(RoomChange.objects.filter(hostel_id=hostel_id).count(), history + 2)
+        changes = feed.changes_since(after, hostel_ids=[hostel_id])
+        self.assertEqual(
+            sorted((change.room_id, change.kind, change.is_available) for change in changes),
+            [(self.slow_room.id, 'deleted', False), (self.fast_room.id, 'deleted', False)]
+        )
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', 'needs a database that takes concurrent writers')
+class RoomChangeInFlightTests(TransactionTestCase):
+    """Open transactions delay only their own rows"""
+
+    def test_long_transaction_is_not_skipped(self):
+        hostel = make_hostel(make_user('owner', role='owner'), 'Hostel', rooms=2)
+        slow_room, fast_room = hostel.rooms.order_by('id')
+        after = feed.position(feed.head()[1])
+        written, finish = threading.Event(), threading.Event()
+
+        def slow_writer():
+            try:
+                with transaction.atomic():
+                    Room.take_bed(slow_room.id)
+                    written.set()
+                    finish.wait(10)
+            finally:
+                connections.close_all()
+
+        thread = threading.Thread(target=slow_writer)
+        thread.start()
+        written.wait(10)
+        Room.take_bed(fast_room.id)  # higher id, committed first
+
+        first = feed.changes_since(after)
+        self.assertEqual([change.room_id for change in first], [fast_room.id])
+        finish.set()
+        thread.join()
+
+        second = feed.changes_since(first[-1].feed_position)
+        self.assertEqual([change.room_id for change in second], [slow_room.id])
+
+    def test_unrelated_long_transaction_does_not_hold_the_feed(self):
+        hostel = make_hostel(make_user('owner', role='owner'), 'Hostel', rooms=1)
+        room = hostel.rooms.get()
+        after = feed.position(feed.head()[1])
+        started, finish = threading.Event(), threading.Event()
+
+        def rollup():
+            try:
+                with transaction.atomic():
+                    make_user('busy')  # holds a transaction id, like a long rollup
+                    started.set()
+                    finish.wait(10)
+            finally:
+                connections.close_all()
+
+        thread = threading.Thread(target=rollup)
+        thread.start()
+        started.wait(10)
+        try:
+            Room.take_bed(room.id)
+            self.assertEqual([change.room_id for change in feed.changes_since(after)], [room.id])
+        finally:
+            finish.set()
+            thread.join()
+
+
+class HostelListTests(TestCase):
+    """create-hostels/ list: keyset pages of two queries each, filters and cursor walking"""
+    url = '/api/hostels/create-hostels/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_user('owner', role='owner')
+        cls.other_owner = make_user('other', role='owner')
+        specs = [
+            ('lahore', 'male', True, cls.owner),
+            ('lahore', 'female', False, cls.owner),
+            ('karachi', 'male', False, cls.other_owner),
+            ('lahore', 'male', False, cls.other_owner),
+            ('karachi', 'female', True, cls.owner),
+            ('lahore', 'female', True, cls.other_owner),
+            ('karachi', 'male', True, cls.owner),
+        ]
+        cls.hostels = [
+            make_hostel(owner, f'Hostel {i}', rooms=2, images=0, city=city, gender=gender, verification_status=verified)
+            for i, (city, gender, verified, owner) in enumerate(specs)
+        ]
+        # Several rows share a created_at, so pages have to break ties on id
+        Hostel.objects.filter(pk__in=[h.pk for h in cls.hostels[2:5]]).update(created_at=cls.hostels[2].created_at)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def walk(self, params, page_size=2):
+        """Follow next links to the end, checking each page's query count; returns the hostel ids"""
+        ids, url, params = [], self.url, {**params, 'page_size': page_size}
+        while url:
+            with self.assertNumQueries(2):  # the page, its rooms
+                response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            page = response.data['results']
+            self.assertLessEqual(len(page), page_size)
+            self.assertTrue(all(len(hostel['rooms']) == 2 for hostel in page))
+            ids += [hostel['id'] for hostel in page]
+            url, params = response.data['next'], None
+        return ids
+
+    def expected(self, **filters):
+        return list(Hostel.objects.filter(**filters).order_by('-created_at', '-id').values_list('id', flat=True))
+
+    def test_unfiltered_walk(self):
+        ids = self.walk({})
+        self.assertEqual(ids, self.expected())
+        self.assertEqual(len(ids), len(set(ids)))
+
+    def test_filtered_walks(self):
+        cases = [
+            ({'city': 'karachi'}, {'city': 'karachi'}),
+            ({'gender': 'female'}, {'gender': 'female'}),
+            ({'verification_status': 'true'}, {'verification_status': True}),
+            ({'verification_status': 'false'}, {'verification_status': False}),
+            ({'owner': self.other_owner.id}, {'owner': self.other_owner}),
+            ({'city': 'lahore', 'gender': 'male'}, {'city': 'lahore', 'gender': 'male'}),
+        ]
+        for params, filters in cases:
+            with self.subTest(params=params):
+                self.assertEqual(self.walk(params), self.expected(**filters))
+
+    def test_page_size_one_walk(self):
+        self.assertEqual(self.walk({}, page_size=1), self.expected())
+
+    def test_sparse_fields_skip_rooms(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, {'fields': 'id,name'})
+        self.assertEqual([hostel['id'] for hostel in response.data['results']], self.expected())
+
+    def test_bad_cursor_is_404(self):
+        for cursor in ('not-base64!', 'WzFd', 'bm90IGpzb24='):
+            with self.subTest(cursor=cursor):
+                self.assertEqual(self.client.get(self.url, {'cursor': cursor}).status_code, 404)
+
+    def test_bad_filter_is_400(self):
+        for params in ({'city': 'atlantis'}, {'gender': 'x'}, {'verification_status': 'maybe'}, {'owner': 'me'}):
+            with self.subTest(params=params):
+                response = self.client.get(self.url, params)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.data['error'], 'Invalid filter')
+class HostelListLargeTests(TestCase):
+    """Keyset pages stay at two queries deep into a large table"""
+    url = '/api/hostels/create-hostels/'
+    hostel_count = 50000
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_user('owner', role='owner')
+        cities = ['lahore', 'karachi', 'islamabad']
+        Hostel.objects.bulk_create(
+            [
+                Hostel(
+                    owner=cls.owner, name=f'Hostel {i}', latitude=31.5, longitude=74.3, total_rooms=1,
+                    city=cities[i % 3], gender='female' if i % 2 else 'male'
+                )
+                for i in range(cls.hostel_count)
+            ],
+            batch_size=5000
+        )
+        # Two created_at values shared by 25k rows each, so every seek breaks ties on id
+        older = timezone.now() - timedelta(days=1)
+        Hostel.objects.annotate(half=F('id') % 2).filter(half=0).update(created_at=older)
+        Room.objects.bulk_create([
+            Room(hostel_id=hostel_id, total_capacity=4, available_capacity=2, rent=8000, security_deposit=4000)
+            for hostel_id in Hostel.objects.values_list('id', flat=True)[:500]
+        ])
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def page(self, url, params=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(queries), 2)  # the page, its rooms
+        self.assertFalse(any('OFFSET' in query['sql'] or 'COUNT(' in query['sql'] for query in queries))
+        return response.data
+
+    def test_pages_across_the_table(self):
+        expected = list(Hostel.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(len(expected), self.hostel_count)
+
+        ids, data = [], self.page(self.url, {'page_size': 100})
+        for _ in range(5):
+            ids += [hostel['id'] for hostel in data['results']]
+            data = self.page(data['next'])
+        self.assertEqual(ids, expected[:500])
+
+        # Jump to the far end with the cursor of a row near the bottom
+        last = Hostel.objects.get(id=expected[-151])
+        data = self.page(self.url, {'page_size': 100, 'cursor': KeysetPagination().encode_cursor(last)})
+        self.assertEqual([hostel['id'] for hostel in data['results']], expected[-150:-50])
+        data = self.page(data['next'])
+        self.assertEqual([hostel['id'] for hostel in data['results']], expected[-50:])
+        self.assertIsNone(data['next'])
+
+    def test_filtered_pages(self):
+        expected = list(
+            Hostel.objects.filter(city='karachi', gender='female').order_by('-created_at', '-id')
+            .values_list('id', flat=True)[:300]
+        )
+        ids, url, params = [], self.url, {'city': 'karachi', 'gender': 'female', 'page_size': 100}
+        for _ in range(3):
+            data = self.page(url, params)
+            ids += [hostel['id'] for hostel in data['results']]
+            url, params = data['next'], None
+        self.assertEqual(ids, expected)
+
+
+class FlakyImageStorage(LocalImageStorage):
+    """LocalImageStorage that fails files named bad*, slowly enough to show overlap"""
+    in_flight = peak = 0
+    lock = threading.Lock()
+
+    def upload(self, file, folder):
+        cls = type(self)
+        with cls.lock:
+            cls.in_flight += 1
+            cls.peak = max(cls.peak, cls.in_flight)
+        try:
+            time.sleep(0.05)
+            if file.name.startswith('bad'):
+                raise OSError(f'storage rejected {file.name}')
+            return super().upload(file, folder)
+        finally:
+            with cls.lock:
+                cls.in_flight -= 1
+
+
+def image(name):
+    return SimpleUploadedFile(name, b'\x89PNG not really', content_type='image/png')
+
+
+class RoomImageUploadTests(TestCase):
+    """upload-images/: parallel uploads, per-index failures, one INSERT"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_user('owner', role='owner')
+        cls.hostel = make_hostel(cls.owner, 'Hostel', rooms=1, images=0)
+        cls.room = cls.hostel.rooms.get()
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        storage = override_settings(
+            IMAGE_STORAGE_BACKEND='hostels.tests.FlakyImageStorage', LOCAL_IMAGE_STORAGE_ROOT=self.root
+        )
+        storage.enable()
+        self.addCleanup(storage.disable)
+        FlakyImageStorage.peak = 0
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def upload(self, *names, room_id=None):
+        return self.client.post(
+            f'/api/hostels/rooms/{room_id or self.room.id}/upload-images/',
+            {'images': [image(name) for name in names]}, format='multipart'
+        )
+
+    def test_files_upload_in_parallel_and_save_in_one_insert(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.upload('a.png', 'b.png', 'c.png', 'd.png')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data['uploaded']), 4)
+        self.assertEqual(response.data['failed'], [])
+        self.assertGreater(FlakyImageStorage.peak, 1)
+        inserts = [query for query in queries if query['sql'].startswith('INSERT')]
+        self.assertEqual(len(inserts), 1)
+        stored = [room_image.image for room_image in RoomImage.objects.filter(room=self.room)]
+        self.assertEqual(len(stored), 4)
+        for resource in stored:
+            self.assertIsNotNone(LocalImageStorage(self.root).find(resource.public_id))
+
+    def test_failures_are_listed_by_index(self):
+        response = self.upload('a.png', 'bad-1.png', 'c.png', 'bad-2.png')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data['uploaded']), 2)
+        self.assertEqual(
+            [(failure['index'], failure['name']) for failure in response.data['failed']],
+            [(1, 'bad-1.png'), (3, 'bad-2.png')]
+        )
+        self.assertIn('storage rejected', response.data['failed'][0]['error'])
+        self.assertEqual(RoomImage.objects.filter(room=self.room).count(), 2)
+
+    def test_all_failed_is_502(self):
+        response = self.upload('bad-1.png', 'bad-2.png')
+        self.assertEqual(response.status_code, 502)
+        self.assertEqual([failure['index'] for failure in response.data['details']], [0, 1])
+        self.assertFalse(RoomImage.objects.filter(room=self.room).exists())
+
+    def test_only_the_rooms_owner_can_upload(self):
+        other_owner = make_user('other', role='owner')
+        self.client.force_authenticate(other_owner)
+        self.assertEqual(self.upload('a.png').status_code, 404)
+        self.client.force_authenticate(make_user('student'))
+        self.assertEqual(self.upload('a.png').status_code, 403)
+        self.client.force_authenticate(self.owner)
+        self.assertEqual(self.upload('a.png', room_id=self.room.id + 1000).status_code, 404)
+        self.assertFalse(RoomImage.objects.exists())
+
+    def test_upload_images_keeps_file_order(self):
+        files = [image(name) for name in ('a.png', 'bad.png', 'c.png')]
+        results = upload_images(files, 'rooms', storage=FlakyImageStorage(self.root), max_workers=3)
+        self.assertEqual([error is None for _, error in results], [True, False, True])
+        self.assertTrue(results[0][0].startswith('rooms/') and results[0][0].endswith('.png'))
+
+
+class DirectUploadTests(TestCase):
+    """uploads/intents/ and uploads/confirm/ against LocalImageStorage"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_user('owner', role='owner')
+        cls.hostel = make_hostel(cls.owner, 'Hostel', rooms=1, images=0)
+        cls.room = cls.hostel.rooms.get()
+        cls.verification = VerificationRequest.objects.create(request_type='user', user=cls.owner)
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        storage = override_settings(
+            IMAGE_STORAGE_BACKEND='hostels.storage.LocalImageStorage', LOCAL_IMAGE_STORAGE_ROOT=self.root
+        )
+        storage.enable()
+        self.addCleanup(storage.disable)
+        self.storage = LocalImageStorage(self.root)
+        self.client = self.client_for(self.owner)
+
+    @staticmethod
+    def client_for(user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def intent(self, target, object_id, field=None, client=None):
+        body = {'target': target, 'object_id': object_id, **({'field': field} if field else {})}
+        return (client or self.client).post('/api/hostels/uploads/intents/', body, format='json')
+
+    def send_file(self, upload):
+        """What the fake storage server does with the client's POST"""
+        fields = upload['fields']
+        self.assertTrue(self.storage.check_signature(fields['public_id'], fields['expires'], fields['signature']))
+        self.storage.save(fields['public_id'], 'photo.png', [b'\x89PNG not really'])
+
+    def confirm(self, token, client=None):
+        return (client or self.client).post('/api/hostels/uploads/confirm/', {'token': token}, format='json')
+
+    def test_room_image(self):
+        intent = self.intent('room_image', self.room.id)
+        self.assertEqual(intent.status_code, 201)
+        self.assertTrue(intent.data['public_id'].startswith('hamari_manzil/rooms/'))
+        self.send_file(intent.data['upload'])
+
+        response = self.confirm(intent.data['token'])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['target'], 'room_image')
+        self.assertIn('room_image', response.data)
+        image = RoomImage.objects.get(room=self.room)
+        self.assertEqual(image.image.public_id, intent.data['public_id'])
+
+    def test_replayed_confirm_records_once(self):
+        intent = self.intent('room_image', self.room.id)
+        self.send_file(intent.data['upload'])
+        first = self.confirm(intent.data['token'])
+        second = self.confirm(intent.data['token'])
+        self.assertEqual((first.status_code, second.status_code), (201, 201))
+        self.assertEqual(first.data['room_image']['id'], second.data['room_image']['id'])
+        self.assertEqual(RoomImage.objects.filter(room=self.room).count(), 1)
+
+    def test_hostel_media(self):
+        intent = self.intent('hostel_media', self.hostel.id)
+        self.send_file(intent.data['upload'])
+        self.assertEqual(self.confirm(intent.data['token']).status_code, 201)
+        self.hostel.refresh_from_db()
+        self.assertEqual(self.hostel.media.public_id, intent.data['public_id'])
+
+    def test_verification_field(self):
+        self.assertEqual(self.intent('verification', self.verification.id).status_code, 400)  # field required
+        intent = self.intent('verification', self.verification.id, field='cnic_image')
+        self.assertTrue(intent.data['public_id'].startswith('hamari_manzil/verification/'))
+        self.send_file(intent.data['upload'])
+        self.assertEqual(self.confirm(intent.data['token']).status_code, 201)
+        self.verification.refresh_from_db()
+        self.assertEqual(self.verification.cnic_image.public_id, intent.data['public_id'])
+        self.assertIsNone(self.verification.profile_image)
+
+    def test_confirm_before_upload_is_409(self):
+        intent = self.intent('room_image', self.room.id)
+        response = self.confirm(intent.data['token'])
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(RoomImage.objects.exists())
+
+    def test_bad_or_tampered_token(self):
+        intent = self.intent('room_image', self.room.id)
+        self.send_file(intent.data['upload'])
+        token = intent.data['token']
+        tampered = token[:-1] + ('A' if token[-1] != 'A' else 'B')
+        for bad in (tampered, 'not-a-token', ''):
+            with self.subTest(token=bad):
+                response = self.confirm(bad)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.data['error'], 'Invalid upload token')
+        with override_settings(UPLOAD_INTENT_MAX_AGE=-1):
+            self.assertEqual(self.confirm(token).data['error'], 'Upload token expired')
+        self.assertFalse(RoomImage.objects.exists())
+
+    def test_tampered_storage_signature_is_rejected(self):
+        fields = self.intent('room_image', self.room.id).data['upload']['fields']
+        self.assertFalse(self.storage.check_signature(fields['public_id'] + 'x', fields['expires'], fields['signature']))
+        self.assertFalse(self.storage.check_signature(fields['public_id'], fields['expires'] + 60, fields['signature']))
+        self.assertFalse(self.storage.check_signature(fields['public_id'], fields['expires'], 'f' * 64))
+
+    def test_another_users_token(self):
+        intent = self.intent('room_image', self.room.id)
+        self.send_file(intent.data['upload'])
+        other = make_user('other', role='owner')
+        response = self.confirm(intent.data['token'], client=self.client_for(other))
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(RoomImage.objects.exists())
+
+    def test_intent_checks_the_target(self):
+        other = self.client_for(make_user('other', role='owner'))
+        student = self.client_for(make_user('student'))
+        self.assertEqual(self.intent('room_image', self.room.id, client=other).status_code, 404)
+        self.assertEqual(self.intent('hostel_media', self.hostel.id, client=student).status_code, 403)
+        self.assertEqual(self.intent('verification', self.verification.id, 'cnic_image', client=other).status_code, 404)
+        self.assertEqual(self.intent('avatar', self.room.id).status_code, 400)
+        self.assertEqual(self.intent('room_image', 'abc').status_code, 400)
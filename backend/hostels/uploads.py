@@ -0,0 +1,88 @@
+"""
+Direct-to-storage uploads.
+
+1. POST uploads/intents/ {target, object_id, field?}: the server checks the
+   caller may change the target and returns signed upload parameters from
+   the storage backend plus a token naming the target and public id.
+2. The client POSTs the file straight to upload.url with upload.fields
+   (the file goes in upload.file_field), so no Django worker holds the bytes.
+3. POST uploads/confirm/ {token}: the server re-checks the target, asks
+   storage whether the file arrived and records it.
+
+Tokens are signed with SECRET_KEY (django.core.signing), so intents need
+no table; confirming the same token twice records the file once.
+"""
+import uuid
+
+from django.core import signing
+from django.shortcuts import get_object_or_404
+from rest_framework.exceptions import PermissionDenied, ValidationError
+
+from .models import Hostel, Room, RoomImage
+
+TOKEN_SALT = 'hostels.uploads.intent'
+
+# target -> storage folder
+TARGETS = {
+    'room_image': 'hamari_manzil/rooms',
+    'hostel_media': 'hamari_manzil/hostels',
+    'verification': 'hamari_manzil/verification',
+}
+VERIFICATION_FIELDS = ('profile_image', 'cnic_image', 'hostel_thumbnail')
+
+
+def resolve_target(user, target, object_id, field=None):
+    """The object a file for target will be attached to, checking the user may change it"""
+    if target not in TARGETS:
+        raise ValidationError({'error': 'Invalid target', 'details': f"target must be one of: {', '.join(TARGETS)}"})
+    try:
+        object_id = int(object_id)
+    except (TypeError, ValueError):
+        raise ValidationError({'error': 'Invalid target', 'details': 'object_id must be an integer'})
+
+    if target == 'verification':
+        from moderation.models import VerificationRequest
+
+        if field not in VERIFICATION_FIELDS:
+            raise ValidationError({
+                'error': 'Invalid target',
+                'details': f"field must be one of: {', '.join(VERIFICATION_FIELDS)}"
+            })
+        return get_object_or_404(VerificationRequest, pk=object_id, user=user, status='pending')
+
+    if user.role != 'owner':
+        raise PermissionDenied("Only owners can upload hostel and room images.")
+    if target == 'room_image':
+        return get_object_or_404(Room, pk=object_id, hostel__owner=user)
+    return get_object_or_404(Hostel, pk=object_id, owner=user)
+
+
+def create_intent(user, target, obj, field, storage):
+    public_id = f'{TARGETS[target]}/{uuid.uuid4().hex}'
+    token = signing.dumps(
+        {'user': user.id, 'target': target, 'object_id': obj.pk, 'field': field, 'public_id': public_id},
+        salt=TOKEN_SALT
+    )
+    return {'token': token, 'public_id': public_id, 'upload': storage.signed_upload(public_id)}
+
+
+def read_intent(token, max_age):
+    """The intent a token was issued for; raises ValidationError when bad or expired"""
+    try:
+        return signing.loads(token or '', salt=TOKEN_SALT, max_age=max_age)
+    except signing.SignatureExpired:
+        raise ValidationError({'error': 'Upload token expired', 'details': 'Create a new upload intent'})
+    except signing.BadSignature:
+        raise ValidationError({'error': 'Invalid upload token', 'details': 'token is missing or malformed'})
+
+
+def record(target, obj, field, stored):
+    """Attach a stored file to its target; returns the RoomImage for room images"""
+    if target == 'room_image':
+        image, _ = RoomImage.objects.get_or_create(room=obj, image=stored)
+        return image
+    field = 'media' if target == 'hostel_media' else field
+    setattr(obj, field, stored)
+    update_fields = [field, 'updated_at'] if target == 'verification' else [field]
+    obj.save(update_fields=update_fields)
+    return None
@@ -4,7 +4,10 @@ from .views import (
     HostelFacilityListView, MyHostelsView, HostelCreateView, 
     HostelDeleteView, CreateRoomView, MyRoomsView, 
     RoomAvailabilityUpdateView, RoomDeleteView,
-    RoomImageUploadView, HostelUpdateView, RoomUpdateView
+    RoomImageUploadView, HostelUpdateView, RoomUpdateView,
+    OwnerPortfolioView, RoomDetailView, RoomBulkView,
+    BedHoldCreateView, MyBedHoldsView, BedHoldReleaseView, BedHoldConfirmView,
+    RoomChangeFeedView, RoomChangeStreamView, UploadIntentView, UploadConfirmView
 )
 
 router = DefaultRouter()
@@ -14,10 +17,19 @@ urlpatterns = [
     path('', include(router.urls)),
     path("hostel-facilities/", HostelFacilityListView.as_view(), name="hostel-facility-list"),
     path("my-hostels/", MyHostelsView.as_view(), name="my-hostels"),
+    path("portfolio/", OwnerPortfolioView.as_view(), name="owner-portfolio"),
     path("delete-hostel/<int:pk>/", HostelDeleteView.as_view(), name="delete-hostel"),
     path("create-room/", CreateRoomView.as_view(), name="create-room"),
+    path("<int:hostel_id>/rooms/bulk/", RoomBulkView.as_view(), name="room-bulk"),
     path("my-rooms/", MyRoomsView.as_view(), name="my-rooms"),
+    path("rooms/changes/", RoomChangeFeedView.as_view(), name="room-changes"),
+    path("rooms/changes/stream/", RoomChangeStreamView.as_view(), name="room-changes-stream"),
+    path("rooms/<int:pk>/", RoomDetailView.as_view(), name="room-detail"),
     path("rooms/<int:pk>/availability/", RoomAvailabilityUpdateView.as_view(), name="room-availability"),
+    path("rooms/<int:room_id>/holds/", BedHoldCreateView.as_view(), name="bed-hold-create"),
+    path("holds/", MyBedHoldsView.as_view(), name="my-bed-holds"),
+    path("holds/<int:pk>/release/", BedHoldReleaseView.as_view(), name="bed-hold-release"),
+    path("holds/<int:pk>/confirm/", BedHoldConfirmView.as_view(), name="bed-hold-confirm"),
     path("delete-room/<int:pk>/", RoomDeleteView.as_view(), name="delete-hostel"),
     path('hostels/<int:pk>/edit/', HostelUpdateView.as_view(), name='hostel-edit'),
     path('rooms/<int:pk>/edit/', RoomUpdateView.as_view(), name='room-edit'),
@@ -26,6 +38,8 @@ path("edit-hostel/<int:pk>/", HostelUpdateView.as_view(), name="edit-hostel"),
 path("rooms/<int:pk>/edit/", RoomUpdateView.as_view(), name="edit-room"),
     
     path("rooms/<int:room_id>/upload-images/", RoomImageUploadView.as_view(), name='room-upload-images'),
+    path("uploads/intents/", UploadIntentView.as_view(), name="upload-intent"),
+    path("uploads/confirm/", UploadConfirmView.as_view(), name="upload-confirm"),
 
 
 ]
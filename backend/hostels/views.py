@@ -3,9 +3,11 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.exceptions import PermissionDenied
 from django.shortcuts import get_object_or_404
 from .models import Room, RoomImage
 from .serializers import RoomImageSerializer
+from .storage import upload_images
 # views.py
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.exceptions import PermissionDenied
@@ -20,19 +22,54 @@ from .serializers import RoomSerializer
 # Upload multiple images for a room
 # ---------------------------
 class RoomImageUploadView(APIView):
+    """
+    POST: Upload several images for one of the owner's rooms (multipart "images").
+    Files upload in parallel; the ones that succeed are saved together and
+    the ones that fail are listed by index.
+    """
     permission_classes = [IsAuthenticated]
     parser_classes = (MultiPartParser, FormParser)
+    max_images = 10
 
     def post(self, request, room_id):
-        room = get_object_or_404(Room, id=room_id)
+        user = request.user
+        if user.role != "owner":
+            raise PermissionDenied("Only owners can upload room images.")
+
+        room = get_object_or_404(Room, id=room_id, hostel__owner=user)
         images = request.FILES.getlist('images')
-        image_objs = []
-        for img in images:
-            image_obj = RoomImage(room=room, image=img)
-            image_obj.save()
-            image_objs.append(image_obj)
+        if not images:
+            return Response({
+                'error': 'No images',
+                'details': 'Send one or more files in the "images" field'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if len(images) > self.max_images:
+            return Response({
+                'error': 'Too many images',
+                'details': f'At most {self.max_images} images can be uploaded per request'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        image_objs, failed = [], []
+        results = upload_images(images, folder="hamari_manzil/rooms")
+        for index, (img, (stored, error)) in enumerate(zip(images, results)):
+            if error is None:
+                image_objs.append(RoomImage(room=room, image=stored))
+            else:
+                failed.append({'index': index, 'name': img.name, 'error': error})
+
+        if not image_objs:
+            return Response({
+                'error': 'Upload failed',
+                'details': failed
+            }, status=status.HTTP_502_BAD_GATEWAY)
+
+        image_objs = RoomImage.objects.bulk_create(image_objs)
         serializer = RoomImageSerializer(image_objs, many=True)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+        return Response({
+            'uploaded': serializer.data,
+            'failed': failed,
+        }, status=status.HTTP_201_CREATED)
+
 from rest_framework import viewsets, permissions
 from rest_framework.views import APIView
 from rest_framework.response import Response
@@ -40,14 +77,28 @@ from rest_framework import status
 from .models import Hostel, Room
 from .serializers import *
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.exceptions import PermissionDenied
+from rest_framework.exceptions import PermissionDenied, ValidationError
 from django.shortcuts import get_object_or_404
 from .choices import HOSTEL_FACILITIES
 from rest_framework.generics import RetrieveAPIView
 
 from rest_framework import generics, permissions
-from .models import Hostel, Room
-from .serializers import HostelSerializer, RoomSerializer
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Prefetch
+from django.utils import timezone
+from backend.fieldsets import sparse_queryset
+from backend.pagination import KeysetPagination
+from engagement.models import DailyAnalytics
+from .models import Hostel, Room, BedHold, RoomChange, CITY_CHOICES, GENDER_CHOICES
+from .serializers import (
+    HostelSerializer, RoomSerializer, PortfolioHostelSerializer,
+    BulkRoomCreateSerializer, BulkRoomUpdateSerializer, BedHoldSerializer,
+    RoomChangeSerializer,
+)
+from . import feed, uploads
+from .storage import get_storage
 
 
 # -----------------------------
@@ -62,9 +113,59 @@ class HostelFacilityListView(APIView):
 # Hostel CRUD
 # -----------------------------
 class HostelCreateView(viewsets.ModelViewSet):
+    """
+    Hostels with their rooms. The list is keyset-paginated (?page_size=,
+    ?cursor=), newest first, and filterable by ?city=, ?gender=,
+    ?verification_status=true|false and ?owner=<id>; each filter has an
+    index ending in (created_at, id), so a page is one index range scan
+    plus one query for its rooms.
+    """
     queryset = Hostel.objects.all()
     serializer_class = HostelSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+
+    def get_queryset(self):
+        queryset = super().get_queryset().prefetch_related(
+            Prefetch('rooms', queryset=Room.objects.order_by('id'))
+        )
+        if self.action == 'list':
+            queryset = self.filter_list(queryset)
+        if self.action in ('list', 'retrieve'):
+            # ?fields= / ?expand= narrow the columns and prefetches too;
+            # created_at stays loaded for the pagination cursor
+            queryset = sparse_queryset(queryset, self.get_serializer(), extra=('created_at',))
+        return queryset
+
+    def filter_list(self, queryset):
+        params = self.request.query_params
+        city = params.get('city')
+        if city:
+            if city not in dict(CITY_CHOICES):
+                self.invalid_filter(f"city must be one of: {', '.join(dict(CITY_CHOICES))}")
+            queryset = queryset.filter(city=city)
+
+        gender = params.get('gender')
+        if gender:
+            if gender not in dict(GENDER_CHOICES):
+                self.invalid_filter(f"gender must be one of: {', '.join(dict(GENDER_CHOICES))}")
+            queryset = queryset.filter(gender=gender)
+
+        verified = params.get('verification_status')
+        if verified:
+            if verified.lower() not in ('true', 'false', '1', '0'):
+                self.invalid_filter('verification_status must be true or false')
+            queryset = queryset.filter(verification_status=verified.lower() in ('true', '1'))
+
+        owner = params.get('owner')
+        if owner:
+            if not owner.isdigit():
+                self.invalid_filter('owner must be a user id')
+            queryset = queryset.filter(owner_id=int(owner))
+        return queryset
+
+    def invalid_filter(self, details):
+        raise ValidationError({'error': 'Invalid filter', 'details': details})
 
     def perform_create(self, serializer):
         user = self.request.user
@@ -85,11 +186,45 @@ class MyHostelsView(APIView):
                 status=status.HTTP_403_FORBIDDEN,
             )
 
-        hostels = Hostel.objects.filter(owner=user)
-        serializer = HostelSerializer(hostels, many=True)
+        # HostelSerializer nests rooms; prefetch them in one extra query
+        context = {'request': request}
+        hostels = sparse_queryset(
+            Hostel.objects.filter(owner=user).prefetch_related('rooms'),
+            HostelSerializer(context=context)
+        )
+        serializer = HostelSerializer(hostels, many=True, context=context)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
+class OwnerPortfolioView(generics.ListAPIView):
+    """
+    GET: The owner's hostels with their rooms, image counts, review
+    aggregates, lifetime totals and today's analytics.
+    Keyset-paginated (?page_size=, ?cursor=); every page costs three
+    queries (hostels, rooms with image counts, today's analytics) no
+    matter how many hostels or rooms it holds.
+    """
+    serializer_class = PortfolioHostelSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+
+    def get_queryset(self):
+        if self.request.user.role != "owner":
+            raise PermissionDenied("Only owners can view their portfolio.")
+
+        today = timezone.now().date()
+        return Hostel.objects.filter(owner=self.request.user).select_related(
+            'analytics', 'rating_distribution'
+        ).prefetch_related(
+            Prefetch('rooms', queryset=Room.objects.annotate(image_count=Count('images')).order_by('id')),
+            Prefetch(
+                'daily_analytics',
+                queryset=DailyAnalytics.objects.filter(date=today),
+                to_attr='today_analytics'
+            ),
+        )
+
+
 class HostelDeleteView(APIView):
     """
     Delete a hostel owned by the logged-in owner
@@ -160,6 +295,111 @@ class CreateRoomView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+# ---------------------------
+# Bulk create / update rooms of one hostel
+# ---------------------------
+class RoomBulkView(APIView):
+    """
+    POST: Create and update many rooms of one hostel in a single transaction
+    Body: {"create": [{"room_type": "shared", "total_capacity": 4, ...}, ...],
+           "update": [{"id": 12, "is_available": false}, {"id": 13, "rent": "9500"}, ...]}
+
+    Updates may change total_capacity, available_capacity, rent and
+    is_available, so bulk availability toggles go through here too. Every
+    row is validated first; if any fails nothing is written and errors are
+    reported per row index under "create" / "update".
+    """
+    permission_classes = [IsAuthenticated]
+    max_rows = 200
+
+    def post(self, request, hostel_id):
+        user = request.user
+        if user.role != "owner":
+            raise PermissionDenied("Only owners can manage room listings.")
+
+        hostel = get_object_or_404(Hostel, pk=hostel_id, owner=user)
+
+        create_rows = request.data.get('create', [])
+        update_rows = request.data.get('update', [])
+        if not isinstance(create_rows, list) or not isinstance(update_rows, list):
+            return Response({
+                'error': 'Invalid rooms',
+                'details': 'create and update must be lists'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if not create_rows and not update_rows:
+            return Response({
+                'error': 'Invalid rooms',
+                'details': 'Provide at least one room to create or update'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if len(create_rows) + len(update_rows) > self.max_rows:
+            return Response({
+                'error': 'Too many rooms',
+                'details': f'At most {self.max_rows} rooms can be sent per request'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        context = {'request': request}
+        create_errors, update_errors = {}, {}
+
+        new_rooms = []
+        for index, row in enumerate(create_rows):
+            serializer = BulkRoomCreateSerializer(data=row, context=context)
+            if serializer.is_valid():
+                new_rooms.append(Room(hostel=hostel, **serializer.validated_data))
+            else:
+                create_errors[index] = serializer.errors
+
+        room_ids = {}
+        for index, row in enumerate(update_rows):
+            try:
+                room_id = int(row['id'])
+            except (TypeError, ValueError, KeyError):
+                update_errors[index] = {'id': 'A valid room id is required'}
+                continue
+            if room_id in room_ids.values():
+                update_errors[index] = {'id': 'Room appears more than once'}
+                continue
+            room_ids[index] = room_id
+
+        with transaction.atomic():
+            # Lock the rooms being changed so checks and writes see the same rows
+            rooms = hostel.rooms.select_for_update().in_bulk(list(room_ids.values()))
+            changed_rooms, changed_fields = [], set()
+            for index, room_id in room_ids.items():
+                room = rooms.get(room_id)
+                if room is None:
+                    update_errors[index] = {'id': 'Room not found in this hostel'}
+                    continue
+                serializer = BulkRoomUpdateSerializer(room, data=update_rows[index], partial=True)
+                if not serializer.is_valid():
+                    update_errors[index] = serializer.errors
+                    continue
+                for field, value in serializer.validated_data.items():
+                    setattr(room, field, value)
+                changed_fields.update(serializer.validated_data)
+                if 'is_available' in serializer.validated_data:
+                    room.closed_by_hold = False  # the owner decides from now on
+                    changed_fields.add('closed_by_hold')
+                changed_rooms.append(room)
+
+            if create_errors or update_errors:
+                return Response({
+                    'error': 'Invalid rooms',
+                    'details': {'create': create_errors, 'update': update_errors}
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+            created = Room.objects.bulk_create(new_rooms)
+            if changed_rooms:
+                Room.objects.bulk_update(changed_rooms, sorted(changed_fields))
+            # bulk_create/bulk_update skip Room.save(), so feed rows are added here
+            RoomChange.record([room.pk for room in created], 'created')
+            RoomChange.record([room.pk for room in changed_rooms])
+
+        return Response({
+            'created': RoomSerializer(created, many=True, context=context).data,
+            'updated': RoomSerializer(changed_rooms, many=True, context=context).data,
+        }, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
+
 # ---------------------------
 # View My Room Listings
 # ---------------------------
@@ -175,8 +415,12 @@ class MyRoomsView(APIView):
                 status=status.HTTP_403_FORBIDDEN
             )
 
-        rooms = Room.objects.filter(hostel__owner=user)
-        serializer = RoomSerializer(rooms, many=True)
+        context = {'request': request}
+        rooms = sparse_queryset(
+            Room.objects.filter(hostel__owner=user).select_related('hostel').order_by('hostel_id', 'id'),
+            RoomSerializer(context=context)
+        )
+        serializer = RoomSerializer(rooms, many=True, context=context)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
@@ -207,12 +451,251 @@ class RoomAvailabilityUpdateView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        # Only these columns: a full save() would write back a stale
+        # available_capacity over beds taken by concurrent holds. An explicit
+        # toggle also stops return_beds() from reopening a room the owner closed.
         room.is_available = bool(new_status)
-        room.save()
+        room.closed_by_hold = False
+        room.save(update_fields=["is_available", "closed_by_hold"])
 
         return Response({"message": f"Room availability updated to {room.is_available}"})
 
 
+# ---------------------------
+# Bed holds
+# ---------------------------
+class BedHoldCreateView(APIView):
+    """
+    POST: Hold one bed in a room for BED_HOLD_MINUTES.
+    409 when the room has no free bed or the student already holds one there.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, room_id):
+        user = request.user
+        if user.role != "student":
+            raise PermissionDenied("Only students can hold beds.")
+
+        get_object_or_404(Room, pk=room_id)
+        if BedHold.objects.filter(room_id=room_id, user=user, status="active").exists():
+            return Response(
+                {"error": "You already hold a bed in this room."},
+                status=status.HTTP_409_CONFLICT
+            )
+
+        try:
+            hold = BedHold.place(room_id, user, settings.BED_HOLD_MINUTES)
+        except IntegrityError:  # a concurrent request placed the same hold
+            return Response(
+                {"error": "You already hold a bed in this room."},
+                status=status.HTTP_409_CONFLICT
+            )
+        if hold is None:
+            return Response(
+                {"error": "No beds are available in this room."},
+                status=status.HTTP_409_CONFLICT
+            )
+        return Response(BedHoldSerializer(hold).data, status=status.HTTP_201_CREATED)
+
+
+class MyBedHoldsView(generics.ListAPIView):
+    """GET: The logged-in student's holds, newest first"""
+    serializer_class = BedHoldSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        queryset = BedHold.objects.filter(user=self.request.user).select_related("room")
+        hold_status = self.request.query_params.get("status")
+        if hold_status:
+            queryset = queryset.filter(status=hold_status)
+        return queryset
+
+
+class BedHoldReleaseView(APIView):
+    """POST: Give a held bed back; allowed for the student or the room's owner"""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, pk):
+        hold = get_object_or_404(BedHold.objects.select_related("room__hostel"), pk=pk)
+        if request.user.id not in (hold.user_id, hold.room.hostel.owner_id):
+            raise PermissionDenied("You can only release your own holds.")
+
+        if not hold.release():
+            return Response(
+                {"error": "This hold is no longer active."},
+                status=status.HTTP_409_CONFLICT
+            )
+        return Response(BedHoldSerializer(hold).data)
+
+
+class BedHoldConfirmView(APIView):
+    """POST: The room's owner turns an active hold into a booked bed"""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, pk):
+        user = request.user
+        if user.role != "owner":
+            raise PermissionDenied("Only owners can confirm holds.")
+
+        hold = get_object_or_404(BedHold, pk=pk, room__hostel__owner=user)
+        if not hold.confirm():
+            return Response(
+                {"error": "This hold is no longer active."},
+                status=status.HTTP_409_CONFLICT
+            )
+        return Response(BedHoldSerializer(hold).data)
+
+
+# ---------------------------
+# Room availability change feed
+# ---------------------------
+class RoomChangeFeedMixin:
+    """Shared ?cursor=, ?hostels=1,2 and ?bbox=min_lat,min_lng,max_lat,max_lng parsing"""
+    max_hostels = 100
+
+    def parse_feed_params(self, request, cursor=None):
+        """(cursor or None, hostel ids, bbox); raises ValueError on bad input"""
+        cursor = request.query_params.get("cursor", cursor)
+        hostels = request.query_params.get("hostels")
+        bbox = request.query_params.get("bbox")
+        try:
+            cursor = int(cursor) if cursor not in (None, "") else None
+            if cursor is not None and cursor < 0:
+                raise ValueError
+        except ValueError:
+            raise ValueError("cursor must be a non-negative integer")
+        try:
+            hostel_ids = [int(value) for value in hostels.split(",") if value.strip()] if hostels else []
+        except ValueError:
+            raise ValueError("hostels must be comma-separated hostel ids")
+        if len(hostel_ids) > self.max_hostels:
+            raise ValueError(f"At most {self.max_hostels} hostels can be followed")
+        try:
+            bbox = tuple(float(value) for value in bbox.split(",")) if bbox else None
+            if bbox and len(bbox) != 4:
+                raise ValueError
+        except ValueError:
+            raise ValueError("bbox must be min_lat,min_lng,max_lat,max_lng")
+        return cursor, hostel_ids, bbox
+
+    def invalid_params(self, error):
+        return Response({
+            "error": "Invalid feed parameters",
+            "details": str(error)
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+
+class RoomChangeFeedView(RoomChangeFeedMixin, APIView):
+    """
+    GET: Room availability / rent changes after ?cursor=, long-polling for
+    up to ?wait= seconds (default 0, max 30) when there are none yet.
+    Without a cursor returns the current head to start following from.
+    Response: {"cursor": <pass back next time>, "reset": bool, "changes": [...]}
+    "reset" means the cursor was pruned: re-run the search, then follow on.
+    When the process already has ROOM_CHANGE_MAX_WAITERS waiting, the
+    request answers without waiting and carries a Retry-After header.
+    """
+    permission_classes = [IsAuthenticated]
+    max_wait = 30
+
+    def get(self, request):
+        try:
+            cursor, hostel_ids, bbox = self.parse_feed_params(request)
+            wait = min(int(request.query_params.get("wait", 0)), self.max_wait)
+        except ValueError as e:
+            return self.invalid_params(e)
+
+        after = None if cursor is None else feed.position(cursor)
+        if after is None:
+            return Response({"cursor": feed.head()[1], "reset": cursor is not None, "changes": []})
+
+        waiting = wait > 0 and feed.acquire_waiter()
+        try:
+            changes = feed.wait_for_changes(after, hostel_ids, bbox, wait if waiting else 0)
+        finally:
+            if waiting:
+                feed.release_waiter()
+        response = Response({
+            "cursor": changes[-1].id if changes else cursor,
+            "reset": False,
+            "changes": RoomChangeSerializer(changes, many=True).data,
+        })
+        if wait > 0 and not waiting:
+            response["Retry-After"] = str(self.max_wait)
+        return response
+
+
+class RoomChangeStreamView(RoomChangeFeedMixin, APIView):
+    """
+    GET: The same feed as Server-Sent Events (`room_change`, plus `ready` /
+    `reset` carrying the cursor). The stream closes after a few minutes and
+    the client resumes from the Last-Event-ID header it reconnects with.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            cursor, hostel_ids, bbox = self.parse_feed_params(
+                request, cursor=request.headers.get("Last-Event-ID")
+            )
+        except ValueError as e:
+            return self.invalid_params(e)
+
+        response = StreamingHttpResponse(
+            feed.event_stream(
+                cursor, lambda change: RoomChangeSerializer(change).data, hostel_ids, bbox
+            ),
+            content_type="text/event-stream"
+        )
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"  # don't let nginx buffer events
+        return response
+
+
+# ---------------------------
+# Direct-to-storage uploads (see hostels/uploads.py)
+# ---------------------------
+class UploadIntentView(APIView):
+    """
+    POST: Signed parameters for uploading one image straight to storage.
+    Body: {"target": "room_image" | "hostel_media" | "verification",
+           "object_id": 12, "field": "cnic_image"}  (field only for verification)
+    Send the file to upload.url, then POST the token to uploads/confirm/.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        target = request.data.get("target")
+        field = request.data.get("field")
+        obj = uploads.resolve_target(request.user, target, request.data.get("object_id"), field)
+        intent = uploads.create_intent(request.user, target, obj, field, get_storage())
+        return Response(intent, status=status.HTTP_201_CREATED)
+
+
+class UploadConfirmView(APIView):
+    """POST: Record a file uploaded with an intent token. Body: {"token": "..."}"""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        intent = uploads.read_intent(request.data.get("token"), settings.UPLOAD_INTENT_MAX_AGE)
+        if intent["user"] != request.user.id:
+            raise PermissionDenied("This upload belongs to another user.")
+
+        obj = uploads.resolve_target(request.user, intent["target"], intent["object_id"], intent["field"])
+        stored = get_storage().find(intent["public_id"])
+        if stored is None:
+            return Response({
+                "error": "Upload not found",
+                "details": "Upload the file to storage before confirming"
+            }, status=status.HTTP_409_CONFLICT)
+
+        room_image = uploads.record(intent["target"], obj, intent["field"], stored)
+        data = {key: intent[key] for key in ("target", "object_id", "field", "public_id")}
+        if room_image is not None:
+            data["room_image"] = RoomImageSerializer(room_image).data
+        return Response(data, status=status.HTTP_201_CREATED)
+
+
 class RoomDeleteView(APIView):
     """
     Delete a room owned by the logged-in owner
@@ -289,7 +772,11 @@ class RoomDetailView(RetrieveAPIView):
         if user.role != "owner":
             raise PermissionDenied("Only owners can view room details.")
 
-        return get_object_or_404(Room, pk=self.kwargs["pk"], hostel__owner=user)
+        rooms = sparse_queryset(
+            Room.objects.filter(hostel__owner=user).select_related('hostel').prefetch_related('images'),
+            self.get_serializer()
+        )
+        return get_object_or_404(rooms, pk=self.kwargs["pk"])
 
 
 